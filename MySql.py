@@ -12,6 +12,9 @@ import sys
 import shlex
 import subprocess
 import os
+import queue
+import threading
+from contextlib import contextmanager
 import pymysql
 import pymysql.cursors
 
@@ -69,16 +72,28 @@ class MySQL:
     and schema information (field names, number of fields).
     """
 
-    def __init__(self, host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME):
+    def __init__(self, host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME, persistent=False,
+                 exit_on_connect_error=True):
         """
         Initializes the MySQL connection parameters.
         Parameters are defaulted to values from config.py for convenience.
+
+        With persistent=True the connection is kept open between queries
+        (and transparently re-established if the server dropped it) instead
+        of being opened and closed around every call. Call close() when done.
+
+        With exit_on_connect_error=False a failed connection is reported like
+        any other query error (empty result / False) instead of exiting, for
+        background workers that retry later.
         """
         self.host = host
         self.user = user
         self.password = password
         self.database = database
+        self.persistent = persistent
+        self.exit_on_connect_error = exit_on_connect_error
         self.connection = None
+        self.last_error = None
 
     def _connect(self):
         """
@@ -87,10 +102,16 @@ class MySQL:
         Returns:
             pymysql.connections.Connection: The database connection object.
         Raises:
-            pymysql.Error: If the connection fails.
+            pymysql.Error: If the connection fails and exit_on_connect_error is False.
         """
         if self.connection and self.connection.open: # Check if connection is open
-            return self.connection
+            if self.persistent:
+                try:
+                    self.connection.ping(reconnect=True)
+                except pymysql.Error:
+                    self.connection = None
+            if self.connection:
+                return self.connection
         try:
             self.connection = pymysql.connect(
                 host=self.host,
@@ -104,6 +125,8 @@ class MySQL:
         except pymysql.Error as e:
             # Print to stderr for console apps
             print(f"Error connecting to MySQL database. Please check credentials and database status: {e}", file=sys.stderr)
+            if not self.exit_on_connect_error:
+                raise
             sys.exit(1) # Exit if critical connection fails
 
     def _close(self):
@@ -114,6 +137,25 @@ class MySQL:
             self.connection.close()
             self.connection = None
 
+    def _release(self):
+        """
+        Ends a call: closes the connection, or for persistent instances just
+        ends the read transaction so the next query sees fresh rows.
+        """
+        if not self.persistent:
+            self._close()
+        elif self.connection and self.connection.open:
+            try:
+                self.connection.commit()
+            except pymysql.Error:
+                self.connection = None
+
+    def close(self):
+        """
+        Closes a persistent connection. Safe to call more than once.
+        """
+        self._close()
+
     def get_data(self, query_string, params=None):
         """
         Executes a SELECT query and fetches all results.
@@ -129,16 +171,18 @@ class MySQL:
         """
         data = []
         conn = None
+        self.last_error = None
         try:
             conn = self._connect() # Use the robust _connect
             with conn.cursor() as cursor:
                 cursor.execute(query_string, params)
                 data = cursor.fetchall()
         except pymysql.Error as e:
+            self.last_error = e
             print(f"Error executing query: {e}", file=sys.stderr)
         finally:
             if conn:
-                self._close()
+                self._release()
         return data
 
     def put_data(self, query_string, params=None):
@@ -155,6 +199,7 @@ class MySQL:
         """
         success = False
         conn = None
+        self.last_error = None
         try:
             conn = self._connect() # Use the robust _connect
             with conn.cursor() as cursor:
@@ -162,12 +207,77 @@ class MySQL:
             conn.commit()
             success = True
         except pymysql.Error as e:
+            self.last_error = e
             print(f"Error executing update/insert/delete query: {e}", file=sys.stderr)
             if conn:
                 conn.rollback()
         finally:
             if conn:
-                self._close()
+                self._release()
+        return success
+
+    def stream_data(self, query_string, params=None, batch_size=1000):
+        """
+        Executes a SELECT query on a server-side cursor and yields rows one at a
+        time, so result sets larger than memory can be processed. The rows are
+        fetched from the server in batches of `batch_size`.
+
+        Args:
+            query_string (str): The SQL query string to execute (can contain %s placeholders).
+            params (tuple, list, or dict, optional): Parameters to bind to the query. Defaults to None.
+            batch_size (int, optional): Rows fetched per round trip. Defaults to 1000.
+
+        Yields:
+            dict: One row at a time, keyed by column name.
+        """
+        conn = None
+        self.last_error = None
+        try:
+            conn = self._connect()
+            with conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
+                cursor.execute(query_string, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+        except pymysql.Error as e:
+            self.last_error = e
+            print(f"Error executing streaming query: {e}", file=sys.stderr)
+        finally:
+            if conn:
+                self._release()
+
+    def put_many(self, query_string, seq_of_params):
+        """
+        Executes an INSERT, UPDATE, or DELETE query once per parameter set and
+        commits them together as a single transaction.
+
+        Args:
+            query_string (str): The SQL query string to execute (with %s placeholders).
+            seq_of_params (list): A list of parameter tuples/dicts.
+
+        Returns:
+            bool: True if every statement succeeded and was committed, False otherwise
+                  (in which case nothing from this call is committed).
+        """
+        success = False
+        conn = None
+        self.last_error = None
+        try:
+            conn = self._connect()
+            with conn.cursor() as cursor:
+                cursor.executemany(query_string, seq_of_params)
+            conn.commit()
+            success = True
+        except pymysql.Error as e:
+            self.last_error = e
+            print(f"Error executing batch query: {e}", file=sys.stderr)
+            if conn:
+                conn.rollback()
+        finally:
+            if conn:
+                self._release()
         return success
 
     def get_field_names(self, table):
@@ -186,7 +296,7 @@ class MySQL:
             print(f"Error getting field names for table '{table}': {e}", file=sys.stderr)
         finally:
             if conn:
-                self._close()
+                self._release()
         return field_names
 
     def get_num_fields(self, table):
@@ -204,9 +314,63 @@ class MySQL:
             print(f"Error getting number of fields for table '{table}': {e}", file=sys.stderr)
         finally:
             if conn:
-                self._close()
+                self._release()
         return num_fields
 
+class MySQLPool:
+    """
+    A small thread-safe pool of persistent MySQL connections, for callers
+    that run several queries in parallel (one connection per worker thread).
+    Connections are opened lazily, up to `size`, and reused afterwards.
+    """
+
+    def __init__(self, size=4, **connection_kwargs):
+        self.size = size
+        self.connection_kwargs = connection_kwargs
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a persistent MySQL instance for the duration of a with-block.
+        Blocks if all `size` connections are in use.
+        """
+        db = None
+        try:
+            db = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    db = MySQL(persistent=True, **self.connection_kwargs)
+            if db is None:
+                db = self._idle.get()
+        try:
+            yield db
+        finally:
+            self._idle.put(db)
+
+    def get_data(self, query_string, params=None):
+        """
+        Runs a SELECT on a pooled connection. Same contract as MySQL.get_data.
+        """
+        with self.connection() as db:
+            return db.get_data(query_string, params)
+
+    def close(self):
+        """
+        Closes every idle pooled connection.
+        """
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
 # Global helper functions (add_quotes_double, add_quotes_single)
 # are now largely redundant due to parameterized queries, but kept for direct translation reference.
 
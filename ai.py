@@ -11,22 +11,34 @@ import sys
 import os
 import requests
 import json
+import hashlib
+import glob
 sys.path.insert(0, '/home/al/system_files/projects')
 sys.path.insert(0, '/home/al/system_files/projects/py')
 
+import startup_profile
+startup_profile.install('ai')
+startup_profile.phase('imports.project')
+import tracing
+tracing.install('ai')
+
 try:
     from check_imports import ensure_module
 except ImportError:
     print("CRITICAL ERROR: 'check_imports.py' module not found.", file=sys.stderr)
     sys.exit(1)
 
+startup_profile.phase('deps.ensure_module')
 if not ensure_module('requests'):
     sys.exit("Error: 'requests' library missing and could not be installed. Exiting.")
 if not ensure_module('rich'):
     sys.exit("Error: 'rich' library missing and could not be installed. Exiting.")
 
+startup_profile.phase('imports.libs')
 try:
     from MySql import MySQL
+    from local_cache import cache_dir, write_text_atomic
+    from migrations import ensure_schema
     import config
     from rich.console import Console
     from rich.markdown import Markdown
@@ -34,7 +46,9 @@ try:
 except ImportError as e:
     print(f"ERROR: Could not import required modules: {e}", file=sys.stderr)
     sys.exit(1)
+tracing.instrument(MySQL)
 
+startup_profile.phase('setup')
 # Disable ANSI colors when running inside a non-interactive runner/dashboard
 is_interactive = sys.stdout.isatty()
 console = Console(force_terminal=is_interactive, color_system='auto' if is_interactive else None)
@@ -47,6 +61,10 @@ if not GEMINI_API_KEY:
 
 GEMINI_MODEL_NAME = 'gemini-3.6-flash'
 
+# Rows fetched per round trip by 'dump' and 'search'. Pages are fetched with
+# keyset pagination on `id`, so every page costs the same no matter how deep.
+PAGE_SIZE = 20
+
 def clear_screen():
     if sys.stdout.isatty():
         os.system('cls' if os.name == 'nt' else 'clear')
@@ -80,6 +98,7 @@ def get_gemini_response(question):
         if 'candidates' in result and result['candidates']:
             generated_text = result['candidates'][0]['content']['parts'][0]['text']
             print_formatted_qa({'question': question, 'text': generated_text})
+            startup_profile.mark('first_output')
             return generated_text
         else:
             console.print("[bold red]No response candidates found from Gemini API.[/bold red]")
@@ -91,12 +110,6 @@ def get_gemini_response(question):
         console.print(f"[bold red]ERROR: Error parsing Gemini API response: {e}[/bold red]")
         return "ERROR: Could not parse Gemini API response."
 
-def create_past_results_table_if_not_exists():
-    query = "CREATE TABLE IF NOT EXISTS past_results (id INT AUTO_INCREMENT PRIMARY KEY, question TEXT, text MEDIUMTEXT, comment MEDIUMTEXT);"
-    if not db_manager.put_data(query):
-        console.print("[bold red]CRITICAL ERROR: Failed to ensure 'past_results' table exists.[/bold red]")
-        sys.exit(1)
-
 def insert_qa_to_db(question, answer, comment=None):
     query = "INSERT INTO past_results (question, text, comment) VALUES (%s, %s, %s)"
     if db_manager.put_data(query, (question, answer, comment)):
@@ -104,31 +117,114 @@ def insert_qa_to_db(question, answer, comment=None):
     else:
         console.print("\n[bold red]ERROR: Failed to save Q&A to database.[/bold red]")
 
+def iter_qa_pages(where_clause="", params=(), page_size=PAGE_SIZE):
+    """
+    Yields pages (lists of rows) from past_results, newest first, using keyset
+    pagination on `id` instead of loading the whole table at once.
+    """
+    last_id = None
+    while True:
+        conditions = [where_clause] if where_clause else []
+        page_params = list(params)
+        if last_id is not None:
+            conditions.append("id < %s")
+            page_params.append(last_id)
+        query = "SELECT id, question, text, comment FROM past_results"
+        if conditions:
+            query += " WHERE " + " AND ".join(f"({c})" for c in conditions)
+        query += " ORDER BY id DESC LIMIT %s"
+        page_params.append(page_size)
+        rows = db_manager.get_data(query, tuple(page_params))
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]['id']
+
+def _render_cache_path(qa_dict):
+    """
+    Returns the cache file for a rendered entry. The file name combines the row
+    id with a hash of everything that affects the output, so edited rows and
+    terminal width/colour changes never hit a stale render.
+    """
+    digest = hashlib.sha256()
+    for part in (qa_dict.get('question'), qa_dict.get('text'), qa_dict.get('comment'),
+                 console.width, console.color_system):
+        digest.update(str(part).encode('utf-8', 'replace'))
+        digest.update(b'\0')
+    entry_id = qa_dict['id']
+    shard = cache_dir('ai_render', f"{int(entry_id) % 256:02x}")
+    return os.path.join(shard, f"{entry_id}-{digest.hexdigest()[:32]}.ansi")
+
+def print_cached_qa(qa_dict):
+    """
+    Prints a stored Q&A entry, reusing a previously rendered copy from the
+    on-disk cache when one exists. Rendering Markdown is by far the slowest
+    part of 'dump' and 'search', so a cache hit is just a file read.
+    """
+    if qa_dict.get('id') is None:
+        print_formatted_qa(qa_dict)
+        return
+    try:
+        cache_path = _render_cache_path(qa_dict)
+    except OSError:
+        print_formatted_qa(qa_dict)
+        return
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            rendered = f.read()
+    except OSError:
+        with console.capture() as capture:
+            print_formatted_qa(qa_dict)
+        rendered = capture.get()
+        # Drop renders of older versions of this row before caching the new one.
+        for stale in glob.glob(os.path.join(os.path.dirname(cache_path), f"{qa_dict['id']}-*.ansi")):
+            try:
+                os.unlink(stale)
+            except OSError:
+                pass
+        try:
+            write_text_atomic(cache_path, rendered)
+        except OSError:
+            pass
+    console.file.write(rendered)
+    console.file.flush()
+
+def print_qa_pages(pages, empty_message):
+    """
+    Renders pages of entries lazily. On a terminal the user is prompted before
+    the next page is fetched; when piped (e.g. in the dashboard log) pages are
+    streamed one after another without holding more than one page in memory.
+    """
+    shown = 0
+    for page in pages:
+        for qa in page:
+            print_cached_qa(qa)
+        startup_profile.mark('first_output')
+        shown += len(page)
+        if len(page) == PAGE_SIZE and sys.stdout.isatty():
+            choice = console.input(f"[dim]Shown {shown} entries. Press Enter for more, or 'q' to stop: [/dim]")
+            if choice.strip().lower() == 'q':
+                return
+    if shown:
+        console.print(f"[bold]{shown} entries shown.[/bold]")
+    else:
+        console.print(f"[yellow]{empty_message}[/yellow]")
+
 def search_qa_in_db(search_term):
     clear_screen()
     console.print(f"[bold]Searching Database for: '{search_term}'[/bold]\n")
-    query = "SELECT id, question, text, comment FROM past_results WHERE question LIKE CONCAT('%%', %s, '%%') OR text LIKE CONCAT('%%', %s, '%%') ORDER BY id DESC"
-    results = db_manager.get_data(query, (search_term, search_term))
-    if results:
-        console.print(f"Found {len(results)} results:")
-        for qa in results:
-            print_formatted_qa(qa)
-    else:
-        console.print("[yellow]No results found for your search term.[/yellow]")
+    where = "question LIKE CONCAT('%%', %s, '%%') OR text LIKE CONCAT('%%', %s, '%%')"
+    print_qa_pages(iter_qa_pages(where, (search_term, search_term)), "No results found for your search term.")
 
 def dump_all_qa():
     clear_screen()
     console.print("[bold]Dumping All Past Results[/bold]\n")
-    query = "SELECT id, question, text, comment FROM past_results ORDER BY id DESC"
-    results = db_manager.get_data(query)
-    if results:
-        console.print(f"Found {len(results)} total entries:")
-        for qa in results:
-            print_formatted_qa(qa)
-    else:
-        console.print("[yellow]No entries found in the 'past_results' table.[/yellow]")
+    print_qa_pages(iter_qa_pages(), "No entries found in the 'past_results' table.")
 
 def main():
+    startup_profile.phase('args')
     parser = argparse.ArgumentParser(description="CLI tool to interact with Gemini API and manage a Q&A database.", formatter_class=argparse.RawTextHelpFormatter)
     subparsers = parser.add_subparsers(dest='command', help='Available commands', required=True)
 
@@ -141,8 +237,12 @@ def main():
     dump_parser = subparsers.add_parser('dump', help='Dump all Q&A entries from the database.')
 
     args = parser.parse_args()
-    create_past_results_table_if_not_exists()
+    startup_profile.phase('schema')
+    if not ensure_schema():
+        console.print("[bold red]CRITICAL ERROR: Failed to bring the database schema up to date.[/bold red]")
+        sys.exit(1)
 
+    startup_profile.phase('command')
     if args.command == 'ask':
         question_text = " ".join(args.question) if isinstance(args.question, list) else args.question
         clear_screen()
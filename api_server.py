@@ -0,0 +1,383 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   api_server.py
+#
+# Copyright 2026 AL Haines
+#
+# Headless HTTP API over the dashboard_commands catalog.
+#
+# Started by 'dashboard.py --headless' (API only) or 'dashboard.py --api'
+# (alongside the TUI, sharing its run slots), and by the run daemon
+# (rund.py). It listens on a Unix socket by default, or on 127.0.0.1:PORT
+# with --port.
+#
+# The Unix socket is only usable by its owner. Any local process (or a web
+# page, via the browser) can reach a TCP port, so in that mode every request
+# must carry 'Authorization: Bearer <token>'. The token is made afresh each
+# time the server starts and written to api-PORT.token in the state
+# directory, readable only by its owner. In both modes POST bodies must be
+# sent as application/json, and requests with a Host or Origin header that
+# names anything other than the server itself are refused, which keeps
+# cross-site form posts and DNS rebinding out.
+#
+#   GET    /commands              catalog as JSON
+#   GET    /status                active/queued runs and the concurrency limit
+#   GET    /runs                  recent runs
+#   POST   /runs                  {"key": "b", "input": "..."} -> 202 with the run
+#                                 Optional: "share": true returns a run of the
+#                                 same command line that is still going instead
+#                                 of starting another; "live": true yields
+#                                 in-place updates of progress lines (see
+#                                 ?live=1); "width"/"height" size the child.
+#   GET    /runs/<id>             one run's status
+#   GET    /runs/<id>/output      output stream; Server-Sent Events if the
+#                                 client accepts text/event-stream, otherwise
+#                                 chunked plain text. ?from=N resumes at line N.
+#                                 ?live=1 sends updates of earlier lines as
+#                                 terminal_lines.dump_line() text (plain text)
+#                                 or 'update' events (SSE); otherwise they
+#                                 come as lines of their own.
+#   DELETE /runs/<id>             stop a run
+#
+# Example:
+#
+#   curl --unix-socket ~/.local/state/dashboard_tui/api.sock http://x/commands
+#   curl --unix-socket ... -H 'Content-Type: application/json' -d '{"key": "h"}' http://x/runs
+#   curl --unix-socket ... -N http://x/runs/1/output
+#   curl -H "Authorization: Bearer $(cat ~/.local/state/dashboard_tui/api-8765.token)" \
+#        http://127.0.0.1:8765/commands
+
+import os
+import sys
+import hmac
+import json
+import time
+import secrets
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from local_cache import state_dir
+from terminal_lines import LineUpdate, dump_line
+
+STREAM_POLL = 15.0          # Seconds between keep-alive comments on idle SSE streams.
+MAX_BODY = 64 * 1024
+
+
+def default_socket_path():
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, 'dashboard_tui.sock')
+    return os.path.join(state_dir(), 'api.sock')
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        try:
+            os.unlink(self.server_address)
+        except FileNotFoundError:
+            pass
+        old_umask = os.umask(0o177)   # Socket is only usable by its owner.
+        try:
+            super().server_bind()
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+class LocalHTTPServer(ThreadingHTTPServer):
+    """
+    127.0.0.1:port with a bearer token that is written to an owner-only file
+    when the server starts and removed when it closes.
+    """
+    daemon_threads = True
+
+    def __init__(self, port, handler):
+        super().__init__(('127.0.0.1', port), handler)
+        self.port = self.server_address[1]
+        self.token = secrets.token_urlsafe(32)
+        self.token_path = os.path.join(state_dir(), f"api-{self.port}.token")
+        fd = os.open(self.token_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.fchmod(fd, 0o600)    # An older file keeps its mode through O_CREAT.
+            os.write(fd, f"{self.token}\n".encode('ascii'))
+        finally:
+            os.close(fd)
+        self.allowed_hosts = {f"127.0.0.1:{self.port}", f"localhost:{self.port}"}
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.token_path)
+        except OSError:
+            pass
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "DashboardAPI/1.0"
+
+    # Set on the server object by make_server().
+    @property
+    def commands(self):
+        return self.server.commands
+
+    @property
+    def manager(self):
+        return self.server.manager
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            print(f"{self.address_string()} - {format % args}", file=sys.stderr)
+
+    # --- Helpers ---
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message, headers=None):
+        self.send_json(status, {'error': message}, headers)
+
+    def refuse(self, status, message, headers=None):
+        """Error reply that also drops the connection, as the body may not have been read."""
+        self.close_connection = True
+        self.send_error_json(status, message, dict(headers or {}, Connection="close"))
+        return False
+
+    def check_request(self):
+        """
+        Refuses requests from other sites, and without the token in TCP mode.
+        Returns True when the request may go on.
+        """
+        allowed_hosts = getattr(self.server, 'allowed_hosts', None)
+        if allowed_hosts is not None and self.headers.get('Host', '') not in allowed_hosts:
+            return self.refuse(403, "unexpected Host header")
+        origin = self.headers.get('Origin')
+        if origin is not None and urlsplit(origin).netloc not in (allowed_hosts or ()):
+            return self.refuse(403, "cross-origin requests are not allowed")
+        token = getattr(self.server, 'token', None)
+        if token is not None:
+            scheme, _, supplied = self.headers.get('Authorization', '').partition(' ')
+            if scheme.lower() != 'bearer' or not hmac.compare_digest(supplied.strip().encode(), token.encode()):
+                return self.refuse(401, "missing or wrong bearer token", {'WWW-Authenticate': 'Bearer'})
+        return True
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            raise ValueError("request body too large")
+        if not length:
+            return {}
+        data = json.loads(self.rfile.read(length))
+        if not isinstance(data, dict):
+            raise ValueError("request body must be a JSON object")
+        return data
+
+    def route(self):
+        """
+        Returns (path parts, query dict, run or None).
+        """
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        run = None
+        if len(parts) >= 2 and parts[0] == 'runs':
+            try:
+                run = self.manager.get(int(parts[1]))
+            except ValueError:
+                pass
+        return parts, parse_qs(url.query), run
+
+    # --- Verbs ---
+
+    def do_GET(self):
+        if not self.check_request():
+            return
+        parts, query, run = self.route()
+        if parts == ['commands']:
+            self.send_json(200, [
+                {k: getattr(c, k) for k in ('key', 'name', 'group_name', 'command_type', 'requires_input', 'hosts')}
+                for c in self.commands.values()
+            ])
+        elif parts == ['status']:
+            self.send_json(200, dict(self.manager.status(), commands=len(self.commands),
+                                     uptime=round(time.time() - self.server.started_at, 1), pid=os.getpid()))
+        elif parts == ['runs']:
+            self.send_json(200, self.manager.list())
+        elif len(parts) == 2 and parts[0] == 'runs':
+            if run is None:
+                return self.send_error_json(404, "no such run")
+            self.send_json(200, run.summary())
+        elif len(parts) == 3 and parts[0] == 'runs' and parts[2] == 'output':
+            if run is None:
+                return self.send_error_json(404, "no such run")
+            try:
+                start = int(query.get('from', ['0'])[0])
+            except ValueError:
+                return self.send_error_json(400, "'from' must be an integer")
+            live = query.get('live', ['0'])[0] not in ('', '0')
+            if 'text/event-stream' in self.headers.get('Accept', ''):
+                self.stream_sse(run, start, live)
+            else:
+                self.stream_chunked(run, start, live)
+        else:
+            self.send_error_json(404, "not found")
+
+    def do_POST(self):
+        if not self.check_request():
+            return
+        content_type = self.headers.get('Content-Type', '').partition(';')[0].strip().lower()
+        if content_type != 'application/json':
+            return self.refuse(415, "request body must be sent as application/json")
+        parts, _, _ = self.route()
+        if parts != ['runs']:
+            return self.send_error_json(404, "not found")
+        try:
+            body = self.read_json()
+        except ValueError as e:
+            return self.send_error_json(400, f"invalid JSON: {e}")
+        key = str(body.get('key', ''))
+        command_data = self.commands.get(key)
+        if command_data is None and self.server.reload_commands is not None:
+            # A long-running server may predate the command; look again.
+            self.server.commands = self.server.reload_commands() or self.server.commands
+            command_data = self.commands.get(key)
+        if command_data is None:
+            return self.send_error_json(404, f"unknown command key {body.get('key')!r}")
+        user_input = str(body.get('input') or '')
+        if command_data.requires_input and not user_input:
+            return self.send_error_json(400, f"'{command_data.name}' requires 'input'")
+        size = {}
+        for name in ('width', 'height'):
+            value = body.get(name)
+            if value is not None:
+                if not isinstance(value, int) or value <= 0:
+                    return self.send_error_json(400, f"'{name}' must be a positive integer")
+                size[name] = value
+        run = self.manager.start(command_data, user_input, share=bool(body.get('share')),
+                                 live=bool(body.get('live')), **size)
+        self.send_json(202, run.summary(), headers={'Location': f"/runs/{run.id}"})
+
+    def do_DELETE(self):
+        if not self.check_request():
+            return
+        parts, _, run = self.route()
+        if len(parts) != 2 or parts[0] != 'runs':
+            return self.send_error_json(404, "not found")
+        if run is None:
+            return self.send_error_json(404, "no such run")
+        self.manager.stop(run.id)
+        self.send_json(200, run.summary())
+
+    # --- Streaming ---
+
+    def _start_stream(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+    def _chunk(self, data):
+        if data:
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+    def _follow(self, run, start):
+        """
+        Yields (lines, done) batches until the run is done and drained.
+        """
+        index = start
+        while True:
+            lines, index, done = run.read_from(index, timeout=STREAM_POLL)
+            yield lines, done and not lines
+            if done and not lines:
+                return
+
+    def stream_chunked(self, run, start, live=False):
+        self._start_stream("text/plain; charset=utf-8")
+        try:
+            for lines, _ in self._follow(run, start):
+                if live:
+                    lines = map(dump_line, lines)
+                self._chunk("".join(f"{line}\n" for line in lines).encode('utf-8'))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def stream_sse(self, run, start, live=False):
+        self._start_stream("text/event-stream; charset=utf-8")
+        try:
+            number = start
+            for lines, done in self._follow(run, start):
+                if not lines and not done:
+                    self._chunk(b": keep-alive\n\n")
+                events = []
+                for line in lines:
+                    if live and type(line) is LineUpdate:
+                        events.append(f"event: update\nid: {number}\ndata: {line.back}\t{line}\n\n")
+                    else:
+                        events.append(f"id: {number}\ndata: {line}\n\n")
+                    number += 1
+                if done:
+                    events.append(f"event: end\ndata: {json.dumps(run.summary())}\n\n")
+                self._chunk("".join(events).encode('utf-8'))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def make_server(commands, manager, socket_path=None, port=None, verbose=False):
+    """
+    Creates (but does not start) the API server.
+
+    Args:
+        commands (dict): Catalog keyed by command key.
+        manager (RunManager): Shared run slots and registry.
+        socket_path (str, optional): Unix socket path (default: see default_socket_path).
+        port (int, optional): Listen on 127.0.0.1:port instead of a Unix socket;
+            clients then need the token from server.token_path.
+    """
+    if port:
+        server = LocalHTTPServer(port, ApiHandler)
+        server.address_label = f"http://127.0.0.1:{port} (token in {server.token_path})"
+    else:
+        path = socket_path or default_socket_path()
+        server = UnixHTTPServer(path, ApiHandler)
+        server.address_label = f"unix:{path}"
+    server.commands = commands
+    server.reload_commands = None   # Optional callable returning a fresh catalog dict.
+    server.manager = manager
+    server.verbose = verbose
+    server.started_at = time.time()
+    return server
+
+
+def start_in_background(server):
+    """
+    Serves requests from a daemon thread (used when the TUI also runs).
+    """
+    thread = threading.Thread(target=server.serve_forever, name="api-server", daemon=True)
+    thread.start()
+    return thread
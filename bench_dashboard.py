@@ -0,0 +1,613 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   bench_dashboard.py
+#
+# Copyright 2026 AL Haines
+#
+# End-to-end latency benchmark for the dashboard TUI.
+#
+# DashboardApp is booted headless with Textual's testing pilot against a
+# stub MySql.MySQL that serves a synthetic catalog of N commands (10, 100
+# and 1000 by default). Each catalog size runs in a fresh child process, so
+# import time and memory are measured from a clean start. For every size the
+# report records:
+#
+#   - import_ms / startup_ms: importing dashboard.py, and constructing the
+#     app (dependency check, schema check, catalog query) up to its first frame,
+#   - first_line_ms:  key press to the first output line of a fresh run,
+#   - cached_line_ms: key press to the cached output of a re-run,
+#   - frame_ms:       duration of each screen update (layout + compositor)
+#                     while a command streams heavy output, and the gaps
+#                     between updates (long gaps are visible stalls),
+#   - rss_mb:         resident memory after startup and after repeated
+#                     heavy runs.
+#
+# Headless Textual skips writing to the terminal, so frame times cover
+# everything up to the terminal write. Reports are JSON and written to
+# ~/.cache/dashboard_tui/bench/ (or --output); compare two of them with
+# 'compare', which exits with status 1 when a metric got worse than the
+# tolerance allows:
+#
+#   bench_dashboard.py run [--sizes 10,100,1000] [--output FILE]
+#   bench_dashboard.py compare BASELINE.json NEW.json [--tolerance 0.25]
+#   bench_dashboard.py check
+#
+# dashboard.OutputLog reaches into private parts of Textual's Log (listed in
+# LOG_INTERNALS). 'check' makes sure the installed Textual still has them in
+# the expected shape; 'run' does the same first, so a Textual upgrade that
+# moves them fails loudly here instead of mid-run in the dashboard. 'check'
+# also runs a command that redraws a progress line across blank lines after
+# a pause, and makes sure the redraw lands on that line in the log.
+
+import sys
+import os
+import gc
+import json
+import time
+import shutil
+import asyncio
+import platform
+import inspect
+import argparse
+import tempfile
+import statistics
+import subprocess
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, '/home/al/system_files/projects')
+sys.path.insert(0, '/home/al/system_files/projects/py')
+
+DEFAULT_SIZES = (10, 100, 1000)
+KEY_ALPHABET = "abcdefghijklmnoprstuvwxyz"     # No 'q': it quits the dashboard.
+GROUPS = ("System", "Network", "Storage", "Journal", "AI", "Services", "Backups", "Misc")
+HEAVY_LINES = 100000
+HEAVY_RUNS = 3
+SAMPLES = 5
+KEY_TIMEOUT = 10.0          # Seconds to wait for output before a sample counts as failed.
+SCREEN_SIZE = (120, 40)
+LOG_INTERNALS = ('_lines', '_width', '_render_line_cache', '_process_line', '_render_line_strip')
+
+# Metrics compared by 'compare' (all lower-is-better), with the smallest
+# absolute change that counts, so timer noise is not reported as a regression.
+COMPARED = {
+    'import_ms': 20.0,
+    'startup_ms': 20.0,
+    'first_line_ms.p50': 10.0,
+    'first_line_ms.p95': 10.0,
+    'cached_line_ms.p50': 5.0,
+    'frame_ms.p50': 1.0,
+    'frame_ms.p95': 2.0,
+    'frame_ms.max': 10.0,
+    'frame_gap_ms.p95': 10.0,
+    'heavy_stream_s': 0.2,
+    'rss_mb.after_runs': 5.0,
+    'rss_mb.growth': 5.0,
+}
+
+
+def synthetic_catalog(size, heavy_lines=HEAVY_LINES):
+    """
+    Returns `size` dashboard_commands rows. Keys all have the same length, so
+    no key is a prefix of another and chords never wait for the chord timeout.
+    The last command streams `heavy_lines` lines.
+    """
+    width = 1
+    while len(KEY_ALPHABET) ** width < size:
+        width += 1
+    commands = []
+    for i in range(size):
+        key, n = "", i
+        for _ in range(width):
+            n, digit = divmod(n, len(KEY_ALPHABET))
+            key = KEY_ALPHABET[digit] + key
+        commands.append({
+            'key': key,
+            'name': f"Synthetic command {i:04d}",
+            'group_name': GROUPS[i % len(GROUPS)],
+            'command_type': 'shell',
+            'command_string': f"echo 'first line of {key}'; echo done",
+            'requires_input': 0,
+            'quote_input': 0,
+            'big_display': 0,
+            'interval_seconds': None,
+            'background': 0,
+            'hosts': None,
+        })
+    commands[-1]['name'] = "Synthetic heavy output"
+    commands[-1]['command_string'] = f"seq 1 {heavy_lines} | sed 's/^/heavy output line /'"
+    return commands
+
+
+class StubMySQL:
+    """
+    Stands in for MySql.MySQL (installed as the whole MySql module): serves the synthetic catalog, reports the
+    schema as current and accepts every write.
+    """
+
+    catalog = []
+    latency = 0.0
+    queries = 0
+
+    def __init__(self, *args, **kwargs):
+        self.last_error = None
+
+    def _query(self):
+        StubMySQL.queries += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_data(self, query_string, params=None):
+        self._query()
+        if 'FROM `dashboard_commands`' in query_string:
+            return [dict(row) for row in self.catalog]
+        if 'MAX(`version`)' in query_string:
+            return [{'version': 10 ** 6}]   # Newer than any migration: nothing to apply.
+        return []
+
+    def put_data(self, query_string, params=None):
+        self._query()
+        return True
+
+    def stream_data(self, query_string, params=None, batch_size=1000):
+        yield from self.get_data(query_string, params)
+
+    def close(self):
+        pass
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        'n': len(ordered),
+        'p50': round(statistics.median(ordered), 2),
+        'p95': round(pick(0.95), 2),
+        'max': round(ordered[-1], 2),
+    }
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class FrameRecorder:
+    """
+    Times every screen update (Screen._on_timer_update: layout plus compositor
+    render) while recording is on.
+    """
+
+    def __init__(self):
+        self.recording = False
+        self.durations = []
+        self.starts = []
+
+    def install(self, screen_class):
+        original = getattr(screen_class, '_on_timer_update', None)
+        if original is None:
+            print("WARNING: This Textual version has no Screen._on_timer_update; frame times are not recorded.",
+                  file=sys.stderr)
+            return
+        recorder = self
+
+        def timed_update(screen):
+            if not recorder.recording:
+                return original(screen)
+            start = time.perf_counter()
+            try:
+                return original(screen)
+            finally:
+                recorder.starts.append(start)
+                recorder.durations.append((time.perf_counter() - start) * 1000)
+
+        screen_class._on_timer_update = timed_update
+
+    def gaps(self):
+        return [(b - a) * 1000 for a, b in zip(self.starts, self.starts[1:])]
+
+
+def _send_keys(app, keys):
+    """
+    Delivers key presses the way the pilot does, but without the pilot's
+    wait for idle after each key, which would dominate the latency measured.
+    """
+    from textual import events
+    for char in keys:
+        event = events.Key(char, char)
+        event.set_sender(app)
+        app._driver.send_message(event)
+
+
+async def _wait_for(predicate, timeout=KEY_TIMEOUT):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.001)
+    return True
+
+
+async def _measure(dashboard, catalog, options, result, frames):
+    started = time.perf_counter()
+    app = dashboard.DashboardApp()
+    first_frame = {}
+    original_first_frame = app._first_frame
+
+    def on_first_frame():
+        first_frame['at'] = time.perf_counter()
+        original_first_frame()
+
+    app._first_frame = on_first_frame
+    async with app.run_test(size=options['screen_size']) as pilot:
+        if not await _wait_for(lambda: 'at' in first_frame):
+            raise RuntimeError("the dashboard never drew its first frame")
+        result['startup_ms'] = round((first_frame['at'] - started) * 1000, 2)
+        result['catalog_queries'] = StubMySQL.queries
+        await pilot.pause(0.2)
+        gc.collect()
+        result['rss_mb'] = {'after_startup': rss_mb()}
+        log = app.query_one(dashboard.OutputLog)
+
+        def shows(text, generation):
+            # log.clear() bumps the generation, so output of an earlier run never counts.
+            return lambda: log.generation != generation and any(text in line for line in log.buffer.lines[:4])
+
+        # Key press to first line, fresh and from the output cache.
+        light = catalog[:-1]
+        step = max(1, len(light) // options['samples'])
+        cold, warm = [], []
+        for command_data in light[::step][:options['samples']]:
+            key = command_data['key']
+            expected = f"first line of {key}"
+            for label, samples in (('fresh', cold), ('cached', warm)):
+                generation = log.generation
+                begin = time.perf_counter()
+                _send_keys(app, key)
+                if not await _wait_for(shows(expected, generation)):
+                    print(f"WARNING: No output from '{key}' ({label}) within {KEY_TIMEOUT}s.", file=sys.stderr)
+                    break
+                samples.append((time.perf_counter() - begin) * 1000)
+                # Let the run finish so its output is cached for the next sample.
+                await _wait_for(lambda: app._stale_run is None and any(l == "done" for l in log.buffer.lines))
+        result['first_line_ms'] = percentiles(cold)
+        result['cached_line_ms'] = percentiles(warm)
+
+        # Frame times while heavy output streams in, then memory after repeated runs.
+        heavy = catalog[-1]
+        expected_lines = options['heavy_lines'] + 1       # Plus the "Running ..." header.
+        durations = []
+        for run in range(options['runs']):
+            frames.durations, frames.starts = [], []
+            frames.recording = run == 0
+            generation = log.generation
+            begin = time.perf_counter()
+            _send_keys(app, heavy['key'])
+            done = await _wait_for(lambda: (log.generation != generation and app._stale_run is None
+                                            and len(log.buffer) >= expected_lines),
+                                   timeout=max(60.0, options['heavy_lines'] / 1000))
+            durations.append(time.perf_counter() - begin)
+            frames.recording = False
+            if not done:
+                print(f"WARNING: Heavy run {run + 1} did not finish; got {len(log.buffer)} lines.", file=sys.stderr)
+            if run == 0:
+                result['frame_ms'] = percentiles(frames.durations)
+                result['frame_gap_ms'] = percentiles(frames.gaps())
+            await pilot.pause(0.2)
+        result['heavy_stream_s'] = round(durations[0], 3)
+        result['heavy_lines_per_s'] = round(options['heavy_lines'] / durations[0]) if durations[0] else None
+        gc.collect()
+        result['rss_mb']['after_runs'] = rss_mb()
+        if result['rss_mb']['after_startup'] is not None and result['rss_mb']['after_runs'] is not None:
+            result['rss_mb']['growth'] = round(result['rss_mb']['after_runs'] - result['rss_mb']['after_startup'], 1)
+        await pilot.press('q')
+
+
+def _isolate(catalog, db_latency_ms=0.0):
+    """
+    Points this process's dashboard at a scratch directory and a stub
+    database serving `catalog`. Returns the scratch directory.
+    """
+    scratch = tempfile.mkdtemp(prefix='bench_dashboard.')
+    # Keep caches, the schema marker and the journal queue away from the real ones,
+    # and commands in this process: a run daemon (rund.py) is looked for in the runtime dir.
+    os.environ['DASHBOARD_CACHE_DIR'] = os.path.join(scratch, 'cache')
+    os.environ['DASHBOARD_STATE_DIR'] = os.path.join(scratch, 'state')
+    os.environ['XDG_RUNTIME_DIR'] = scratch
+    # The real MySql module needs credentials and a server; the stub needs neither.
+    StubMySQL.catalog = catalog
+    StubMySQL.latency = db_latency_ms / 1000
+    stub_module = types.ModuleType('MySql')
+    stub_module.MySQL = StubMySQL
+    stub_module.DB_HOST = 'bench'
+    stub_module.DB_NAME = 'bench'
+    sys.modules['MySql'] = stub_module
+    return scratch
+
+
+def run_child(size, options, output_path):
+    """
+    Benchmarks one catalog size in this (fresh) process and writes the result to output_path.
+    """
+    catalog = synthetic_catalog(size, options['heavy_lines'])
+    scratch = _isolate(catalog, options['db_latency_ms'])
+    result = {'size': size}
+    try:
+        started = time.perf_counter()
+        import dashboard
+        result['import_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+        from textual.screen import Screen
+        frames = FrameRecorder()
+        frames.install(Screen)
+        asyncio.run(_measure(dashboard, catalog, options, result, frames))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+
+
+def check_log_internals():
+    """
+    Returns what is missing or changed among the Log internals OutputLog
+    relies on (an empty list when all is well).
+    """
+    from textual.widgets import Log
+    log = Log()
+    problems = [f"Log.{name} is missing" for name in LOG_INTERNALS if not hasattr(log, name)]
+    if problems:
+        return problems
+    if not isinstance(log._lines, list):
+        problems.append(f"Log._lines is a {type(log._lines).__name__}, not a list")
+    if not isinstance(log._width, int):
+        problems.append(f"Log._width is a {type(log._width).__name__}, not an int")
+    for method in ('get', 'discard'):
+        if not callable(getattr(log._render_line_cache, method, None)):
+            problems.append(f"Log._render_line_cache has no {method}()")
+    if list(inspect.signature(Log._render_line_strip).parameters) != ['self', 'y', 'rich_style']:
+        problems.append(f"Log._render_line_strip{inspect.signature(Log._render_line_strip)} "
+                        f"no longer takes (y, rich_style)")
+    try:
+        if Log._process_line("a\tb") != "a       b":
+            problems.append("Log._process_line no longer expands tabs")
+    except TypeError as e:
+        problems.append(f"Log._process_line(line) fails: {e}")
+    return problems
+
+
+async def _redraw_check(dashboard, key):
+    app = dashboard.DashboardApp()
+    async with app.run_test(size=SCREEN_SIZE) as pilot:
+        await pilot.pause(0.2)
+        log = app.query_one(dashboard.OutputLog)
+        _send_keys(app, key)
+        if not await _wait_for(lambda: "done" in log.buffer.lines):
+            return None
+        await pilot.pause(0.2)
+        lines = list(log.buffer.lines)
+        del lines[lines.index("done") + 1:]     # The usage summary follows.
+        await pilot.press('q')
+    return lines
+
+
+def check_redraw():
+    """
+    Runs a log-mode command that redraws a progress line across blank lines,
+    in a later batch than the lines it refers to, and returns what is wrong
+    with the log it leaves (an empty list when all is well).
+    """
+    catalog = synthetic_catalog(2, 1)
+    catalog[0]['name'] = "Redraw"
+    catalog[0]['command_string'] = r"printf 'A 0%%\n\nB\n'; sleep 0.5; printf '\033[3AA 100%%\n\n\n'; echo done"
+    scratch = _isolate(catalog)
+    try:
+        import dashboard
+        lines = asyncio.run(_redraw_check(dashboard, catalog[0]['key']))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    expected = ["Running 'Redraw'...", "A 100%", "", "B", "done"]
+    if lines is None:
+        return [f"the redraw command did not finish within {KEY_TIMEOUT}s"]
+    return [] if lines == expected else [f"redrawn log is {lines!r}, expected {expected!r}"]
+
+
+def require_log_internals():
+    problems = check_log_internals()
+    if problems:
+        import textual
+        for problem in problems:
+            print(f"ERROR: {problem}", file=sys.stderr)
+        sys.exit(f"ERROR: Textual {getattr(textual, '__version__', '?')} is not compatible with "
+                 f"dashboard.OutputLog; install the version pinned in requirements.txt.")
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def run_benchmark(sizes, options):
+    """
+    Runs every catalog size in its own child process and returns the report.
+    """
+    try:
+        import textual
+        textual_version = getattr(textual, '__version__', None)
+    except ImportError:
+        textual_version = None
+    report = {
+        'tool': 'bench_dashboard',
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'textual': textual_version,
+        'host': platform.node(),
+        'cpus': os.cpu_count(),
+        'options': options,
+        'results': {},
+    }
+    for size in sizes:
+        print(f"Benchmarking a catalog of {size} commands...", file=sys.stderr)
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as tmp:
+            child_output = tmp.name
+        try:
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), 'run', '--child', str(size),
+                 '--child-output', child_output, '--options', json.dumps(options)],
+                timeout=900)
+            if completed.returncode != 0:
+                print(f"ERROR: The benchmark for {size} commands failed (exit status {completed.returncode}).",
+                      file=sys.stderr)
+                continue
+            with open(child_output, 'r', encoding='utf-8') as f:
+                report['results'][str(size)] = json.load(f)
+        except subprocess.TimeoutExpired:
+            print(f"ERROR: The benchmark for {size} commands timed out.", file=sys.stderr)
+        finally:
+            os.unlink(child_output)
+    return report
+
+
+def metric(result, name):
+    value = result
+    for part in name.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def print_report(report):
+    print(f"bench_dashboard {report['created']}  git {report.get('git')}  python {report['python']}  "
+          f"textual {report.get('textual')}  {report['cpus']} cpus")
+    sizes = list(report['results'])
+    print(f"  {'metric':<22}" + "".join(f"{size + ' cmds':>14}" for size in sizes))
+    names = ['import_ms', 'startup_ms', 'first_line_ms.p50', 'first_line_ms.p95', 'cached_line_ms.p50',
+             'frame_ms.p50', 'frame_ms.p95', 'frame_ms.max', 'frame_gap_ms.p95', 'heavy_stream_s',
+             'heavy_lines_per_s', 'rss_mb.after_startup', 'rss_mb.after_runs', 'rss_mb.growth']
+    for name in names:
+        values = [metric(report['results'][size], name) for size in sizes]
+        print(f"  {name:<22}" + "".join(f"{'-' if v is None else v:>14}" for v in values))
+
+
+def compare_reports(baseline, current, tolerance):
+    """
+    Returns (size, metric, old, new, regressed) rows for the metrics in COMPARED.
+    """
+    rows = []
+    for size, result in current['results'].items():
+        old_result = baseline['results'].get(size)
+        if old_result is None:
+            continue
+        for name, floor in COMPARED.items():
+            old, new = metric(old_result, name), metric(result, name)
+            if old is None or new is None:
+                continue
+            regressed = new - old > max(floor, abs(old) * tolerance)
+            rows.append((size, name, old, new, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless end-to-end latency benchmark for the dashboard.")
+    subparsers = parser.add_subparsers(dest='command', required=True, help="Command to execute")
+    p_run = subparsers.add_parser('run', help="Benchmark synthetic catalogs and write a JSON report.")
+    p_run.add_argument('--sizes', default=",".join(map(str, DEFAULT_SIZES)),
+                       help="Comma separated catalog sizes (default: %(default)s).")
+    p_run.add_argument('--heavy-lines', type=int, default=HEAVY_LINES,
+                       help="Lines printed by the heavy output command (default: %(default)s).")
+    p_run.add_argument('--runs', type=int, default=HEAVY_RUNS,
+                       help="Heavy runs before memory is measured (default: %(default)s).")
+    p_run.add_argument('--samples', type=int, default=SAMPLES,
+                       help="Commands timed from key press to first line (default: %(default)s).")
+    p_run.add_argument('--db-latency', type=float, default=0.0, metavar='MS',
+                       help="Simulated latency of every stub database query.")
+    p_run.add_argument('--output', help="Report path (default: ~/.cache/dashboard_tui/bench/bench-TIME.json).")
+    p_run.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    p_run.add_argument('--child-output', help=argparse.SUPPRESS)
+    p_run.add_argument('--options', help=argparse.SUPPRESS)
+    p_compare = subparsers.add_parser('compare', help="Compare two reports; exit status 1 on regression.")
+    p_compare.add_argument('baseline', help="Earlier report.")
+    p_compare.add_argument('current', help="New report.")
+    p_compare.add_argument('--tolerance', type=float, default=0.25,
+                           help="Allowed relative slowdown per metric (default: %(default)s).")
+    subparsers.add_parser('check', help="Check the Log internals the dashboard uses and in-place line redraws.")
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        require_log_internals()
+        print("Textual Log internals used by dashboard.OutputLog: OK")
+        problems = check_redraw()
+        for problem in problems:
+            print(f"ERROR: {problem}", file=sys.stderr)
+        if problems:
+            sys.exit("ERROR: A progress line redrawn in a later batch replaced the wrong log line.")
+        print("Progress line redrawn across blank lines in a later batch: OK")
+        return
+
+    if args.command == 'run' and args.child is not None:
+        run_child(args.child, json.loads(args.options), args.child_output)
+        return
+
+    if args.command == 'run':
+        require_log_internals()
+        try:
+            sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+        except ValueError:
+            sys.exit(f"ERROR: Invalid --sizes '{args.sizes}'.")
+        if not sizes or min(sizes) < 2:
+            sys.exit("ERROR: Catalog sizes must be at least 2.")
+        options = {
+            'heavy_lines': args.heavy_lines,
+            'runs': max(1, args.runs),
+            'samples': max(1, args.samples),
+            'db_latency_ms': args.db_latency,
+            'screen_size': list(SCREEN_SIZE),
+        }
+        report = run_benchmark(sizes, options)
+        if not report['results']:
+            sys.exit("ERROR: No catalog size could be benchmarked.")
+        output = args.output
+        if not output:
+            from local_cache import cache_dir
+            output = os.path.join(cache_dir('bench'), f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print_report(report)
+        print(f"Report written to {output}", file=sys.stderr)
+    elif args.command == 'compare':
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.current, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+        if baseline.get('options') != current.get('options'):
+            print("WARNING: The reports were made with different options; some changes may not be regressions.",
+                  file=sys.stderr)
+        rows = compare_reports(baseline, current, args.tolerance)
+        if not rows:
+            print("The reports have no catalog sizes and metrics in common.")
+            return
+        failed = False
+        for size, name, old, new, regressed in rows:
+            failed = failed or regressed
+            change = f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+            print(f"{'FAIL' if regressed else 'OK  '} {size:>5} cmds  {name:<22} {old:>10} -> {new:<10} {change}")
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
+#============= end of code      ================#
@@ -15,6 +15,12 @@
 # The primary function is `ensure_module`, which can be imported and called
 # by other scripts to verify and install their required external dependencies.
 #
+# Successful checks are remembered in a small verification cache (see
+# `is_verified`/`mark_verified`), keyed on sys.executable plus the mtimes of
+# the site-packages directories. A warm start therefore skips the
+# importlib.util.find_spec walk over sys.path entirely, and installing or
+# removing a package (which touches site-packages) invalidates it.
+#
 # Usage Example in another script (e.g., `my_app.py`):
 #
 #   import sys
@@ -34,8 +40,89 @@
 #   # ... rest of your application code ...
 
 import sys
+import os
+import site
+import hashlib
 import subprocess
 import importlib # Added for cleaner re-importing
+import importlib.util
+
+try:
+    from local_cache import cache_dir, read_json, write_json_atomic
+except ImportError:
+    cache_dir = None
+
+# In-process copy of the verification cache: (fingerprint, set of import names).
+_verified = None
+
+def _site_directories():
+    """
+    Returns the site-packages directories of the running interpreter.
+    """
+    directories = []
+    try:
+        directories.extend(site.getsitepackages())
+    except AttributeError:
+        pass # Some virtualenv versions ship a site.py without getsitepackages().
+    user_site = getattr(site, 'ENABLE_USER_SITE', False) and site.getusersitepackages()
+    if user_site:
+        directories.append(user_site)
+    return directories
+
+def environment_fingerprint():
+    """
+    Identifies the current Python environment: the interpreter path and
+    version plus the mtime of every site-packages directory. pip changes these
+    mtimes whenever it installs or removes a package.
+    """
+    parts = [sys.executable, sys.version]
+    for directory in _site_directories():
+        try:
+            parts.append(f"{directory}:{os.stat(directory).st_mtime_ns}")
+        except OSError:
+            parts.append(f"{directory}:missing")
+    return hashlib.sha256("\n".join(parts).encode('utf-8')).hexdigest()
+
+def _cache_file():
+    name = hashlib.sha256(sys.executable.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir('deps'), f"{name}.json")
+
+def _load_verified():
+    global _verified
+    fingerprint = environment_fingerprint()
+    if _verified is None or _verified[0] != fingerprint:
+        modules = set()
+        if cache_dir is not None:
+            data = read_json(_cache_file(), default={})
+            if isinstance(data, dict) and data.get('fingerprint') == fingerprint:
+                modules = set(data.get('modules', []))
+        _verified = (fingerprint, modules)
+    return _verified
+
+def is_verified(import_name):
+    """
+    Returns True if import_name was found in this exact environment before.
+    """
+    try:
+        return import_name in _load_verified()[1]
+    except OSError:
+        return False
+
+def mark_verified(import_name):
+    """
+    Records that import_name is importable in the current environment.
+    """
+    global _verified
+    try:
+        fingerprint, modules = _load_verified()
+        if import_name in modules:
+            return
+        modules = modules | {import_name}
+        _verified = (fingerprint, modules)
+        if cache_dir is not None:
+            write_json_atomic(_cache_file(), {'fingerprint': fingerprint, 'modules': sorted(modules)})
+    except OSError:
+        pass # The cache is only an optimisation.
 
 def ensure_module(package_name, import_name=None):
     """
@@ -57,12 +144,16 @@ def ensure_module(package_name, import_name=None):
     if import_name is None:
         import_name = package_name
 
+    if is_verified(import_name):
+        return True
+
     try:
         # Attempt to import the module to check if it's already available.
         # importlib.util.find_spec is a robust way to check for module existence
         # without actually loading it fully, which can prevent some side effects.
         if importlib.util.find_spec(import_name):
             #print(f"INFO: '{import_name}' module already installed.", file=sys.stderr)
+            mark_verified(import_name)
             return True
         else:
             raise ImportError # Force installation attempt if not found by spec
@@ -85,6 +176,7 @@ def ensure_module(package_name, import_name=None):
             # This ensures it's usable immediately by the calling script.
             importlib.import_module(import_name)
             print(f"INFO: '{import_name}' imported successfully after installation.", file=sys.stderr)
+            mark_verified(import_name)
             return True
         except subprocess.CalledProcessError as e:
             # Catch errors specifically from the pip installation command.
@@ -0,0 +1,161 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   command_index.py
+#
+# Copyright 2026 AL Haines
+#
+# Lookup structures for large dashboard_commands catalogs.
+#
+#   KeyTrie       - multi-key chord bindings. `key` may hold several
+#                   characters ("gd" = press g, then d); each key press walks
+#                   one level of the trie, so dispatch is O(chord length)
+#                   regardless of catalog size.
+#   CommandIndex  - fuzzy search over name, group and command string for the
+#                   command palette. Lower-cased fields and character sets are
+#                   computed once, so a keystroke only scores the commands that
+#                   can possibly match.
+#   group_commands - splits the catalog into menu sections by group_name.
+
+import re
+
+# Characters after which a match counts as the start of a word.
+WORD_BOUNDARIES = frozenset(" -_./:()")
+
+# Relative weight of each searchable field.
+NAME_WEIGHT = 1.0
+GROUP_WEIGHT = 0.8
+COMMAND_WEIGHT = 0.6
+
+
+class KeyTrie:
+    """
+    Prefix trie mapping key sequences to commands.
+    """
+
+    def __init__(self, commands=()):
+        self.root = {}
+        for command in commands:
+            self.insert(command.key, command)
+
+    def insert(self, sequence, command):
+        node = self.root
+        for char in sequence:
+            node = node.setdefault(char, {})
+        node[None] = command
+
+    def lookup(self, sequence):
+        """
+        Walks the trie along `sequence`.
+
+        Returns:
+            tuple: (command or None, True if longer chords start with this sequence).
+        """
+        node = self.root
+        for char in sequence:
+            node = node.get(char)
+            if node is None:
+                return None, False
+        return node.get(None), any(k is not None for k in node)
+
+
+def group_commands(commands):
+    """
+    Groups commands by group_name, keeping catalog order. Ungrouped commands
+    come first under the group None.
+
+    Returns:
+        list[tuple]: (group_name or None, [commands]) pairs.
+    """
+    groups = {None: []}
+    for command in commands:
+        groups.setdefault(command.group_name, []).append(command)
+    return [(name, members) for name, members in groups.items() if members]
+
+
+def fuzzy_match(query, text):
+    """
+    Scores `text` as a fuzzy (subsequence) match for `query`. Both must be
+    lower case. Consecutive characters and matches at word starts score
+    higher; every start position of the first character is tried.
+
+    Returns:
+        tuple or None: (score between 0 and 1, matched positions), or None.
+    """
+    if not query:
+        return 0.0, []
+    best = None
+    start = text.find(query[0])
+    while start != -1:
+        positions = [start]
+        score = 3 if start == 0 or text[start - 1] in WORD_BOUNDARIES else 1
+        pos = start
+        for char in query[1:]:
+            nxt = text.find(char, pos + 1)
+            if nxt == -1:
+                break
+            if nxt == pos + 1:
+                score += 3
+            elif text[nxt - 1] in WORD_BOUNDARIES:
+                score += 2
+            else:
+                score += 1
+            positions.append(nxt)
+            pos = nxt
+        else:
+            if best is None or score > best[0]:
+                best = (score, positions)
+        start = text.find(query[0], start + 1)
+    if best is None:
+        return None
+    return best[0] / (3 * len(query)), best[1]
+
+
+class CommandIndex:
+    """
+    Precomputed fuzzy-search index over a command catalog.
+    """
+
+    def __init__(self, commands):
+        self.commands = list(commands)
+        self.entries = []
+        for command in self.commands:
+            name = command.name.lower()
+            group = (command.group_name or '').lower()
+            command_string = command.command_string.lower()
+            self.entries.append((command, name, group, command_string,
+                                 frozenset(name) | frozenset(group) | frozenset(command_string)))
+
+    def __len__(self):
+        return len(self.commands)
+
+    def search(self, query, limit=50):
+        """
+        Finds commands matching `query`, best first. An exact key match always
+        ranks first.
+
+        Returns:
+            list[tuple]: (score, command, matched positions in the name) tuples.
+        """
+        query = re.sub(r'\s+', ' ', query.strip().lower())
+        if not query:
+            return [(0.0, command, []) for command in self.commands[:limit]]
+        needed = frozenset(query) - {' '}
+        results = []
+        for command, name, group, command_string, chars in self.entries:
+            if command.key.lower() == query:
+                results.append((2.0, command, []))
+                continue
+            if not needed <= chars:
+                continue
+            best, positions = 0.0, []
+            for text, weight, is_name in ((name, NAME_WEIGHT, True), (group, GROUP_WEIGHT, False),
+                                          (command_string, COMMAND_WEIGHT, False)):
+                match = fuzzy_match(query, text)
+                if match is not None and match[0] * weight > best:
+                    best = match[0] * weight
+                    positions = match[1] if is_name else []
+            if best:
+                results.append((best, command, positions))
+        results.sort(key=lambda r: r[0], reverse=True)
+        return results[:limit]
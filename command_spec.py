@@ -0,0 +1,123 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   command_spec.py
+#
+# Copyright 2026 AL Haines
+#
+# Parsed form of a dashboard_commands row.
+#
+# Rows are turned into CommandSpec objects once, when the catalog is loaded:
+# the flag columns become booleans and the command string is split into an
+# argv. A command that uses no shell syntax (pipes, redirection, variables,
+# globs, builtins, ...) is exec'd directly by runner.stream_command, which
+# saves starting a /bin/sh for every run. Anything else still goes through
+# the shell exactly as before.
+
+import shlex
+
+# Characters that only mean something to a shell. Quotes are fine: shlex
+# removes them the same way /bin/sh does.
+SHELL_CHARACTERS = frozenset('|&;<>()$`\\*?[]{}~#!\n\r')
+
+# Words that are not programs on PATH, so the command needs a shell.
+SHELL_WORDS = frozenset((
+    '.', ':', 'alias', 'bg', 'break', 'case', 'cd', 'command', 'continue', 'declare', 'do',
+    'done', 'elif', 'else', 'esac', 'eval', 'exec', 'exit', 'export', 'fg', 'fi', 'for',
+    'function', 'hash', 'if', 'jobs', 'let', 'local', 'read', 'readonly', 'return', 'select',
+    'set', 'shift', 'source', 'then', 'time', 'trap', 'type', 'ulimit', 'umask', 'unalias',
+    'unset', 'until', 'wait', 'while',
+))
+
+CATALOG_QUERY = ("SELECT `key`, `name`, `group_name`, `command_type`, `command_string`, `requires_input`, "
+                 "`quote_input`, `big_display`, `interval_seconds`, `background`, `hosts` "
+                 "FROM `dashboard_commands` WHERE `enabled` = 1 ORDER BY `sort_order`, `id`")
+
+def split_words(text):
+    """
+    Splits `text` into words the way /bin/sh would, or returns None if it
+    uses anything beyond plain words and quotes.
+    """
+    if not SHELL_CHARACTERS.isdisjoint(text):
+        return None
+    try:
+        return shlex.split(text)
+    except ValueError:      # Unbalanced quotes; let the shell report it.
+        return None
+
+
+def split_command(command_string):
+    """
+    Splits `command_string` into an argv if it can be exec'd without a shell.
+
+    Returns:
+        list or None: The words, or None if the command needs /bin/sh.
+    """
+    words = split_words(command_string or '')
+    if not words or words[0] in SHELL_WORDS or '=' in words[0]:
+        return None
+    return words
+
+
+def _flag(value, default=False):
+    """Reads a tinyint/str flag column; anything unparsable gives `default`."""
+    if value is None:
+        return default
+    try:
+        return int(value) != 0
+    except (ValueError, TypeError):
+        return default
+
+
+class CommandSpec:
+    """
+    One catalog command, normalised once at load time.
+    """
+
+    __slots__ = ('key', 'name', 'group_name', 'command_type', 'command_string', 'requires_input',
+                 'quote_input', 'big_display', 'interval_seconds', 'background', 'hosts', 'argv')
+
+    def __init__(self, row):
+        self.key = str(row['key'])
+        self.name = str(row.get('name') or '')
+        self.group_name = row.get('group_name') or None
+        self.command_type = row.get('command_type')
+        self.command_string = row.get('command_string') or ''
+        self.requires_input = _flag(row.get('requires_input'))
+        self.quote_input = _flag(row.get('quote_input'))
+        # 1 = fullscreen, 0 = log window; fullscreen unless clearly set to 0.
+        self.big_display = _flag(row.get('big_display'), default=True)
+        try:
+            self.interval_seconds = int(row.get('interval_seconds') or 0)
+        except (ValueError, TypeError):
+            self.interval_seconds = 0
+        self.background = _flag(row.get('background'))
+        self.hosts = row.get('hosts') or None
+        words = split_command(self.command_string)
+        self.argv = tuple(words) if words is not None else None
+
+    @property
+    def needs_shell(self) -> bool:
+        return self.argv is None
+
+    def argv_for(self, user_input=""):
+        """
+        Returns the argv for the command line build_command() makes with
+        `user_input`, or None if that line has to go through the shell.
+        """
+        if self.argv is None:
+            return None
+        if not user_input:
+            return list(self.argv)
+        if self.quote_input:
+            return [*self.argv, user_input]
+        words = split_words(user_input)
+        return None if words is None else [*self.argv, *words]
+
+    def __repr__(self):
+        return f"CommandSpec({self.key!r}, {self.command_string!r})"
+
+
+def load_specs(rows):
+    """Parses catalog rows, keeping their order."""
+    return [CommandSpec(row) for row in rows]
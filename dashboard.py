@@ -6,55 +6,582 @@
 # Copyright 2026 AL Haines
 
 import sys
-import shlex
+import os
+import signal
+import asyncio
+import argparse
 import subprocess
+import re
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from functools import partial
 sys.path.insert(0, '/home/al/system_files/projects')
 sys.path.insert(0, '/home/al/system_files/projects/py')
 
+import startup_profile
+startup_profile.install('dashboard')
+startup_profile.phase('imports.project')
+import tracing
+tracing.install('dashboard')
+
 try:
+    import config
     from MySql import MySQL
     from check_imports import ensure_module
-    from runner import stream_command
+    from runner import stream_command, stop_process
+    from terminal_lines import LineUpdate
     from dep_checker import DepChecker
+    from migrations import ensure_schema
+    from search_index import SearchIndex, fetch_entry
+    from journal_queue import pending_entries, spawn_flusher
+    from command_index import CommandIndex, KeyTrie, group_commands
+    from command_spec import CATALOG_QUERY, CommandSpec, load_specs
+    from output_cache import OutputCache, format_age
+    from scheduler import Scheduler, is_scheduled
+    from proc_metrics import (ProcSampler, ProcessTreeSampler, summary_lines, usage_summary, format_bytes,
+                              format_duration)
+    from run_manager import RunManager, build_command
+    from api_server import make_server, start_in_background
+    from output_buffer import OutputBuffer, Query, WrapMap
+    from workflow import WorkflowRun, WorkflowStore
+    from rund import RundClient, ensure_running
 except ImportError as e:
     print(f"ERROR: Critical modules not found: {e}", file=sys.stderr)
     sys.exit(1)
+tracing.instrument(MySQL)
 
+startup_profile.phase('deps.ensure_module')
 if not ensure_module('textual'):
     sys.exit("Error: 'textual' library is required but could not be installed. Exiting.")
 
+startup_profile.phase('imports.textual')
+from textual import work
+from textual.worker import get_current_worker
 from textual.app import App, ComposeResult
+from textual.binding import Binding
+from textual.command import DiscoveryHit, Hit, Provider
 from textual.containers import Container, Vertical
-from textual.widgets import Header, Footer, Static, Log, Input
+from textual.widgets import Header, Footer, Static, Log, Input, OptionList, DataTable
+from textual.widgets.option_list import Option
 from textual.message import Message
+from textual.widget import Widget
+from textual.geometry import Size
+from textual.strip import Strip
+from rich.style import Style
+from rich.text import Text
+from rich.cells import cell_len
+
+OUTPUT_DRAIN_INTERVAL = 1 / 20   # Seconds between moving streamed lines into the log.
+SEARCH_RESULT_LIMIT = 50
+SEARCH_REFRESH_SECONDS = 60
+CHORD_TIMEOUT = 0.8              # Seconds to wait for the next key of a multi-key chord.
+PALETTE_RESULT_LIMIT = 100
+SCHEDULER_TICK = 1.0             # Seconds between checks for due background commands.
+# Seconds between /proc samples for the metrics panel; set METRICS_INTERVAL = 0 in config.py to hide it.
+METRICS_INTERVAL = getattr(config, 'METRICS_INTERVAL', 0.5)
+RUN_STATS_INTERVAL = 1.0         # Seconds between CPU/RSS samples of the running command's processes.
+WORKFLOW_TICK = 1.0              # Seconds between refreshes of a running workflow's stage timings.
+WORKFLOW_COLUMNS = ("Stage", "Command", "Status", "Exit", "Time", "After")
+WORKFLOW_STATUS_STYLES = {'running': "bold yellow", 'waiting': "yellow", 'succeeded': "green", 'failed': "bold red",
+                          'stopped': "magenta", 'skipped': "dim"}
+FIND_DEBOUNCE = 0.15             # Seconds of typing pause before the find bar searches.
+FILTER_BATCH_SECONDS = 0.1       # How often the filter worker hands matching lines to the log.
+REVALIDATE_SWAP_SECONDS = 1.0    # Cached output stays up until the fresh run ends or has streamed this long.
+MATCH_STYLE = Style(bgcolor="#264f78")
+STALE_STYLE = Style(dim=True)
+CHANGED_STYLE = Style(bgcolor="#1f3a24")
+# CSI, OSC and two-character escape sequences; they take no cells on screen.
+ANSI_ESCAPE = re.compile(r'\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])')
 
 def get_dashboard_commands():
     db_manager = MySQL()
-    query = "SELECT `key`, `name`, `command_type`, `command_string`, `requires_input`, `quote_input`, `big_display` FROM `dashboard_commands` WHERE `enabled` = 1 ORDER BY `sort_order`, `id`"
     try:
-        commands = db_manager.get_data(query)
-        return commands
+        commands = db_manager.get_data(CATALOG_QUERY)
+        # Parsed once here: flags normalised, command strings split for direct exec.
+        return None if commands is None else load_specs(commands)
     except Exception as e:
         print(f"A database error occurred: {e}", file=sys.stderr)
         return None
 
 class CommandFinished(Message):
-    """Posted when a command worker has finished executing."""
-    pass
+    """
+    Posted when a command worker has finished executing. usage is the
+    child's struct_rusage (a usage_dict() for a run in the run daemon) and
+    wall its run time, if it ran to the end.
+    """
+
+    def __init__(self, run_id=None, usage=None, wall=None):
+        super().__init__()
+        self.run_id = run_id
+        self.usage = usage
+        self.wall = wall
+
+class WorkflowChanged(Message):
+    """Posted from a workflow's coordinator thread whenever one of its stages changes."""
+
+    def __init__(self, run):
+        super().__init__()
+        self.run = run
+
+class Sidebar(Container):
+    """The menu column."""
+
+class MetricCell(Widget):
+    """One fixed-height metrics row. Updating it repaints only this row, with no layout pass."""
+
+    text = ""
+
+    def set_text(self, text: str) -> None:
+        self.text = text
+        self.refresh()
+
+    def render(self) -> str:
+        return self.text
+
+class WorkflowTable(DataTable):
+    """Stages of the shown workflow run. Enter follows a stage's output in the log."""
+
+    BINDINGS = [
+        Binding("r", "app.resume_workflow", "Resume workflow"),
+        Binding("x", "app.stop_workflow", "Stop workflow"),
+    ]
+
+class MetricsPanel(Vertical):
+    """
+    Live host metrics from /proc. Every row is its own cell and is only
+    updated when its text changes, so unchanged rows are never repainted.
+    """
+
+    ROWS = ("cpu", "cores", "mem", "load", "disk", "net")
+
+    def __init__(self, interval: float, **kwargs):
+        super().__init__(**kwargs)
+        self.interval = interval
+        self.sampler = None
+        self.cells = {}
+        self.shown = {}
+
+    def compose(self) -> ComposeResult:
+        for row in self.ROWS:
+            yield MetricCell(id=f"metric-{row}", classes="metric")
+
+    def on_mount(self) -> None:
+        self.cells = {row: self.query_one(f"#metric-{row}", MetricCell) for row in self.ROWS}
+        self.sampler = ProcSampler()
+        self.sample()
+        self.set_interval(self.interval, self.sample)
+
+    def on_unmount(self) -> None:
+        if self.sampler is not None:
+            self.sampler.close()
+
+    def sample(self) -> None:
+        for row, text in summary_lines(self.sampler.sample()).items():
+            if self.shown.get(row) != text:
+                self.shown[row] = text
+                self.cells[row].set_text(text)
+
+class OutputLog(Log):
+    """
+    The output log plus an indexed copy of everything written to it, for the
+    find bar. In filter mode only matching lines are shown; output that keeps
+    streaming in is still indexed, and matching lines are appended live.
+
+    Lines are kept as the command printed them (ANSI colours included) and
+    soft-wrapped to the pane when drawn, so a resize reflows the output
+    without re-running anything: the WrapMap recounts rows from stored line
+    widths and only the rows in view are rendered.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.buffer = OutputBuffer()
+        self.generation = 0         # Bumped by clear() so stale filter results are dropped.
+        self.filter_query = None
+        self.filter_map = None      # Buffer index of each shown line while filtering.
+        self.filter_live = False    # Set once the filter worker has caught up with the buffer.
+        self.wrap = WrapMap()       # Soft-wrap layout of the lines shown.
+        self._full_view = None      # The unfiltered (lines, width, wrap) of the Log, parked while filtering.
+        self.match_index = None     # Buffer index of the highlighted match.
+        self.match_row = None       # Its row in the log as currently shown.
+        self.stale = False          # Showing cached output while the command runs again.
+        self.changed = set()        # Buffer indices of lines the previous run did not print.
+
+    @property
+    def filtering(self) -> bool:
+        return self.filter_map is not None
+
+    def write_lines(self, lines, scroll_end=None):
+        new_lines = []
+        for line in lines:
+            # Split the way Log does, but keep blank lines: LineUpdate.back counts them.
+            new_lines.extend(line.splitlines() or [""])
+        start = len(self.buffer)
+        self.buffer.extend(new_lines)
+        if not self.filtering:
+            self._show_lines(new_lines, scroll_end)
+            return self
+        if self.filter_live:
+            self.add_filtered(self.generation, list(self.buffer.iter_matches(self.filter_query, start)))
+        return self
+
+    def replace_line(self, index: int, line: str) -> None:
+        """
+        Replaces buffer line `index` in place (a progress bar being redrawn),
+        re-wrapping and repainting only that line.
+        """
+        if not 0 <= index < len(self.buffer):
+            return
+        self.buffer.replace(index, line)
+        width = self.display_width(line)
+        if self.filtering:
+            if self._full_view is not None and index < len(self._full_view[0]):
+                lines, full_width, wrap = self._full_view
+                lines[index] = line
+                wrap.set_width(index, width)
+                self._full_view = (lines, max(full_width, width), wrap)
+            row = bisect_left(self.filter_map, index)
+            if row == len(self.filter_map) or self.filter_map[row] != index:
+                return
+        else:
+            row = index
+        if row >= len(self._lines):
+            return
+        self._lines[row] = line
+        self._render_line_cache.discard(row)
+        self._width = max(self._width, width)
+        rows = self.wrap.rows
+        at_end = self.is_vertical_scroll_end
+        self.wrap.set_width(row, width)
+        if self.wrap.rows != rows:
+            self._relayout()
+            if at_end and self.auto_scroll and not self.is_vertical_scrollbar_grabbed:
+                self.scroll_end(animate=False, immediate=True, x_axis=False)
+        self.refresh()
+
+    def clear(self):
+        self.buffer.clear()
+        self.generation += 1
+        self.match_index = self.match_row = None
+        self.stale = False
+        self.changed = set()
+        if self.filtering:
+            # Keep filtering the next run's output as it arrives.
+            self.filter_map = []
+            self.filter_live = True
+            self._full_view = None
+        self.wrap = WrapMap()
+        return super().clear()
+
+    @staticmethod
+    def display_width(line: str) -> int:
+        """Cells `line` takes on screen, not counting escape sequences."""
+        if line.isascii() and line.isprintable():
+            return len(line)
+        if '\x1b' in line:
+            line = ANSI_ESCAPE.sub('', line)
+        return cell_len(Log._process_line(line))
+
+    def _show_lines(self, lines: list, scroll_end=None) -> None:
+        """
+        Appends already split lines to the Log and to its wrap layout. The
+        lines are measured here once, so Log's own measuring pass is skipped.
+        """
+        if not lines:
+            return
+        at_end = self.is_vertical_scroll_end
+        widths = [self.display_width(line) for line in lines]
+        self.wrap.extend(widths)
+        self._lines.extend(lines)
+        self._width = max(self._width, max(widths))
+        self._relayout()
+        auto_scroll = self.auto_scroll if scroll_end is None else scroll_end
+        if auto_scroll and at_end and not self.is_vertical_scrollbar_grabbed:
+            self.scroll_end(animate=False, immediate=True, x_axis=False)
+        else:
+            self.refresh()
+
+    def _relayout(self) -> None:
+        """Re-wraps to the current pane width; the virtual height is in display rows."""
+        width = self.scrollable_content_region.width
+        if width != self.wrap.width:
+            self.wrap.layout(width)
+        self.virtual_size = Size(width, self.wrap.rows)
+
+    def on_resize(self, event) -> None:
+        at_end = self.is_vertical_scroll_end
+        top = self.wrap.locate(self.scroll_offset.y)
+        self._relayout()
+        if at_end and self.auto_scroll:
+            self.scroll_end(animate=False, immediate=True, x_axis=False)
+        elif top is not None:
+            # Keep the line at the top of the view in place.
+            self.scroll_to(y=self.wrap.row_of(top[0]), animate=False, immediate=True)
+
+    def set_filter(self, query) -> None:
+        """
+        Shows only lines matching `query` (None shows everything again). The
+        matching lines are supplied by add_filtered(); see DashboardApp.filter_output.
+        """
+        self.generation += 1
+        self.filter_query = query
+        self.match_index = self.match_row = None
+        if query is not None:
+            if not self.filtering:
+                # Park the full view so leaving filter mode does not re-add every line
+                # (Log.clear() empties its line list in place, so give it a new one).
+                self._full_view = (self._lines, self._width, self.wrap)
+                self._lines = []
+            self.wrap = WrapMap()
+            super().clear()
+            self.filter_map = []
+            self.filter_live = False
+            return
+        if not self.filtering:
+            return
+        parked, self._full_view = self._full_view, None
+        self.filter_map = None
+        self.wrap = WrapMap()
+        super().clear()
+        if parked is None:
+            self._show_lines(self.buffer.lines, scroll_end=False)
+            return
+        self._lines, self._width, self.wrap = parked
+        self._relayout()
+        # Lines that arrived while filtering.
+        self._show_lines(self.buffer.lines[len(self._lines):], scroll_end=False)
+
+    def add_filtered(self, generation: int, indices: list) -> None:
+        if generation != self.generation or not indices:
+            return
+        lines = self.buffer.lines
+        self.filter_map.extend(indices)
+        self._show_lines([lines[i] for i in indices])
+
+    def filter_caught_up(self, generation: int, end: int) -> None:
+        """Adds matches among lines that arrived while the filter worker ran, then goes live."""
+        if generation != self.generation:
+            return
+        self.add_filtered(generation, list(self.buffer.iter_matches(self.filter_query, end)))
+        self.filter_live = True
+
+    def row_of(self, index: int) -> int:
+        """Row of buffer line `index` as shown (the first row at or after it when filtering)."""
+        return index if self.filter_map is None else bisect_left(self.filter_map, index)
+
+    def index_of(self, row: int):
+        if self.filter_map is None:
+            return row if row < len(self.buffer) else None
+        return self.filter_map[row] if row < len(self.filter_map) else None
+
+    def top_index(self):
+        """Buffer index of the line at the top of the view."""
+        location = self.wrap.locate(self.scroll_offset.y)
+        return None if location is None else self.index_of(location[0])
+
+    def show_match(self, index) -> None:
+        """Highlights buffer line `index` and scrolls it into the middle of the view."""
+        self.match_index = index
+        self.match_row = None if index is None else self.row_of(index)
+        if self.match_row is not None:
+            self.scroll_to(y=max(0, self.wrap.row_of(self.match_row) - self.size.height // 2), animate=False)
+        self.refresh()
+
+    def _render_line_strip(self, y: int, rich_style: Style) -> Strip:
+        line = self._lines[y]
+        if '\x1b' not in line or self.text_selection is not None:
+            return super()._render_line_strip(y, rich_style)
+        strip = self._render_line_cache.get(y)
+        if strip is None:
+            text = Text.from_ansi(line, no_wrap=True, end="")
+            text.expand_tabs()
+            text.stylize_before(rich_style)     # The command's own colours win.
+            if self.highlight:
+                text = self.highlighter(text)
+            strip = self._render_line_cache[y] = Strip(text.render(self.app.console), text.cell_len)
+        return strip
+
+    def render_line(self, y: int):
+        rich_style = self.rich_style
+        width = self.size.width
+        location = self.wrap.locate(self.scroll_offset.y + y)
+        if location is None:
+            return Strip.blank(width, rich_style)
+        line, part = location
+        span = self.wrap.width or width
+        start = part * span
+        strip = self._render_line_strip(line, rich_style).crop_extend(start, start + span, rich_style)
+        strip = strip.extend_cell_length(width, rich_style).apply_offsets(start, line)
+        if self.match_row is not None and line == self.match_row:
+            return strip.apply_style(MATCH_STYLE)
+        if self.stale:
+            return strip.apply_style(STALE_STYLE)
+        if self.changed and self.index_of(line) in self.changed:
+            strip = strip.apply_style(CHANGED_STYLE)
+        return strip
+
+def menu_label(command_data: CommandSpec, positions=()) -> Text:
+    """Formats a command's menu or palette line, highlighting fuzzy-matched name characters."""
+    label = Text.assemble((f"({command_data.key}) ", "bold"), command_data.name)
+    offset = len(command_data.key) + 3
+    for pos in positions:
+        label.stylize("bold yellow underline", offset + pos, offset + pos + 1)
+    if is_scheduled(command_data):
+        label.append(" \u21bb", style="dim")
+    return label
+
+class CommandsProvider(Provider):
+    """Command palette source: fuzzy search over the dashboard_commands catalog."""
+
+    async def discover(self):
+        for command_data in self.app.command_index.commands:
+            yield DiscoveryHit(menu_label(command_data), partial(self.app.activate_command, command_data),
+                               help=command_data.group_name)
+
+    async def search(self, query: str):
+        for score, command_data, positions in self.app.command_index.search(query, limit=PALETTE_RESULT_LIMIT):
+            yield Hit(min(score, 1.0), menu_label(command_data, positions),
+                      partial(self.app.activate_command, command_data),
+                      help=command_data.command_string)
+
+class WorkflowsProvider(Provider):
+    """Command palette source: run a workflow, or resume a run that failed or was stopped."""
+
+    def _entries(self):
+        app = self.app
+        for name, workflow in app.workflows.items():
+            yield f"Run workflow: {name}", partial(app.start_workflow, name), workflow.description or None
+        for row in app.workflow_runs:
+            yield (f"Resume workflow: {row['name']} (run #{row['id']}, {row['status']})",
+                   partial(app.resume_workflow_run, row['id']), None)
+        if app.workflow_run is not None:
+            run = app.workflow_run
+            yield f"Show workflow: {run.workflow.name} (run #{run.id}, {run.status})", app.show_workflow_pane, None
+
+    async def discover(self):
+        for text, callback, help_text in self._entries():
+            yield DiscoveryHit(text, callback, help=help_text)
+
+    async def search(self, query: str):
+        matcher = self.matcher(query)
+        for text, callback, help_text in self._entries():
+            score = matcher.match(text)
+            if score > 0:
+                yield Hit(score, matcher.highlight(text), callback, help=help_text)
+
+class RunsProvider(Provider):
+    """Command palette source: attach to a running or finished run in the run daemon."""
+
+    async def startup(self):
+        self.runs = []
+        if self.app.rund is not None:
+            try:
+                self.runs = await asyncio.to_thread(self.app.rund.runs)
+            except (OSError, ValueError):
+                pass
+
+    def _entries(self):
+        now = time.time()
+        for run in reversed(self.runs):
+            if run['finished_at']:
+                when = f"{run['status']} {format_duration(now - run['finished_at'])} ago"
+            elif run['started_at']:
+                when = f"running {format_duration(now - run['started_at'])}"
+            else:
+                when = run['status']
+            yield (f"Attach: ({run['key']}) {run['name']} (run #{run['id']}, {when})",
+                   partial(self.app.attach_run, run), f"{run['lines']} lines")
+
+    async def discover(self):
+        for text, callback, help_text in self._entries():
+            yield DiscoveryHit(text, callback, help=help_text)
+
+    async def search(self, query: str):
+        matcher = self.matcher(query)
+        for text, callback, help_text in self._entries():
+            score = matcher.match(text)
+            if score > 0:
+                yield Hit(score, matcher.highlight(text), callback, help=help_text)
 
 class DashboardApp(App):
     CSS_PATH = "dashboard.css"
-    BINDINGS = [("q", "quit", "Quit")]
+    AUTO_FOCUS = "#menu"
+    COMMANDS = App.COMMANDS | {CommandsProvider, WorkflowsProvider, RunsProvider}
+    BINDINGS = [
+        ("q", "quit", "Quit"),
+        ("slash", "open_search", "Search"),
+        Binding("ctrl+f", "open_find", "Find"),
+        Binding("f3", "find_next", "Next match", show=False),
+        Binding("shift+f3", "find_previous", "Previous match", show=False),
+        Binding("ctrl+r", "toggle_find_regex", "Regex", show=False),
+        Binding("ctrl+t", "toggle_find_filter", "Filter", show=False),
+        Binding("ctrl+x", "stop_run", "Stop run", show=False),
+        Binding("escape", "close_panels", "Close search", show=False),
+    ]
 
-    def __init__(self):
+    def __init__(self, api_socket=None, api_port=None, serve_api=False, start_rund=False):
+        startup_profile.phase('app.init')
         super().__init__()
+        self.api_options = {'socket_path': api_socket, 'port': api_port} if serve_api else None
+        self.api_server = None
+        # Client of the run daemon (rund.py) once it is found after the first
+        # frame; log-mode commands then run there and outlive the dashboard.
+        self.rund = None
+        self._start_rund = start_rund
+        startup_profile.phase('deps.check')
         self.check_system_dependencies()
+        startup_profile.phase('schema')
+        if not ensure_schema():
+            sys.exit("CRITICAL: Failed to bring the database schema up to date.")
 
+        startup_profile.phase('catalog')
         raw_commands = get_dashboard_commands()
         if raw_commands is None:
             sys.exit("CRITICAL: Failed to load commands from database.")
-        self.command_map = {cmd['key']: cmd for cmd in raw_commands}
+        self.command_map = {cmd.key: cmd for cmd in raw_commands}
+        self.command_index = CommandIndex(raw_commands)
+        self.key_trie = KeyTrie(raw_commands)
+        self._chord = ""
+        self._chord_command = None
+        self._chord_timer = None
+        self.output_cache = OutputCache()
+        self.scheduler = Scheduler(raw_commands, self.output_cache)
+        self._cached_view = None
+        # Run slots shared with the API server when it runs in this process.
+        self.run_manager = RunManager()
         self.active_command = None
+        self.search_index = None
+        self._search_index_loading = False
+        # Output from the command worker thread is queued here as (run_id, line)
+        # and moved into the log in batches on the UI thread.
+        self._pending_output = deque()
+        self._run_id = 0
+        self._active_process = None
+        # Output stream and summary of the run daemon's run the log is following.
+        self._rund_stream = None
+        self._rund_run = None
+        self._process_lock = threading.Lock()
+        # Stale-while-revalidate: cached output of the current run's command stays
+        # on screen while fresh output collects in _fresh_output (see _drain_output).
+        self._stale_run = None
+        self._fresh_output = []
+        self._fresh_started = 0.0
+        self._previous_lines = None
+        self._run_title = ""
+        # Live CPU/RSS of the current run's process tree (see _sample_run).
+        self._run_name = ""
+        self._run_started = 0.0
+        self._tree_sampler = None
+        # Workflows (see workflow.py), loaded after the first frame.
+        self.workflows = {}
+        self.workflow_runs = []     # Recent failed or stopped runs, offered for resuming.
+        self.workflow_run = None    # The run shown in the workflow pane.
+        # Find bar state (see the find-in-output section below).
+        self.find_regex = False
+        self.find_filter = False
+        self._find_timer = None
 
     def check_system_dependencies(self):
         """Validates critical modules using DepChecker."""
@@ -63,83 +590,400 @@ class DashboardApp(App):
         checker('textual')
 
     def compose(self) -> ComposeResult:
+        startup_profile.phase('compose')
         yield Header(name="Haines Homelab Dashboard")
         yield Footer()
         with Container(id="app-grid"):
-            with Container(id="sidebar-container"):
+            with Sidebar(id="sidebar-container"):
                 yield Static("MENU", id="sidebar-title")
                 if self.command_map:
-                    for key, command_data in self.command_map.items():
-                        menu_line = f" ({key}) {command_data.get('name')}"
-                        yield Static(menu_line)
+                    # OptionList only renders the rows on screen, so large catalogs stay cheap.
+                    yield OptionList(*self.menu_options(), id="menu")
                 else:
                     yield Static("No commands found in database.")
+                if METRICS_INTERVAL and os.path.exists('/proc/stat'):
+                    yield MetricsPanel(METRICS_INTERVAL, id="metrics-panel")
             with Vertical(id="main-container"):
-                yield Log(id="output-log", highlight=True)
+                with Vertical(id="search-pane", classes="hidden"):
+                    yield Input(placeholder="Search journal and past AI answers...", id="search-input")
+                    yield OptionList(id="search-results")
+                with Vertical(id="workflow-pane", classes="hidden"):
+                    yield Static(id="workflow-title")
+                    yield WorkflowTable(id="workflow-stages", cursor_type="row")
+                yield MetricCell(id="run-stats", classes="hidden")
+                yield OutputLog(id="output-log", highlight=True)
+                yield Input(placeholder="Find in output...", id="find-input", classes="hidden")
                 yield Input(placeholder="Enter your input here...", id="command-input", classes="hidden")
 
     def on_mount(self) -> None:
+        startup_profile.phase('mount')
         log = self.query_one(Log)
         log.write_line("Welcome to your Homelab Dashboard.")
         log.write_line("Press a key from the menu to run a command.")
-        self.query_one("#sidebar-container").focus()
+        self.set_interval(OUTPUT_DRAIN_INTERVAL, self._drain_output)
+        if os.path.isdir('/proc/self/task'):
+            self.set_interval(RUN_STATS_INTERVAL, self._sample_run)
+        if self.scheduler:
+            self.set_interval(SCHEDULER_TICK, self._scheduler_tick)
+        self.set_interval(WORKFLOW_TICK, self._workflow_tick)
+        if self.api_options is not None:
+            self.start_api_server()
+        if pending_entries():
+            # Journal entries left queued by a crash or an unreachable database.
+            spawn_flusher()
+        self.focus_menu()
+        self.call_after_refresh(self._first_frame)
+
+    def _first_frame(self) -> None:
+        """Ends the startup profile once the first frame has been drawn."""
+        startup_profile.mark('first_frame')
+        path = startup_profile.finish()
+        if path:
+            self.notify(f"Startup profile written to {path}")
+        self.load_workflows()
+        self.connect_rund()
 
     def on_command_finished(self, message: CommandFinished) -> None:
-        self.query_one("#sidebar-container").focus()
+        if message.run_id is not None and message.run_id == self._stale_run:
+            self._drain_output()
+            self._show_fresh_output()
+        if message.run_id is not None and message.run_id == self._run_id and message.usage is not None:
+            peak_rss = self._tree_sampler.peak_rss if self._tree_sampler is not None else None
+            summary = usage_summary(message.usage, message.wall, peak_rss)
+            self._drain_output()
+            # Written past _write_run_lines: not part of the output, so never cached or marked as changed.
+            self.query_one(OutputLog).write_line(f"--- {summary} ---")
+            self._show_run_stats(f"{self._run_name} finished: {summary}")
+        if not self._panel_has_focus():
+            self.focus_menu()
+
+    def _panel_has_focus(self) -> bool:
+        """True while the search pane, the find bar or the workflow pane has the keyboard."""
+        focused = self.focused
+        return focused is not None and focused.id in ("search-input", "search-results", "find-input",
+                                                      "workflow-stages")
+
+    def menu_options(self) -> list:
+        """Builds the menu rows, with a disabled heading per group_name."""
+        options = []
+        for group, members in group_commands(self.command_map.values()):
+            if group is not None:
+                options.append(Option(Text(group, style="bold underline"), disabled=True))
+            options.extend(Option(menu_label(command_data), id=command_data.key) for command_data in members)
+        return options
+
+    def focus_menu(self) -> None:
+        for menu in self.query("#menu"):
+            menu.focus()
 
+    @tracing.traced(cat='ui')
     def on_key(self, event) -> None:
-        if event.key in self.command_map:
-            command_data = self.command_map[event.key]
-
-            if command_data.get('requires_input'):
-                self.active_command = command_data
-                inp = self.query_one("#command-input")
-                log = self.query_one(Log)
-                log.clear()
-                log.write_line(f"Input required for '{command_data['name']}'.")
-                inp.placeholder = f"Enter text for '{command_data['name']}' and press Enter"
-                inp.remove_class("hidden")
-                inp.focus()
-            else:
-                self.dispatch_command(command_data)
+        if self._panel_has_focus() or self.screen is not self.screen_stack[0]:
+            return
+        char = event.character
+        if not char or not char.isprintable():
+            return
+        sequence = self._chord + char
+        command_data, has_longer = self.key_trie.lookup(sequence)
+        if command_data is None and not has_longer and self._chord:
+            # Not a continuation of the pending chord: start over with this key.
+            sequence = char
+            command_data, has_longer = self.key_trie.lookup(sequence)
+        self._reset_chord()
+        if has_longer:
+            # Wait for the next key; if none comes, run the command bound to the prefix (if any).
+            self._chord = sequence
+            self._chord_command = command_data
+            self._chord_timer = self.set_timer(CHORD_TIMEOUT, self._chord_timed_out)
+            self.sub_title = f"{sequence}-"
+        elif command_data is not None:
+            self.activate_command(command_data)
 
-    def dispatch_command(self, command_data: dict, user_input: str = "") -> None:
-        final_command = command_data['command_string']
-        if user_input:
-            if command_data.get('quote_input'):
-                final_command += " " + shlex.quote(user_input)
-            else:
-                final_command += " " + user_input
+    def _reset_chord(self) -> None:
+        if self._chord_timer is not None:
+            self._chord_timer.stop()
+        if self._chord:
+            self.sub_title = ""
+        self._chord = ""
+        self._chord_command = None
+        self._chord_timer = None
 
-        # Robustly parse big_display flag: 1 = fullscreen, 0 = log window
-        raw_big = command_data.get('big_display', 1)
-        try:
-            is_big = int(raw_big) if raw_big is not None else 1
-        except (ValueError, TypeError):
-            is_big = 1
+    def _chord_timed_out(self) -> None:
+        command_data = self._chord_command
+        self._reset_chord()
+        if command_data is not None:
+            self.activate_command(command_data)
 
-        if is_big == 1:
-            self.run_fullscreen_app(final_command)
+    @tracing.traced(cat='ui')
+    def activate_command(self, command_data: CommandSpec) -> None:
+        """Runs a command chosen by key, menu or palette, asking for input first if needed."""
+        key = command_data.key
+        if self.scheduler.is_scheduled(key) and self._cached_view != key and self.show_cached_output(key):
+            # Background commands show their last result; choosing them again runs them now.
+            return
+        self._cached_view = None
+        if command_data.requires_input:
+            self.active_command = command_data
+            inp = self.query_one("#command-input")
+            log = self.query_one(Log)
+            log.clear()
+            log.write_line(f"Input required for '{command_data.name}'.")
+            inp.placeholder = f"Enter text for '{command_data.name}' and press Enter"
+            inp.remove_class("hidden")
+            inp.focus()
         else:
-            self.run_command_in_log(final_command, command_data)
+            self.dispatch_command(command_data)
 
-    def run_fullscreen_app(self, command_string: str) -> None:
+    @tracing.traced(cat='ui')
+    def dispatch_command(self, command_data: CommandSpec, user_input: str = "") -> None:
+        """Runs a command with its input: full screen for big_display commands, otherwise in the log."""
+        final_command = build_command(command_data, user_input)
+        argv = command_data.argv_for(user_input)
+        if command_data.big_display and not command_data.hosts:
+            self.run_fullscreen_app(final_command, argv)
+        else:
+            self.run_command_in_log(final_command, command_data, argv, user_input)
+
+    def run_fullscreen_app(self, command_string: str, argv=None) -> None:
         with self.suspend():
             try:
-                subprocess.run(f"clear && {command_string}", shell=True)
+                # What 'clear' prints, without starting it (or a shell) for every run.
+                sys.stdout.write("\x1b[H\x1b[2J\x1b[3J")
+                sys.stdout.flush()
+                try:
+                    subprocess.run(argv or command_string, shell=not argv)
+                except OSError:
+                    if not argv:
+                        raise
+                    subprocess.run(command_string, shell=True)
                 input("\nPress Enter to return to the dashboard...")
             except Exception as e:
                 print(f"Error running command '{command_string}': {e}")
                 input("Press Enter to continue...")
 
-    def run_command_in_log(self, final_command: str, command_data: dict) -> None:
-        log = self.query_one(Log)
+    @tracing.traced(cat='ui')
+    def run_command_in_log(self, final_command: str, command_data: CommandSpec, argv=None, user_input: str = "") -> None:
+        self.stop_active_command()
+        self.workers.cancel_group(self, "workflow-output")
+        self._run_id += 1
+        tracing.flow('run', self._run_id, start=True)
+        self._run_title = f"Running '{command_data.name}'..."
+        self._run_name = f"'{command_data.name}'"
+        self._run_started = time.monotonic()
+        self._tree_sampler = None
+        self._show_run_stats(f"{self._run_name} starting...")
+        # Output of runs with user input depends on the input, so only plain runs are cached.
+        cache_key = command_data.key if final_command == command_data.command_string else None
+        entry = self.output_cache.get(cache_key) if cache_key else None
+        log = self.query_one(OutputLog)
+        log.clear()
+        if entry is None:
+            self._stale_run = None
+            self._previous_lines = None
+            log.write_line(self._run_title)
+        else:
+            # Show the last output right away; the fresh run replaces it (see _drain_output).
+            self._stale_run = self._run_id
+            self._fresh_output = []
+            self._fresh_started = time.monotonic()
+            self._previous_lines = set(entry['lines'])
+            log.write_line(f"'{command_data.name}' - output from {format_age(OutputCache.age(entry))} ago "
+                           f"(stale), running it again...")
+            log.write_lines(entry['lines'])
+            log.stale = True
+        self.query_one("#command-input").add_class("hidden")
+        pane = log.scrollable_content_region
+        if self.rund is not None:
+            work = partial(self.execute_in_rund, command_data, user_input, self._run_id, cache_key,
+                           pane.width, pane.height, argv)
+        else:
+            work = partial(self.execute_command_and_update_log, final_command, command_data.command_type,
+                           self._run_id, command_data.hosts, cache_key, pane.width, pane.height, argv)
+        self.run_worker(work, exclusive=True, thread=True, group="command")
+
+    def attach_run(self, run: dict) -> None:
+        """Shows a run of the run daemon in the log, whole scrollback first, and follows it."""
+        if self.rund is None:
+            return
+        self.stop_active_command()
+        self.workers.cancel_group(self, "workflow-output")
+        self._run_id += 1
+        self._stale_run = None
+        self._previous_lines = None
+        self._cached_view = None
+        self._run_title = f"Attached to '{run['name']}' (run #{run['id']}):"
+        self._run_name = f"'{run['name']}'"
+        self._run_started = time.monotonic() - (time.time() - (run['started_at'] or time.time()))
+        self._tree_sampler = None
+        self._show_run_stats(f"{self._run_name} {run['status']}")
+        log = self.query_one(OutputLog)
         log.clear()
-        log.write_line(f"Running '{command_data['name']}'...")
+        log.write_line(self._run_title)
         self.query_one("#command-input").add_class("hidden")
-        self.run_worker(self.execute_command_and_update_log(final_command, command_data['command_type']), exclusive=True)
+        self.run_worker(partial(self.execute_in_rund, self.command_map.get(run['key']), "", self._run_id, attach=run),
+                        exclusive=True, thread=True, group="command")
+
+    @work(thread=True, exclusive=True, group="rund")
+    def connect_rund(self) -> None:
+        """Looks for the run daemon, starting it first with --rund."""
+        if self._start_rund:
+            client = ensure_running()
+            if client is None:
+                self.call_from_thread(self.notify, "Could not start the run daemon (see rund.log); "
+                                      "commands run in the dashboard.", severity="warning")
+                return
+        else:
+            client = RundClient()
+            if client.status() is None:
+                return
+        self.rund = client
+        self.call_from_thread(self.notify, "Log-mode commands run in the run daemon: quitting leaves them running.")
+
+    @work(thread=True, group="rund")
+    def stop_rund_run(self, run_id: int) -> None:
+        try:
+            self.rund.stop(run_id)
+        except (OSError, ValueError) as e:
+            self.call_from_thread(self.notify, f"Could not stop run #{run_id}: {e}", severity="error")
+
+    def _write_run_lines(self, log: OutputLog, lines: list) -> None:
+        """Writes output of the current run, marking lines its previous run did not print."""
+        start = len(log.buffer)
+        log.write_lines(lines)
+        previous = self._previous_lines
+        if previous is not None:
+            buffered = log.buffer.lines
+            log.changed.update(i for i in range(start, len(buffered)) if buffered[i] not in previous)
+
+    def _replace_run_line(self, log: OutputLog, index: int, line: str) -> None:
+        """Replaces a line of the current run in place, keeping its changed-line mark in step."""
+        log.replace_line(index, line)
+        if self._previous_lines is not None:
+            if line in self._previous_lines:
+                log.changed.discard(index)
+            else:
+                log.changed.add(index)
+
+    def _show_fresh_output(self) -> None:
+        """Replaces the stale cached output with what the fresh run has printed so far."""
+        if self._stale_run != self._run_id:
+            return
+        self._stale_run = None
+        lines, self._fresh_output = self._fresh_output, []
+        log = self.query_one(OutputLog)
+        with tracing.span('log.swap_fresh', 'render', lines=len(lines)):
+            log.clear()
+            log.write_line(self._run_title)
+            self._write_run_lines(log, lines)
+
+    def _show_run_stats(self, text: str) -> None:
+        cell = self.query_one("#run-stats", MetricCell)
+        cell.remove_class("hidden")
+        cell.set_text(Text(text))
+
+    def _sample_run(self) -> None:
+        """Shows CPU and RSS of the running command and its descendants above the log."""
+        with self._process_lock:
+            process = self._active_process
+            run = self._rund_run
+        if process is not None:
+            pid = getattr(process, 'pid', None)     # Remote runs have no local process tree.
+            if pid is None or process.returncode is not None:
+                return
+        elif run is not None and run.get('pid'):
+            pid = run['pid']                        # A child of the run daemon, on this host as well.
+        else:
+            return
+        if self._tree_sampler is None or self._tree_sampler.pid != pid:
+            self._tree_sampler = ProcessTreeSampler(pid)
+        sample = self._tree_sampler.sample()
+        if not sample['procs']:
+            return
+        cpu = "-" if sample['cpu'] is None else f"{sample['cpu']:.0f}%"
+        procs = sample['procs']
+        self._show_run_stats(f"{self._run_name} running {format_duration(time.monotonic() - self._run_started)}  "
+                             f"CPU {cpu}  RSS {format_bytes(sample['rss'])}  {procs} process{'es' if procs != 1 else ''}")
+
+    def _set_active_process(self, process) -> None:
+        with self._process_lock:
+            self._active_process = process
+
+    def stop_active_command(self) -> None:
+        """
+        Stops the child of the current log-mode run, if one is still running.
+        A run in the run daemon is only detached from; it goes on there.
+        """
+        with self._process_lock:
+            process, self._active_process = self._active_process, None
+            stream, self._rund_stream = self._rund_stream, None
+            self._rund_run = None
+        stop_process(process)
+        if stream is not None:
+            stream.close()
+
+    def action_stop_run(self) -> None:
+        """Stops the current log-mode run, in the run daemon too."""
+        with self._process_lock:
+            run = self._rund_run
+        if run is not None:
+            self.stop_rund_run(run['id'])
+        else:
+            self.stop_active_command()
+
+    async def action_quit(self) -> None:
+        self.stop_active_command()
+        self.exit()
+
+    def on_unmount(self) -> None:
+        self.stop_active_command()
+        if self.workflow_run is not None and not self.workflow_run.done:
+            self.workflow_run.stop()
+        self.scheduler.shutdown()
+        if self.api_server is not None:
+            self.api_server.shutdown()
+            self.api_server.server_close()
+            self.run_manager.stop_all()
+
+    def start_api_server(self) -> None:
+        try:
+            self.api_server = make_server(self.command_map, self.run_manager, **self.api_options)
+        except OSError as e:
+            self.notify(f"Could not start the API server: {e}", severity="error")
+            return
+        start_in_background(self.api_server)
+        self.notify(f"API listening on {self.api_server.address_label}")
+
+    def _scheduler_tick(self) -> None:
+        finished = self.scheduler.tick()
+        if self._cached_view in finished:
+            self.show_cached_output(self._cached_view)
+
+    def show_cached_output(self, key: str) -> bool:
+        """Shows the last scheduled run of a command in the log. False if there is none yet."""
+        entry = self.output_cache.get(key)
+        if entry is None:
+            return False
+        command_data = self.command_map[key]
+        status = "" if entry.get('returncode') in (None, 0) else f", exit code {entry['returncode']}"
+        self._stale_run = None
+        log = self.query_one(Log)
+        log.clear()
+        log.write_line(f"'{command_data.name}' - last run {format_age(OutputCache.age(entry))} ago{status}. "
+                       f"Press ({key}) again to run it now.")
+        log.write_lines(entry['lines'])
+        self._cached_view = key
+        return True
 
     async def on_input_submitted(self, event: Input.Submitted) -> None:
+        if event.input.id == "find-input":
+            self.action_find_next()
+            return
+        if event.input.id == "search-input":
+            results = self.query_one("#search-results", OptionList)
+            if results.option_count:
+                results.highlighted = results.highlighted or 0
+                results.action_select()
+            return
         user_input = event.value
         if self.active_command and user_input:
             cmd = self.active_command
@@ -147,18 +991,621 @@ class DashboardApp(App):
             event.input.value = ""
             self.dispatch_command(cmd, user_input)
 
-    async def execute_command_and_update_log(self, command_string: str, command_type: str) -> None:
-        log = self.query_one("#output-log")
+    # --- Search-as-you-type over the journal and past AI answers ---
+
+    def action_open_search(self) -> None:
+        self.query_one("#search-pane").remove_class("hidden")
+        self.query_one("#search-input").focus()
+        if self.search_index is None and not self._search_index_loading:
+            self._search_index_loading = True
+            self.query_one("#search-input").placeholder = "Loading search index..."
+            self.load_search_index()
+
+    def action_close_search(self) -> None:
+        self.query_one("#search-pane").add_class("hidden")
+        self.focus_menu()
+
+    def action_close_panels(self) -> None:
+        """Escape closes the find bar or the workflow pane if it has focus, otherwise the search pane."""
+        focused_id = self.focused.id if self.focused is not None else None
+        if focused_id == "find-input":
+            self.action_close_find()
+        elif focused_id == "workflow-stages":
+            self.action_close_workflow()
+        else:
+            self.action_close_search()
+
+    @work(thread=True, exclusive=True, group="search-index")
+    def load_search_index(self) -> None:
+        """Loads the cached index, makes it searchable, then tops it up from the DB."""
+        index = SearchIndex()
+        index.load()
+        self.call_from_thread(self._search_index_ready, index)
+        if index.refresh():
+            index.save()
+            self.call_from_thread(self.update_search_results)
+
+    def _search_index_ready(self, index: SearchIndex) -> None:
+        self.search_index = index
+        self.query_one("#search-input").placeholder = f"Search {len(index)} journal entries and AI answers..."
+        self.update_search_results()
+        self.set_interval(SEARCH_REFRESH_SECONDS, self.refresh_search_index)
+
+    @work(thread=True, exclusive=True, group="search-index")
+    def refresh_search_index(self) -> None:
+        """Pulls rows above the id high-water marks into the index."""
+        if self.search_index is not None and self.search_index.refresh():
+            self.search_index.save()
+            self.call_from_thread(self.update_search_results)
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "search-input":
+            self.update_search_results()
+        elif event.input.id == "find-input":
+            # Wait for a pause in typing; each search starts from the index, not a full re-scan.
+            if self._find_timer is not None:
+                self._find_timer.stop()
+            self._find_timer = self.set_timer(FIND_DEBOUNCE, self.run_find)
+
+    def update_search_results(self) -> None:
+        if self.search_index is None:
+            return
+        query = self.query_one("#search-input", Input).value
+        results = self.query_one("#search-results", OptionList)
+        results.clear_options()
+        results.add_options(
+            Option(Text.assemble((f"{source:>12} ", "yellow"), (f"{row_id:>7}  ", "magenta"), snippet),
+                   id=f"{source}:{row_id}")
+            for source, row_id, snippet, _score in self.search_index.search(query, limit=SEARCH_RESULT_LIMIT)
+        )
+
+    def on_option_list_option_selected(self, event: OptionList.OptionSelected) -> None:
+        if event.option_list.id == "menu":
+            self.activate_command(self.command_map[event.option.id])
+        elif event.option_list.id == "search-results" and event.option.id:
+            source, row_id = event.option.id.split(":", 1)
+            self.show_search_hit(source, int(row_id))
+
+    @work(thread=True, exclusive=True, group="search-hit")
+    def show_search_hit(self, source: str, row_id: int) -> None:
+        """Fetches the selected entry and shows it in the output log."""
+        record = fetch_entry(source, row_id)
+        lines = [f"--- {source} #{row_id} ---"]
+        if record:
+            for key, value in record.items():
+                lines.append(f"{key.upper()}:")
+                lines.extend(str(value if value is not None else "NULL").splitlines() or [""])
+        else:
+            lines.append("Record not found.")
+        self.call_from_thread(self._show_lines, lines)
+
+    def _show_lines(self, lines: list) -> None:
+        self._cached_view = None
+        log = self.query_one(Log)
         log.clear()
+        log.write_lines(lines)
+        log.scroll_home(animate=False)
+
+    # --- Workflows ---
+
+    @work(thread=True, exclusive=True, group="workflow-list")
+    def load_workflows(self) -> None:
+        """Loads the workflow definitions and the runs that can be resumed, for the command palette."""
+        store = WorkflowStore(MySQL(exit_on_connect_error=False))
+        workflows = store.load_workflows()
+        if workflows is None:
+            return
+        runs = store.recent_runs(statuses=('failed', 'stopped'))
+        self.call_from_thread(self._workflows_loaded, workflows, runs)
+
+    def _workflows_loaded(self, workflows: dict, runs: list) -> None:
+        self.workflows = workflows
+        self.workflow_runs = runs
+
+    def _workflow_busy(self) -> bool:
+        run = self.workflow_run
+        if run is None or run.done:
+            return False
+        self.notify(f"Workflow '{run.workflow.name}' is still running.", severity="warning")
+        self.show_workflow_pane()
+        return True
+
+    def start_workflow(self, name: str) -> None:
+        if not self._workflow_busy():
+            self.launch_workflow(name)
+
+    def resume_workflow_run(self, run_id: int) -> None:
+        if not self._workflow_busy():
+            self.launch_workflow(None, run_id)
+
+    @work(thread=True, exclusive=True, group="workflow")
+    def launch_workflow(self, name, run_id=None) -> None:
+        """Records and starts a run of workflow `name`, or the next attempt of run `run_id`."""
+        store = WorkflowStore(MySQL(exit_on_connect_error=False))
+        on_change = lambda run: self.post_message(WorkflowChanged(run))
         try:
-            for line in stream_command(command_string, command_type):
-                log.write_line(line)
-        except Exception as e:
-            log.write_line(f"An error occurred in the dashboard worker: {e}")
+            if run_id is None:
+                run = WorkflowRun(self.workflows[name], self.command_map, self.run_manager, store, on_change)
+            else:
+                run = WorkflowRun.resume(run_id, self.workflows, self.command_map, self.run_manager, store,
+                                         on_change)
+            run.start()
+        except ValueError as e:
+            self.call_from_thread(self.notify, str(e), severity="error", timeout=10)
+            return
+        self.call_from_thread(self._show_workflow, run)
+
+    def _show_workflow(self, run) -> None:
+        self.workflow_run = run
+        table = self.query_one("#workflow-stages", DataTable)
+        table.clear(columns=True)
+        for column in WORKFLOW_COLUMNS:
+            table.add_column(column, key=column)
+        for name, state in run.stages.items():
+            table.add_row(*self._stage_cells(state), key=name)
+        self._refresh_workflow()
+        self.show_workflow_pane()
+
+    def show_workflow_pane(self) -> None:
+        if self.workflow_run is None:
+            return
+        self.query_one("#workflow-pane").remove_class("hidden")
+        self.query_one("#workflow-stages").focus()
+
+    def action_close_workflow(self) -> None:
+        self.query_one("#workflow-pane").add_class("hidden")
+        self.focus_menu()
+
+    def _stage_cells(self, state) -> tuple:
+        stage = state.stage
+        command_data = self.command_map.get(stage.command_key)
+        status = 'waiting' if state.waiting else state.status
+        elapsed = state.elapsed()
+        label = f"{status} (earlier)" if state.reused else status
+        return (stage.name, f"({stage.command_key}) {command_data.name if command_data else '?'}",
+                Text(label, style=WORKFLOW_STATUS_STYLES.get(status, "")),
+                "" if state.exit_code is None else str(state.exit_code),
+                "" if elapsed is None else format_duration(elapsed), stage.condition())
+
+    def _refresh_workflow(self) -> None:
+        run = self.workflow_run
+        if run is None:
+            return
+        table = self.query_one("#workflow-stages", DataTable)
+        for name, state in run.stages.items():
+            for column, value in zip(WORKFLOW_COLUMNS, self._stage_cells(state)):
+                table.update_cell(name, column, value)
+        counts = run.counts()
+        progress = ", ".join(f"{count} {status}" for status, count in counts.items())
+        keys = "r: resume" if run.done and run.status != 'succeeded' else "x: stop" if not run.done else ""
+        self.query_one("#workflow-title", Static).update(
+            f"Workflow '{run.workflow.name}' run #{run.id}, attempt {run.attempt}: {run.status} "
+            f"in {format_duration(run.elapsed() or 0)} ({progress}) - Enter: output"
+            f"{', ' + keys if keys else ''}, Esc: close")
+
+    def _workflow_tick(self) -> None:
+        run = self.workflow_run
+        if run is not None and not run.done and not self.query_one("#workflow-pane").has_class("hidden"):
+            self._refresh_workflow()
+
+    def on_workflow_changed(self, message: WorkflowChanged) -> None:
+        run = message.run
+        if run is not self.workflow_run:
+            return
+        self._refresh_workflow()
+        if run.done:
+            self.notify(f"Workflow '{run.workflow.name}' {run.status} in {format_duration(run.elapsed() or 0)}.",
+                        severity="information" if run.status == 'succeeded' else "warning")
+            self.load_workflows()
+
+    def action_stop_workflow(self) -> None:
+        run = self.workflow_run
+        if run is not None and not run.done:
+            run.stop()
+            self.notify(f"Stopping workflow '{run.workflow.name}'...")
+
+    def action_resume_workflow(self) -> None:
+        run = self.workflow_run
+        if run is None or self._workflow_busy():
+            return
+        if run.status == 'succeeded':
+            self.notify(f"Workflow run #{run.id} succeeded; nothing to resume.")
+            return
+        self.launch_workflow(None, run.id)
+
+    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
+        if event.data_table.id == "workflow-stages" and self.workflow_run is not None:
+            self.show_stage_output(event.row_key.value)
+
+    def show_stage_output(self, name: str) -> None:
+        """Shows a stage's output in the log, following it while the stage runs."""
+        run = self.workflow_run
+        state = run.stages[name]
+        command_data = self.command_map.get(state.stage.command_key)
+        # The log shows one thing at a time, as when a command is run.
+        self.stop_active_command()
+        self._run_id += 1
+        self._stale_run = None
+        self._previous_lines = None
+        self._cached_view = None
+        log = self.query_one(OutputLog)
+        log.clear()
+        log.write_line(f"Workflow '{run.workflow.name}', stage '{name}' - "
+                       f"'{command_data.name if command_data else state.stage.command_key}':")
+        self.follow_stage_output(run, name, self._run_id)
+
+    @work(thread=True, exclusive=True, group="workflow-output")
+    def follow_stage_output(self, run, name: str, run_id: int) -> None:
+        """Feeds a stage's output into the log through the output queue (see _drain_output)."""
+        worker = get_current_worker()
+        state = run.stages[name]
+        while state.run is None and not state.ended:
+            if worker.is_cancelled:
+                return
+            time.sleep(WORKFLOW_TICK / 4)
+        if state.run is None:
+            # Ended without running in this attempt: skipped, stopped, or succeeded earlier.
+            lines = [f"Stage {state.status}."]
+            if state.reused:
+                result = WorkflowStore(MySQL(exit_on_connect_error=False)).stage_results(run.id).get(name)
+                tail = (result or {}).get('output_tail')
+                lines = ["Succeeded in an earlier attempt; its last lines were:", *(tail.splitlines() if tail else [])]
+            self._pending_output.extend((run_id, line) for line in lines)
+            return
+        index = 0
+        while not worker.is_cancelled:
+            lines, index, done = state.run.read_from(index, timeout=WORKFLOW_TICK / 2)
+            self._pending_output.extend((run_id, line) for line in lines)
+            if done:
+                break
+
+    # --- Find in output ---
+
+    def action_open_find(self) -> None:
+        find = self.query_one("#find-input", Input)
+        find.remove_class("hidden")
+        self._update_find_title()
+        find.focus()
+
+    def action_close_find(self) -> None:
+        find = self.query_one("#find-input", Input)
+        find.add_class("hidden")
+        if self._find_timer is not None:
+            self._find_timer.stop()
+            self._find_timer = None
+        self.find_filter = False
+        log = self.query_one(OutputLog)
+        if log.filtering:
+            # Leave filter mode, keeping the highlighted match in view.
+            match = log.match_index
+            self.workers.cancel_group(self, "find-filter")
+            log.set_filter(None)
+            log.show_match(match)
+        self.focus_menu()
+
+    def _find_open(self) -> bool:
+        return not self.query_one("#find-input").has_class("hidden")
+
+    def action_toggle_find_regex(self) -> None:
+        if not self._find_open():
+            return
+        self.find_regex = not self.find_regex
+        self._update_find_title()
+        self.run_find()
+
+    def action_toggle_find_filter(self) -> None:
+        if not self._find_open():
+            return
+        self.find_filter = not self.find_filter
+        self._update_find_title()
+        self.run_find()
+
+    def action_find_next(self) -> None:
+        self.step_find(backwards=False)
+
+    def action_find_previous(self) -> None:
+        self.step_find(backwards=True)
+
+    def _update_find_title(self, status: str = "") -> None:
+        find = self.query_one("#find-input", Input)
+        modes = ["regex" if self.find_regex else "text"]
+        if self.find_filter:
+            modes.append("filter")
+        find.border_title = f"Find ({', '.join(modes)}) - Enter/F3 next, Shift+F3 previous, ^R regex, ^T filter"
+        find.border_subtitle = status
+
+    def _find_query(self):
+        """The find bar's query, or None if it is empty or an invalid regex."""
+        text = self.query_one("#find-input", Input).value
+        if not text:
+            self._update_find_title()
+            return None
+        try:
+            return Query(text, regex=self.find_regex)
+        except re.error as e:
+            self._update_find_title(f"invalid regex: {e}")
+            return None
+
+    def run_find(self) -> None:
+        """Searches from the top of the view (or shows only matches in filter mode)."""
+        self._find_timer = None
+        if not self._find_open():
+            return
+        log = self.query_one(OutputLog)
+        query = self._find_query()
+        if self.find_filter:
+            self.workers.cancel_group(self, "find-filter")
+            log.set_filter(query)
+            if query is not None:
+                self._update_find_title("filtering...")
+                self.filter_output(log, query, log.generation, len(log.buffer))
+            return
+        if log.filtering:
+            log.set_filter(None)
+        if query is None:
+            log.show_match(None)
+            return
+        index = log.buffer.find(query, log.top_index() or 0)
+        if index is None:
+            index = log.buffer.find(query, 0)
+        self._show_find_result(log, index)
+
+    def step_find(self, backwards: bool) -> None:
+        if not self._find_open():
+            return
+        log = self.query_one(OutputLog)
+        if log.filtering:
+            # Every shown line is a match: move the highlight one row.
+            count = len(log.filter_map)
+            if count:
+                row = log.match_row
+                row = (0 if not backwards else count - 1) if row is None else (row + (-1 if backwards else 1)) % count
+                log.show_match(log.filter_map[row])
+                self._update_find_title(f"match {row + 1} of {count}")
+            return
+        query = self._find_query()
+        if query is None:
+            return
+        buffer = log.buffer
+        if log.match_index is None:
+            start = log.top_index() or 0
+        else:
+            start = log.match_index + (-1 if backwards else 1)
+        index = buffer.find(query, start, backwards) if 0 <= start < len(buffer) else None
+        if index is None:
+            # Wrap around.
+            index = buffer.find(query, len(buffer) - 1 if backwards else 0, backwards)
+        self._show_find_result(log, index)
+
+    def _show_find_result(self, log: OutputLog, index) -> None:
+        log.show_match(index)
+        self._update_find_title("no match" if index is None else f"line {index + 1} of {len(log.buffer)}")
+
+    @work(thread=True, exclusive=True, group="find-filter")
+    def filter_output(self, log: OutputLog, query, generation: int, end: int) -> None:
+        """Collects the matching lines of the first `end` buffer lines, handing them over in batches."""
+        worker = get_current_worker()
+        batch, sent = [], time.monotonic()
+        for index in log.buffer.iter_matches(query, 0, end):
+            if worker.is_cancelled:
+                return
+            batch.append(index)
+            if time.monotonic() - sent >= FILTER_BATCH_SECONDS:
+                self.call_from_thread(log.add_filtered, generation, batch)
+                batch, sent = [], time.monotonic()
+        if worker.is_cancelled:
+            return
+        self.call_from_thread(log.add_filtered, generation, batch)
+        self.call_from_thread(log.filter_caught_up, generation, end)
+        self.call_from_thread(self._filter_done, log, generation)
+
+    def _filter_done(self, log: OutputLog, generation: int) -> None:
+        if generation == log.generation:
+            self._update_find_title(f"{len(log.filter_map)} matching lines of {len(log.buffer)}")
+
+    @tracing.traced(cat='worker')
+    def execute_command_and_update_log(self, command_string: str, command_type: str, run_id: int, hosts=None,
+                                       cache_key=None, width=None, height=None, argv=None) -> None:
+        """
+        Runs in a worker thread so long-running or never-ending commands
+        (e.g. 'showme follow') never block the UI. If cache_key is given, the
+        output of a run that completes is stored in the output cache. width
+        and height are the log pane's size, passed on to the child; argv
+        is set when the command can be exec'd without a shell.
+        """
+        worker = get_current_worker()
+        tracing.flow('run', run_id, start=False)
+        waiting = lambda: self._pending_output.append((run_id, "Waiting for a free run slot..."))
+        with self.run_manager.slot(on_wait=waiting):
+            if worker.is_cancelled:
+                return
+            started_at = time.time()
+            output = deque(maxlen=self.output_cache.max_lines)
+            processes = []
+            def started(process):
+                processes.append(process)
+                self._set_active_process(process)
+            usage = []
+            lines = stream_command(command_string, command_type, on_start=started, hosts=hosts,
+                                   width=width, height=height, argv=argv, live=True,
+                                   on_exit=lambda returncode, rusage: usage.append(rusage))
+            completed = False
+            try:
+                for line in lines:
+                    if worker.is_cancelled:
+                        break
+                    self._queue_line(run_id, output, line)
+                else:
+                    completed = True
+            except Exception as e:
+                self._pending_output.append((run_id, f"An error occurred in the dashboard worker: {e}"))
+            finally:
+                lines.close()
+                returncode = processes[0].returncode if processes else None
+                # A run stopped by a signal (another command, quitting) is not worth keeping.
+                if cache_key and completed and not worker.is_cancelled and (returncode or 0) >= 0:
+                    self.output_cache.put(cache_key, output, returncode, started_at)
+                rusage = usage[0] if usage and not worker.is_cancelled else None
+                self.post_message(CommandFinished(run_id, rusage, time.time() - started_at))
+
+    def execute_in_rund(self, command_data, user_input: str, run_id: int, cache_key=None, width=None, height=None,
+                        argv=None, attach=None) -> None:
+        """
+        Worker-thread counterpart of execute_command_and_update_log for the
+        run daemon: starts the command there (or joins the run of the same
+        command line that is already going, or follows run summary `attach`)
+        and feeds its output, from the first line, into the output queue.
+        Cancelling only detaches. If the daemon cannot be reached the
+        command runs here instead.
+        """
+        worker = get_current_worker()
+        tracing.flow('run', run_id, start=False)
+        rund = self.rund
+        try:
+            run = attach or rund.start(command_data.key, user_input, width, height)
+            stream = rund.follow(run['id'])
+        except (OSError, ValueError) as e:
+            if attach is not None:
+                self._pending_output.append((run_id, f"Could not attach to run #{attach['id']}: {e}"))
+                self.post_message(CommandFinished(run_id))
+                return
+            self._pending_output.append((run_id, f"Run daemon unavailable ({e}); running the command here."))
+            self.execute_command_and_update_log(build_command(command_data, user_input), command_data.command_type,
+                                                run_id, command_data.hosts, cache_key, width, height, argv)
+            return
+        with self._process_lock:
+            if worker.is_cancelled:
+                stream.close()
+            self._rund_stream = stream
+            self._rund_run = run
+        output = deque(maxlen=self.output_cache.max_lines)
+        lines = iter(stream)
+        completed = False
+        need_pid = run['pid'] is None and not run['finished_at']
+        try:
+            for line in lines:
+                if worker.is_cancelled:
+                    break
+                self._queue_line(run_id, output, line)
+                if need_pid:
+                    # The child has started by now: its pid lets _sample_run show CPU and RSS.
+                    need_pid = False
+                    run = rund.get(run['id'])
+                    with self._process_lock:
+                        if self._rund_stream is stream:
+                            self._rund_run = run
+            else:
+                completed = not stream.closed
+        except (OSError, ValueError) as e:
+            self._pending_output.append((run_id, f"An error occurred in the dashboard worker: {e}"))
         finally:
-            self.post_message(CommandFinished())
+            lines.close()
+            with self._process_lock:
+                if self._rund_stream is stream:
+                    self._rund_stream = None
+                    self._rund_run = None
+        summary = None
+        if completed:
+            try:
+                summary = rund.get(run['id'])
+            except (OSError, ValueError):
+                pass
+        if summary is None or not summary['finished_at']:
+            self.post_message(CommandFinished(run_id))
+            return
+        returncode = summary['returncode']
+        started_at = summary['started_at'] or summary['created_at']
+        if cache_key and summary['status'] != 'stopped' and (returncode or 0) >= 0:
+            self.output_cache.put(cache_key, output, returncode, started_at)
+        self.post_message(CommandFinished(run_id, summary['usage'], summary['finished_at'] - started_at))
 
-if __name__ == "__main__":
-    app = DashboardApp()
+    def _queue_line(self, run_id: int, output: deque, line: str) -> None:
+        """Queues a line for the log, keeping `output` (what gets cached) in step with LineUpdates."""
+        self._pending_output.append((run_id, line))
+        if type(line) is LineUpdate:
+            if line.back < len(output):
+                output[-1 - line.back] = str(line)
+        else:
+            output.append(line)
+
+    def _drain_output(self) -> None:
+        """
+        Moves queued output of the current run into the log in one batch.
+        LineUpdates (redrawn progress lines) replace their line in the batch,
+        or in the log if it was written by an earlier batch.
+        """
+        batch = []
+        replaced = {}       # Lines before the batch, counted back from the last one -> new text.
+        while self._pending_output:
+            run_id, line = self._pending_output.popleft()
+            if run_id != self._run_id:
+                continue
+            if type(line) is LineUpdate:
+                if line.back < len(batch):
+                    batch[-1 - line.back] = str(line)
+                else:
+                    replaced[line.back - len(batch)] = str(line)
+            else:
+                batch.append(line)
+        if self._stale_run == self._run_id:
+            # Cached output is on screen: collect the fresh lines and swap them in
+            # once the run has had REVALIDATE_SWAP_SECONDS to stream (or has ended).
+            fresh = self._fresh_output
+            for back, line in replaced.items():
+                if back < len(fresh):
+                    fresh[-1 - back] = line
+            fresh.extend(batch)
+            if fresh and time.monotonic() - self._fresh_started >= REVALIDATE_SWAP_SECONDS:
+                self._show_fresh_output()
+            return
+        if not batch and not replaced:
+            return
+        log = self.query_one(OutputLog)
+        for back, line in replaced.items():
+            self._replace_run_line(log, len(log.buffer) - 1 - back, line)
+        if batch:
+            with tracing.span('log.write', 'render', lines=len(batch)):
+                self._write_run_lines(log, batch)
+
+def run_headless(socket_path=None, port=None):
+    """Serves the command API without the TUI until interrupted."""
+    if not ensure_schema():
+        sys.exit("CRITICAL: Failed to bring the database schema up to date.")
+    raw_commands = get_dashboard_commands()
+    if raw_commands is None:
+        sys.exit("CRITICAL: Failed to load commands from database.")
+    manager = RunManager()
+    try:
+        server = make_server({cmd.key: cmd for cmd in raw_commands}, manager,
+                             socket_path=socket_path, port=port, verbose=True)
+    except OSError as e:
+        sys.exit(f"CRITICAL: Could not start the API server: {e}")
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Serving {len(raw_commands)} commands on {server.address_label} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop_all()
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Haines Homelab Dashboard.")
+    parser.add_argument("--headless", action="store_true", help="Serve the command API without the TUI.")
+    parser.add_argument("--api", action="store_true", help="Also serve the command API while the TUI runs.")
+    parser.add_argument("--socket", help="Unix socket path for the API (default: $XDG_RUNTIME_DIR/dashboard_tui.sock).")
+    parser.add_argument("--port", type=int, help="Serve the API on 127.0.0.1:PORT instead of a Unix socket.")
+    parser.add_argument("--rund", action="store_true",
+                        help="Run log-mode commands in the run daemon (rund.py), starting it if needed, so they "
+                             "keep running after the dashboard quits. Used anyway when it is already running.")
+    args = parser.parse_args()
+    if args.headless:
+        run_headless(args.socket, args.port)
+        return
+    app = DashboardApp(api_socket=args.socket, api_port=args.port, serve_api=args.api, start_rund=args.rund)
     app.run()
+
+if __name__ == "__main__":
+    main()
 #============= end of code      ================#
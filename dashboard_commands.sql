@@ -3,25 +3,99 @@ DROP TABLE IF EXISTS `dashboard_commands`;
 CREATE TABLE IF NOT EXISTS `dashboard_commands` (
   `id` int NOT NULL AUTO_INCREMENT,
   `sort_order` int NOT NULL DEFAULT '0',
-  `key` char(1) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `key` varchar(16) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
   `name` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `group_name` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL,
   `command_type` enum('shell','python','internal') CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
   `command_string` text CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
   `requires_input` tinyint(1) NOT NULL DEFAULT '0',
   `quote_input` tinyint(1) NOT NULL DEFAULT '0',
   `enabled` tinyint(1) NOT NULL DEFAULT '1',
   `big_display` tinyint(1) NOT NULL DEFAULT '1',
+  `interval_seconds` int NULL DEFAULT NULL,
+  `background` tinyint(1) NOT NULL DEFAULT '0',
+  `hosts` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL,
   PRIMARY KEY (`id`),
   UNIQUE KEY `key` (`key`)
-) ENGINE=InnoDB AUTO_INCREMENT=10 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
-
-INSERT INTO `dashboard_commands` (`id`, `sort_order`, `key`, `name`, `command_type`, `command_string`, `requires_input`, `quote_input`, `enabled`, `big_display`) VALUES
-(1, 1, 'a', 'Ask AI (ai01.py)', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/ai.py ask', 1, 0, 1, 1),
-(2, 2, 'd', 'Directory Listing +', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/rich_dfb.py', 0, 0, 1, 1),
-(3, 3, 'f', 'File Manager', 'shell', 'far2l --tty', 0, 0, 1, 1),
-(4, 4, 'u', 'Update System', 'shell', 'clear; echo \'Upgrading....!\'; sudo apt upgrade -y', 0, 0, 1, 1),
-(5, 5, 's', 'Search AI (ai01.py)', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/ai.py search ', 1, 1, 1, 1),
-(6, 6, 'b', 'Backup new Files', 'shell', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/backup_functions.py ', 0, 0, 1, 1),
-(7, 7, '0', 'Add Journal Entry', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/journal.py update ', 1, 1, 1, 1),
-(8, 8, '1', 'Journal Preview', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/showme.py als last journal', 0, 0, 1, 1),
-(9, 9, '2', 'Journal Dump', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/showme.py als display journal', 0, 0, 1, 1);
+) ENGINE=InnoDB AUTO_INCREMENT=12 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+INSERT INTO `dashboard_commands` (`id`, `sort_order`, `key`, `name`, `group_name`, `command_type`, `command_string`, `requires_input`, `quote_input`, `enabled`, `big_display`, `interval_seconds`, `background`) VALUES
+(1, 1, 'a', 'Ask AI (ai01.py)', 'AI', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/ai.py ask', 1, 0, 1, 1, NULL, 0),
+(2, 2, 'd', 'Directory Listing +', 'System', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/rich_dfb.py', 0, 0, 1, 1, NULL, 0),
+(3, 3, 'f', 'File Manager', 'System', 'shell', 'far2l --tty', 0, 0, 1, 1, NULL, 0),
+(4, 4, 'u', 'Update System', 'System', 'shell', 'clear; echo \'Upgrading....!\'; sudo apt upgrade -y', 0, 0, 1, 1, NULL, 0),
+(5, 5, 's', 'Search AI (ai01.py)', 'AI', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/ai.py search ', 1, 1, 1, 1, NULL, 0),
+(6, 6, 'b', 'Backup new Files', 'System', 'shell', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/backup_functions.py ', 0, 0, 1, 1, NULL, 0),
+(7, 7, '0', 'Add Journal Entry', 'Journal', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/journal.py update ', 1, 1, 1, 1, NULL, 0),
+(8, 8, '1', 'Journal Preview', 'Journal', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/showme.py als last journal', 0, 0, 1, 1, NULL, 0),
+(9, 9, '2', 'Journal Dump', 'Journal', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/showme.py als dump journal', 0, 0, 1, 1, NULL, 0),
+(10, 10, '3', 'Journal Follow', 'Journal', 'python', '/home/al/miniconda3/envs/py/bin/python3 /home/al/system_files/projects/py/showme.py als follow journal', 0, 0, 1, 0, NULL, 0),
+(11, 11, 'h', 'Disk Usage', 'System', 'shell', 'df -h -x tmpfs -x devtmpfs', 0, 0, 1, 0, 300, 1);
+
+CREATE TABLE IF NOT EXISTS `dashboard_hosts` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `name` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `address` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `port` int NULL DEFAULT NULL,
+  `host_group` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL,
+  `enabled` tinyint(1) NOT NULL DEFAULT '1',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `name` (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE IF NOT EXISTS `dashboard_workflows` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `name` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `description` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL,
+  `max_parallel` int NOT NULL DEFAULT '2',
+  `enabled` tinyint(1) NOT NULL DEFAULT '1',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `name` (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE IF NOT EXISTS `dashboard_workflow_stages` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `workflow_id` int NOT NULL,
+  `sort_order` int NOT NULL DEFAULT '0',
+  `stage_name` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `command_key` varchar(16) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+  `depends_on` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL,
+  `run_if` enum('success','failure','always') CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL DEFAULT 'success',
+  `success_codes` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL DEFAULT '0',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `workflow_stage` (`workflow_id`, `stage_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE IF NOT EXISTS `dashboard_workflow_runs` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `run_uuid` char(32) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+  `workflow_id` int NOT NULL,
+  `status` enum('running','succeeded','failed','stopped') CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL DEFAULT 'running',
+  `attempts` int NOT NULL DEFAULT '1',
+  `started_at` datetime NOT NULL,
+  `finished_at` datetime NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `run_uuid` (`run_uuid`),
+  KEY `idx_workflow` (`workflow_id`, `id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE IF NOT EXISTS `dashboard_workflow_stage_runs` (
+  `run_id` int NOT NULL,
+  `stage_name` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `status` enum('pending','running','succeeded','failed','skipped','stopped') CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `exit_code` int NULL DEFAULT NULL,
+  `started_at` datetime NULL DEFAULT NULL,
+  `finished_at` datetime NULL DEFAULT NULL,
+  `duration_seconds` double NULL DEFAULT NULL,
+  `output_tail` text CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL,
+  PRIMARY KEY (`run_id`, `stage_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Example: back up, then update, then show disk usage whatever happened.
+INSERT INTO `dashboard_workflows` (`id`, `name`, `description`, `max_parallel`) VALUES
+(1, 'Maintenance', 'Backup, system update and a disk check', 2);
+
+INSERT INTO `dashboard_workflow_stages` (`workflow_id`, `sort_order`, `stage_name`, `command_key`, `depends_on`, `run_if`, `success_codes`) VALUES
+(1, 1, 'backup', 'b', NULL, 'success', '0'),
+(1, 2, 'update', 'u', 'backup', 'success', '0'),
+(1, 3, 'disk', 'h', 'update', 'always', '0');
@@ -10,6 +10,8 @@ import importlib.util
 import subprocess
 import sys
 
+from check_imports import is_verified, mark_verified
+
 class DepChecker:
     def __call__(self, package_name, import_name=None):
         """
@@ -23,11 +25,16 @@ class DepChecker:
         if import_name is None:
             import_name = package_name
 
+        # Skip the sys.path walk if this environment already passed the check
+        if is_verified(import_name):
+            return True
+
         # Check if the module is available in the current environment path
         spec = importlib.util.find_spec(import_name)
 
         if spec is not None:
             # Module exists, it is safe to import
+            mark_verified(import_name)
             return True
 
         # Module is missing, alert and prompt the user
@@ -40,6 +47,7 @@ class DepChecker:
                 # sys.executable ensures it uses the active Python (Miniconda), not the OS default
                 subprocess.check_call([sys.executable, "-m", "pip", "install", package_name])
                 print(f"\n[+] Successfully installed '{package_name}'.", file=sys.stderr)
+                mark_verified(import_name)
                 return True
             except subprocess.CalledProcessError:
                 print(f"\n[-] ERROR: Failed to install '{package_name}'.", file=sys.stderr)
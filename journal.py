@@ -12,6 +12,8 @@ import sys
 import argparse
 import json
 import os
+import gzip
+import hashlib
 
 sys.path.insert(0, '/home/al/system_files/projects')
 sys.path.insert(0, '/home/al/system_files/projects/py')
@@ -19,6 +21,9 @@ sys.path.insert(0, '/home/al/system_files/projects/py')
 try:
     from logic import JournalApp
     from MySql import MySQL
+    from migrations import ensure_schema
+    from local_cache import cache_dir, read_json, write_json_atomic
+    from journal_queue import enqueue, spawn_flusher
     from rich.console import Console
 except ImportError as e:
     print(f"ERROR: Missing critical module: {e}", file=sys.stderr)
@@ -26,6 +31,124 @@ except ImportError as e:
 
 console = Console()
 
+EXPORT_QUERY = "SELECT id, title, note FROM journal ORDER BY id ASC"
+IMPORT_QUERY = "INSERT INTO journal (title, note) VALUES (%s, %s) ON DUPLICATE KEY UPDATE note = VALUES(note)"
+IMPORT_CHUNK_SIZE = 500     # Rows committed per transaction during import.
+
+def open_archive(filename, mode):
+    """
+    Opens an export/import file as text, transparently handling gzip.
+    Writing compresses when the name ends in '.gz'; reading checks the magic bytes.
+    """
+    if 'w' in mode:
+        compressed = filename.endswith('.gz')
+    else:
+        with open(filename, 'rb') as f:
+            compressed = f.read(2) == b'\x1f\x8b'
+    if compressed:
+        return gzip.open(filename, mode + 't', encoding='utf-8')
+    return open(filename, mode, encoding='utf-8')
+
+def export_entries(db, filename, fmt):
+    """
+    Streams the journal to a file row by row through a server-side cursor.
+    fmt is 'ndjson' (one JSON object per line) or 'json' (a JSON array).
+    The file is written under a temporary name and renamed when complete.
+
+    Returns:
+        int or None: Number of rows written, or None on error.
+    """
+    tmp_name = f"{filename}.partial"
+    count = 0
+    with open_archive(tmp_name, 'w') as f:
+        if fmt == 'json':
+            f.write('[\n')
+        for row in db.stream_data(EXPORT_QUERY):
+            line = json.dumps(row, ensure_ascii=False, default=str)
+            if fmt == 'json':
+                f.write(('    ' if count == 0 else ',\n    ') + line)
+            else:
+                f.write(line + '\n')
+            count += 1
+        if fmt == 'json':
+            f.write('\n]\n')
+    if db.last_error is not None:
+        os.unlink(tmp_name)
+        return None
+    os.replace(tmp_name, filename)
+    return count
+
+def iter_archive(filename):
+    """
+    Yields entries from an export file. NDJSON is read line by line with flat
+    memory; a JSON array (the older 'json' export format) is loaded whole.
+    """
+    with open_archive(filename, 'r') as f:
+        first = ''
+        while not first:
+            first = f.read(1)
+            if not first:
+                return
+            if first.isspace():
+                first = ''
+        if first == '[':
+            yield from json.loads(first + f.read())
+            return
+        line = first + f.readline()
+        while line:
+            if line.strip():
+                yield json.loads(line)
+            line = f.readline()
+
+def _checkpoint_file(filename):
+    stat = os.stat(filename)
+    key = f"{os.path.abspath(filename)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return os.path.join(cache_dir('journal_import'), hashlib.sha256(key.encode()).hexdigest()[:32] + '.json')
+
+def import_entries(db, filename, restart=False):
+    """
+    Imports entries in chunks of IMPORT_CHUNK_SIZE, committing each chunk and
+    recording how many entries have been consumed in a local checkpoint. If
+    the import fails partway, running it again resumes after the last
+    committed chunk (use restart=True to start from the beginning).
+
+    Returns:
+        tuple: (imported, skipped, resumed_from), or None on failure.
+    """
+    checkpoint = _checkpoint_file(filename)
+    resumed_from = 0 if restart else read_json(checkpoint, default={}).get('consumed', 0)
+    consumed = imported = skipped = 0
+    chunk = []
+
+    def flush():
+        nonlocal imported
+        if chunk and not db.put_many(IMPORT_QUERY, chunk):
+            return False
+        imported += len(chunk)
+        chunk.clear()
+        write_json_atomic(checkpoint, {'file': os.path.abspath(filename), 'consumed': consumed})
+        return True
+
+    for item in iter_archive(filename):
+        consumed += 1
+        if consumed <= resumed_from:
+            continue
+        title = item.get('title')
+        note = item.get('note')
+        if title and note:
+            chunk.append((title, note))
+        else:
+            skipped += 1
+        if len(chunk) >= IMPORT_CHUNK_SIZE and not flush():
+            return None
+    if not flush():
+        return None
+    try:
+        os.unlink(checkpoint)
+    except OSError:
+        pass
+    return imported, skipped, resumed_from
+
 def main():
     parser = argparse.ArgumentParser(description="Personal Journal CLI application.")
     subparsers = parser.add_subparsers(dest="command", required=True, help="Command to execute")
@@ -44,6 +167,7 @@ def main():
     # update command
     p_update = subparsers.add_parser("update", help="Add or update a journal entry")
     p_update.add_argument("note", help="Note content")
+    p_update.add_argument("--sync", action="store_true", help="Write to the database now instead of queueing the entry")
 
     # dump command
     p_dump = subparsers.add_parser("dump", help="Dump all entries to a text file")
@@ -51,13 +175,27 @@ def main():
 
     # json command
     p_json = subparsers.add_parser("json", help="Export entries to a JSON file")
-    p_json.add_argument("filename", help="Output JSON filename")
+    p_json.add_argument("filename", help="Output JSON filename (add .gz to compress)")
+
+    # export command
+    p_export = subparsers.add_parser("export", help="Stream entries to an NDJSON file (one entry per line)")
+    p_export.add_argument("filename", help="Output filename, e.g. journal.ndjson or journal.ndjson.gz")
 
     # import command
-    p_import = subparsers.add_parser("import", help="Import entries from a JSON file")
-    p_import.add_argument("filename", help="Input JSON filename")
+    p_import = subparsers.add_parser("import", help="Import entries from a JSON or NDJSON file (optionally gzipped)")
+    p_import.add_argument("filename", help="Input filename")
+    p_import.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint and import from the start")
 
     args = parser.parse_args()
+    if args.command == "update" and not args.sync:
+        # Queue locally and return at once; the background flusher writes it to MySQL.
+        enqueue(args.note)
+        spawn_flusher()
+        console.print("[bold green]Journal entry saved.[/bold green]")
+        return
+    if not ensure_schema():
+        console.print("[bold red]CRITICAL ERROR: Failed to bring the database schema up to date.[/bold red]")
+        sys.exit(1)
     app = JournalApp()
     db = MySQL(database='als')
 
@@ -71,35 +209,37 @@ def main():
         app.add_entry(args.note)
     elif args.command == "dump":
         app.dump_to_text(args.filename)
-    elif args.command == "json":
-        entries = db.get_data("SELECT id, title, note FROM journal ORDER BY id ASC")
-        if not entries:
-            console.print("[yellow]Journal is empty. No JSON created.[/yellow]")
-            return
+    elif args.command in ("json", "export"):
+        fmt = "json" if args.command == "json" else "ndjson"
         try:
-            with open(args.filename, 'w', encoding='utf-8') as f:
-                json.dump(entries, f, indent=4, ensure_ascii=False)
-            console.print(f"[bold green]SUCCESS: Journal exported to JSON '{args.filename}'.[/bold green]")
-        except IOError as e:
-            console.print(f"[bold red]ERROR: Failed to write JSON file: {e}[/bold red]", file=sys.stderr)
+            count = export_entries(db, args.filename, fmt)
+        except (IOError, OSError) as e:
+            console.print(f"[bold red]ERROR: Failed to write {fmt.upper()} file: {e}[/bold red]")
+            sys.exit(1)
+        if count is None:
+            console.print("[bold red]ERROR: Failed to read the journal from the database.[/bold red]")
+            sys.exit(1)
+        if not count:
+            console.print(f"[yellow]Journal is empty. Wrote an empty {fmt.upper()} file.[/yellow]")
+            return
+        console.print(f"[bold green]SUCCESS: Exported {count} entries to {fmt.upper()} '{args.filename}'.[/bold green]")
     elif args.command == "import":
         if not os.path.exists(args.filename):
-            console.print(f"[bold red]ERROR: File '{args.filename}' not found.[/bold red]", file=sys.stderr)
+            console.print(f"[bold red]ERROR: File '{args.filename}' not found.[/bold red]")
             sys.exit(1)
         try:
-            with open(args.filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            count = 0
-            for item in data:
-                title = item.get('title')
-                note = item.get('note')
-                if title and note:
-                    query = "INSERT INTO journal (title, note) VALUES (%s, %s) ON DUPLICATE KEY UPDATE note = %s"
-                    db.put_data(query, (title, note, note))
-                    count += 1
-            console.print(f"[bold green]SUCCESS: Imported {count} entries from '{args.filename}'.[/bold green]")
-        except Exception as e:
-            console.print(f"[bold red]ERROR: Failed to import JSON file: {e}[/bold red]", file=sys.stderr)
+            result = import_entries(db, args.filename, restart=args.restart)
+        except (IOError, OSError, ValueError, AttributeError) as e:
+            console.print(f"[bold red]ERROR: Failed to import file: {e}[/bold red]")
+            console.print("[yellow]Committed chunks are kept; run the same import again to resume.[/yellow]")
+            sys.exit(1)
+        if result is None:
+            console.print("[bold red]ERROR: A chunk failed to import. Run the same import again to resume.[/bold red]")
+            sys.exit(1)
+        imported, skipped, resumed_from = result
+        if resumed_from:
+            console.print(f"[yellow]Resumed after {resumed_from} previously committed entries.[/yellow]")
+        console.print(f"[bold green]SUCCESS: Imported {imported} entries from '{args.filename}' ({skipped} skipped).[/bold green]")
 
 if __name__ == "__main__":
     main()
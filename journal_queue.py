@@ -0,0 +1,251 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   journal_queue.py
+#
+# Copyright 2026 AL Haines
+#
+# Write-behind queue for journal entries.
+#
+# Adding a note appends one JSON line to a local write-ahead file and fsyncs
+# it, which takes milliseconds whether or not MySQL is reachable. A detached
+# background flusher then inserts queued entries into als.journal in
+# batches and removes them from the file once they are committed.
+#
+# Every entry carries a uuid that is stored in journal.entry_uuid (unique,
+# see migration 4), so replaying the file after a crash between the INSERT
+# and the file rewrite never creates duplicates.
+#
+# Command line:
+#
+#   journal_queue.py add "note text" [--title TITLE]
+#   journal_queue.py flush [--wait SECONDS]
+#   journal_queue.py status
+
+import sys
+import os
+import json
+import time
+import uuid
+import fcntl
+import argparse
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+
+sys.path.insert(0, '/home/al/system_files/projects')
+sys.path.insert(0, '/home/al/system_files/projects/py')
+
+try:
+    from local_cache import state_dir
+except ImportError as e:
+    print(f"ERROR: Critical modules not found: {e}", file=sys.stderr)
+    sys.exit(1)
+
+JOURNAL_DATABASE = 'als'
+FLUSH_BATCH_SIZE = 200
+FLUSH_RETRY_MAX = 60        # Seconds between retries at most while the database is down.
+INSERT_QUERY = ("INSERT INTO journal (title, note, entry_uuid) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE id = id")
+
+
+def _paths():
+    directory = state_dir('journal_queue')
+    return (os.path.join(directory, 'journal.wal'),
+            os.path.join(directory, 'journal.wal.lock'),
+            os.path.join(directory, 'flusher.lock'))
+
+
+@contextmanager
+def _locked(lock_path, blocking=True):
+    """
+    Holds an exclusive flock on lock_path. With blocking=False, yields False
+    instead of waiting if someone else holds it.
+    """
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        os.close(fd)
+
+
+def enqueue(note, title=None):
+    """
+    Durably queues a journal entry. Returns the entry's uuid.
+    """
+    entry = {
+        'uuid': uuid.uuid4().hex,
+        'title': title or datetime.now().strftime('%Y%m%d%H%M%S'),
+        'note': note,
+        'queued_at': time.time(),
+    }
+    data = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+    wal_path, wal_lock, _ = _paths()
+    with _locked(wal_lock):
+        fd = os.open(wal_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b'\n':
+                # Terminate a line torn by an earlier crash so this entry stays intact.
+                data = b'\n' + data
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    return entry['uuid']
+
+
+def pending_entries():
+    """
+    Returns the queued entries, oldest first. A torn last line (crash while
+    appending) is ignored.
+    """
+    wal_path, _, _ = _paths()
+    entries = []
+    try:
+        with open(wal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _remove_flushed(flushed_uuids):
+    """
+    Rewrites the WAL without the entries that are now in the database.
+    Entries appended while the flush was running are kept.
+    """
+    wal_path, wal_lock, _ = _paths()
+    with _locked(wal_lock):
+        remaining = [e for e in pending_entries() if e.get('uuid') not in flushed_uuids]
+        tmp_path = wal_path + '.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            for entry in remaining:
+                os.write(fd, (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, wal_path)
+    return len(remaining)
+
+
+def flush_once():
+    """
+    Inserts everything currently queued, in batches.
+
+    Returns:
+        tuple: (flushed, remaining), or None if the database could not be written.
+    """
+    entries = pending_entries()
+    if not entries:
+        return 0, 0
+    # Imported here so 'add' never pays for pymysql and config loading.
+    from MySql import MySQL
+    db = MySQL(database=JOURNAL_DATABASE, persistent=True, exit_on_connect_error=False)
+    if not db.get_data("SELECT 1 AS ok"):
+        db.close()
+        return None
+    from migrations import ensure_schema
+    if not ensure_schema():
+        db.close()
+        return None
+    flushed = set()
+    try:
+        for start in range(0, len(entries), FLUSH_BATCH_SIZE):
+            batch = entries[start:start + FLUSH_BATCH_SIZE]
+            params = [(e.get('title'), e.get('note'), e.get('uuid')) for e in batch]
+            if not db.put_many(INSERT_QUERY, params):
+                break
+            flushed.update(e.get('uuid') for e in batch)
+    finally:
+        db.close()
+    remaining = _remove_flushed(flushed) if flushed else len(entries)
+    if len(flushed) < len(entries):
+        return None
+    return len(flushed), remaining
+
+
+def run_flusher(wait=0):
+    """
+    Flushes until the queue is empty. Only one flusher runs at a time; a
+    second one exits immediately. While the database is unreachable it retries
+    with backoff for up to `wait` seconds, then gives up (entries stay queued).
+
+    Returns:
+        int: Entries still queued when it stopped (-1 if another flusher is running).
+    """
+    _, _, flusher_lock = _paths()
+    with _locked(flusher_lock, blocking=False) as acquired:
+        if not acquired:
+            return -1
+        deadline = time.monotonic() + wait
+        delay = 1
+        while True:
+            result = flush_once()
+            if result is not None:
+                if result[1] == 0:
+                    return 0
+                continue  # New entries arrived while flushing.
+            if time.monotonic() + delay > deadline:
+                return len(pending_entries())
+            time.sleep(delay)
+            delay = min(delay * 2, FLUSH_RETRY_MAX)
+
+
+def spawn_flusher(wait=600):
+    """
+    Starts a detached background flusher and returns immediately.
+    """
+    try:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), 'flush', '--wait', str(wait)],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True, close_fds=True
+        )
+        return True
+    except OSError as e:
+        print(f"WARNING: Could not start the journal flusher: {e}", file=sys.stderr)
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue journal entries locally and flush them to MySQL in the background.")
+    subparsers = parser.add_subparsers(dest="command", required=True, help="Command to execute")
+    p_add = subparsers.add_parser("add", help="Queue a journal entry and start the background flusher")
+    p_add.add_argument("note", help="Note content")
+    p_add.add_argument("--title", help="Entry title (defaults to a timestamp)")
+    p_flush = subparsers.add_parser("flush", help="Write queued entries to the database now")
+    p_flush.add_argument("--wait", type=int, default=0, help="Keep retrying for this many seconds if the database is down")
+    subparsers.add_parser("status", help="Show how many entries are queued")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        enqueue(args.note, args.title)
+        spawn_flusher()
+        print("Journal entry queued.")
+    elif args.command == "flush":
+        remaining = run_flusher(wait=args.wait)
+        if remaining == -1:
+            print("Another flusher is already running.")
+        elif remaining:
+            print(f"{remaining} entries are still queued (database unavailable).", file=sys.stderr)
+            sys.exit(1)
+        else:
+            print("Journal queue is empty.")
+    elif args.command == "status":
+        print(f"{len(pending_entries())} journal entries queued.")
+
+
+if __name__ == "__main__":
+    main()
+#============= end of code      ================#
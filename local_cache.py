@@ -0,0 +1,104 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   local_cache.py
+#
+# Copyright 2026 AL Haines
+#
+# Small helpers for the on-disk cache shared by the dashboard tools.
+# Everything lives under $DASHBOARD_CACHE_DIR, or $XDG_CACHE_HOME/dashboard_tui
+# (~/.cache/dashboard_tui by default). Nothing in here is precious: the whole
+# directory can be deleted at any time and will be rebuilt on demand.
+#
+# Data that must survive (e.g. queued journal entries not yet written to the
+# database) goes in the state directory instead: $DASHBOARD_STATE_DIR, or
+# $XDG_STATE_HOME/dashboard_tui (~/.local/state/dashboard_tui by default).
+
+import json
+import os
+import tempfile
+
+
+def cache_root():
+    """
+    Returns the base cache directory without creating it.
+    """
+    base = os.environ.get('DASHBOARD_CACHE_DIR')
+    if base:
+        return base
+    xdg = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(xdg, 'dashboard_tui')
+
+
+def cache_dir(*parts):
+    """
+    Returns (and creates if needed) a directory inside the cache root.
+
+    Args:
+        *parts (str): Sub-directory names, e.g. cache_dir('ai_render').
+
+    Returns:
+        str: The absolute directory path.
+    """
+    path = os.path.join(cache_root(), *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def state_dir(*parts):
+    """
+    Returns (and creates if needed) a directory for data that must not be
+    thrown away with the cache.
+    """
+    base = os.environ.get('DASHBOARD_STATE_DIR')
+    if not base:
+        xdg = os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+        base = os.path.join(xdg, 'dashboard_tui')
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_text_atomic(path, text):
+    """
+    Writes text to a file via a temporary file and rename, so readers never
+    see a half-written cache entry.
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_json(path, default=None):
+    """
+    Reads a JSON cache file, returning `default` if it is missing or corrupt.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json_atomic(path, data):
+    """
+    Writes a JSON cache file atomically. Errors are swallowed because a
+    cache that cannot be written should never break the calling tool.
+
+    Returns:
+        bool: True if the file was written.
+    """
+    try:
+        write_text_atomic(path, json.dumps(data, ensure_ascii=False))
+        return True
+    except (OSError, TypeError, ValueError):
+        return False
@@ -0,0 +1,326 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   migrations.py
+#
+# Copyright 2026 AL Haines
+#
+# Versioned schema bootstrap for the dashboard tools.
+#
+# Every table the tools depend on is created or altered by a numbered
+# migration registered below. Applied migrations are recorded in a single
+# `schema_version` table in the default database, and the highest verified
+# version is cached locally (see local_cache.py). Normal runs compare the
+# cached version with LATEST_VERSION and skip all schema work, so no extra
+# connection or DDL round trip is made unless something is pending.
+#
+# Usage from another script:
+#
+#   from migrations import ensure_schema
+#   if not ensure_schema():
+#       sys.exit("CRITICAL: database schema could not be brought up to date.")
+#
+# Command line:
+#
+#   migrations.py status          # show cached and applied versions
+#   migrations.py apply [--force] # apply pending migrations (--force ignores the cache)
+
+import sys
+import os
+import argparse
+
+sys.path.insert(0, '/home/al/system_files/projects')
+sys.path.insert(0, '/home/al/system_files/projects/py')
+
+try:
+    from MySql import MySQL, DB_HOST, DB_NAME
+    from local_cache import cache_dir, read_json, write_json_atomic
+except ImportError as e:
+    print(f"ERROR: Critical modules not found: {e}", file=sys.stderr)
+    sys.exit(1)
+
+SCHEMA_VERSION_TABLE = 'schema_version'
+
+# version -> {'description': str, 'database': str or None, 'steps': [str or callable]}
+MIGRATIONS = {}
+
+
+def register(version, description, *steps, database=None):
+    """
+    Registers a numbered migration.
+
+    Args:
+        version (int): Unique, increasing migration number.
+        description (str): Short human readable summary, stored in schema_version.
+        *steps: SQL strings, or callables taking a MySQL instance and returning
+                True on success (for changes that must be checked first).
+        database (str, optional): Database the steps run against.
+                                  Defaults to the database from config.py.
+    """
+    if version in MIGRATIONS:
+        raise ValueError(f"Migration {version} is already registered.")
+    MIGRATIONS[version] = {'description': description, 'database': database, 'steps': list(steps)}
+
+
+def add_column_if_missing(table, column, definition):
+    """
+    Returns a migration step that adds a column only if it does not exist yet,
+    so a partially applied migration can safely be re-run.
+    """
+    def step(db):
+        if column in db.get_field_names(table):
+            return True
+        return db.put_data(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {definition}")
+    return step
+
+
+def add_index_if_missing(table, index_name, definition):
+    """
+    Returns a migration step that adds an index only if it does not exist yet.
+    `definition` is everything after ADD, e.g. "INDEX `idx` (`col`)".
+    """
+    def step(db):
+        query = ("SELECT COUNT(*) AS n FROM INFORMATION_SCHEMA.STATISTICS "
+                 "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND INDEX_NAME = %s")
+        rows = db.get_data(query, (db.database, table, index_name))
+        if rows and rows[0]['n']:
+            return True
+        return db.put_data(f"ALTER TABLE `{table}` ADD {definition}")
+    return step
+
+
+# --- Registered migrations (append only; never renumber) ---
+
+register(1, "Create past_results table for ai.py",
+         "CREATE TABLE IF NOT EXISTS past_results (id INT AUTO_INCREMENT PRIMARY KEY, question TEXT, text MEDIUMTEXT, comment MEDIUMTEXT)")
+
+register(2, "Create dashboard_commands table",
+         """CREATE TABLE IF NOT EXISTS `dashboard_commands` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `sort_order` int NOT NULL DEFAULT '0',
+  `key` char(1) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `name` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `command_type` enum('shell','python','internal') CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `command_string` text CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `requires_input` tinyint(1) NOT NULL DEFAULT '0',
+  `quote_input` tinyint(1) NOT NULL DEFAULT '0',
+  `enabled` tinyint(1) NOT NULL DEFAULT '1',
+  `big_display` tinyint(1) NOT NULL DEFAULT '1',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `key` (`key`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci""")
+
+register(3, "Index dashboard_commands for the menu query",
+         add_index_if_missing('dashboard_commands', 'idx_enabled_sort',
+                              "INDEX `idx_enabled_sort` (`enabled`, `sort_order`, `id`)"))
+
+
+def _journal_entry_uuid(db):
+    """
+    Adds als.journal.entry_uuid (unique) so queued entries replayed by
+    journal_queue.py after a crash are inserted at most once. Skipped when
+    the journal table does not exist on this server.
+    """
+    if not db.get_field_names('journal'):
+        return True
+    return (add_column_if_missing('journal', 'entry_uuid', "CHAR(32) NULL DEFAULT NULL")(db)
+            and add_index_if_missing('journal', 'uq_entry_uuid', "UNIQUE INDEX `uq_entry_uuid` (`entry_uuid`)")(db))
+
+
+register(4, "Add unique entry_uuid to als.journal for idempotent queued writes",
+         _journal_entry_uuid, database='als')
+
+register(5, "Allow multi-key chords and menu groups in dashboard_commands",
+         "ALTER TABLE `dashboard_commands` MODIFY `key` varchar(16) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL",
+         add_column_if_missing('dashboard_commands', 'group_name',
+                               "varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL AFTER `name`"))
+
+register(6, "Add scheduling columns to dashboard_commands",
+         add_column_if_missing('dashboard_commands', 'interval_seconds', "int NULL DEFAULT NULL"),
+         add_column_if_missing('dashboard_commands', 'background', "tinyint(1) NOT NULL DEFAULT '0'"))
+
+register(7, "Add dashboard_hosts and dashboard_commands.hosts for remote fan-out",
+         """CREATE TABLE IF NOT EXISTS `dashboard_hosts` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `name` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `address` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `port` int NULL DEFAULT NULL,
+  `host_group` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL,
+  `enabled` tinyint(1) NOT NULL DEFAULT '1',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `name` (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci""",
+         add_column_if_missing('dashboard_commands', 'hosts',
+                               "varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL"))
+
+register(8, "Add workflow tables (dashboard_workflows, stages and runs)",
+         """CREATE TABLE IF NOT EXISTS `dashboard_workflows` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `name` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `description` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL,
+  `max_parallel` int NOT NULL DEFAULT '2',
+  `enabled` tinyint(1) NOT NULL DEFAULT '1',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `name` (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci""",
+         """CREATE TABLE IF NOT EXISTS `dashboard_workflow_stages` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `workflow_id` int NOT NULL,
+  `sort_order` int NOT NULL DEFAULT '0',
+  `stage_name` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `command_key` varchar(16) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+  `depends_on` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL,
+  `run_if` enum('success','failure','always') CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL DEFAULT 'success',
+  `success_codes` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL DEFAULT '0',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `workflow_stage` (`workflow_id`, `stage_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci""",
+         """CREATE TABLE IF NOT EXISTS `dashboard_workflow_runs` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `run_uuid` char(32) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+  `workflow_id` int NOT NULL,
+  `status` enum('running','succeeded','failed','stopped') CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL DEFAULT 'running',
+  `attempts` int NOT NULL DEFAULT '1',
+  `started_at` datetime NOT NULL,
+  `finished_at` datetime NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `run_uuid` (`run_uuid`),
+  KEY `idx_workflow` (`workflow_id`, `id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci""",
+         """CREATE TABLE IF NOT EXISTS `dashboard_workflow_stage_runs` (
+  `run_id` int NOT NULL,
+  `stage_name` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `status` enum('pending','running','succeeded','failed','skipped','stopped') CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL,
+  `exit_code` int NULL DEFAULT NULL,
+  `started_at` datetime NULL DEFAULT NULL,
+  `finished_at` datetime NULL DEFAULT NULL,
+  `duration_seconds` double NULL DEFAULT NULL,
+  `output_tail` text CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL,
+  PRIMARY KEY (`run_id`, `stage_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci""")
+
+LATEST_VERSION = max(MIGRATIONS)
+
+
+def _cache_file():
+    safe_name = f"{DB_HOST}-{DB_NAME}".replace(os.sep, '_')
+    return os.path.join(cache_dir('schema'), f"{safe_name}.json")
+
+
+def cached_version():
+    """
+    Returns the schema version last verified against this server, or 0.
+    """
+    data = read_json(_cache_file(), default={})
+    try:
+        return int(data.get('version', 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+def invalidate_cache():
+    """
+    Forgets the locally verified version so the next run checks the server.
+    """
+    try:
+        os.unlink(_cache_file())
+    except OSError:
+        pass
+
+
+def applied_version(db=None):
+    """
+    Returns the highest migration recorded in schema_version on the server,
+    creating the table if it does not exist yet. Returns None on error.
+    """
+    db = db or MySQL()
+    created = db.put_data(
+        f"CREATE TABLE IF NOT EXISTS `{SCHEMA_VERSION_TABLE}` ("
+        "`version` INT NOT NULL PRIMARY KEY, "
+        "`description` VARCHAR(255) NOT NULL, "
+        "`applied_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    )
+    if not created:
+        return None
+    rows = db.get_data(f"SELECT MAX(`version`) AS version FROM `{SCHEMA_VERSION_TABLE}`")
+    if not rows:
+        return None
+    return rows[0]['version'] or 0
+
+
+def apply_pending(verbose=False):
+    """
+    Applies every registered migration newer than the server's version, in order.
+
+    Returns:
+        int or None: The resulting schema version, or None if a migration failed.
+    """
+    db = MySQL()
+    current = applied_version(db)
+    if current is None:
+        print("ERROR: Could not read the schema version table.", file=sys.stderr)
+        return None
+
+    for version in sorted(v for v in MIGRATIONS if v > current):
+        migration = MIGRATIONS[version]
+        if verbose:
+            print(f"Applying migration {version}: {migration['description']}", file=sys.stderr)
+        target = MySQL(database=migration['database']) if migration['database'] else db
+        for step in migration['steps']:
+            ok = step(target) if callable(step) else target.put_data(step)
+            if not ok:
+                print(f"ERROR: Migration {version} ({migration['description']}) failed.", file=sys.stderr)
+                return None
+        recorded = db.put_data(
+            f"INSERT IGNORE INTO `{SCHEMA_VERSION_TABLE}` (`version`, `description`) VALUES (%s, %s)",
+            (version, migration['description'])
+        )
+        if not recorded:
+            print(f"ERROR: Migration {version} applied but could not be recorded.", file=sys.stderr)
+            return None
+        current = version
+    return current
+
+
+def ensure_schema(force=False, verbose=False):
+    """
+    Makes sure the database schema is at LATEST_VERSION.
+
+    On a warm start this is a single local file read and no database work at
+    all. Only when the cache is missing, out of date or `force` is set does it
+    connect and apply pending migrations.
+
+    Returns:
+        bool: True if the schema is known to be current.
+    """
+    if not force and cached_version() >= LATEST_VERSION:
+        return True
+    version = apply_pending(verbose=verbose)
+    if version is None:
+        return False
+    write_json_atomic(_cache_file(), {'version': version})
+    return version >= LATEST_VERSION
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply or inspect dashboard database migrations.")
+    subparsers = parser.add_subparsers(dest='command', required=True, help="Command to execute")
+    subparsers.add_parser('status', help="Show the cached and applied schema versions.")
+    p_apply = subparsers.add_parser('apply', help="Apply pending migrations.")
+    p_apply.add_argument('--force', action='store_true', help="Ignore the local cache and check the server.")
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        print(f"Latest registered migration: {LATEST_VERSION}")
+        print(f"Locally cached version:      {cached_version()}")
+        print(f"Applied on server:           {applied_version()}")
+    elif args.command == 'apply':
+        if ensure_schema(force=args.force, verbose=True):
+            print(f"Schema is at version {LATEST_VERSION}.")
+        else:
+            sys.exit("ERROR: Schema could not be brought up to date.")
+
+
+if __name__ == "__main__":
+    main()
+#============= end of code      ================#
@@ -0,0 +1,289 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   output_buffer.py
+#
+# Copyright 2026 AL Haines
+#
+# Searchable copy of a command's output for the dashboard's find bar.
+#
+# Lines are grouped in blocks of BLOCK_LINES. When a block fills up, its
+# lines are joined and case-folded once into a block index entry, so a
+# search first tests whole blocks with a single substring check (for a
+# regular expression: the literal text every match must contain) and only
+# walks the lines of blocks that pass. Finding the next match in millions
+# of lines therefore costs one C-speed scan per block, and no keystroke
+# re-scans the lines of the buffer one by one.
+#
+# WrapMap uses the same blocks for the log's soft-wrap layout: it only keeps
+# the display width of each line and the widest line of each block, so a
+# resize re-counts rows block by block without touching any text, and only
+# the rows in view are rendered again.
+
+import re
+from bisect import bisect_right
+from itertools import accumulate
+
+try:
+    from re import _parser as sre_parse
+except ImportError:     # Python < 3.11
+    import sre_parse
+
+BLOCK_LINES = 256
+
+
+def _regex_literals(pattern):
+    """
+    Returns the literal runs every match of `pattern` must contain, or []
+    if none can be determined (e.g. a top-level alternation).
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, RecursionError):
+        return []
+    runs, current = [], []
+    for op, value in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(value))
+            continue
+        if op is sre_parse.BRANCH:
+            return []
+        if current:
+            runs.append(''.join(current))
+        current = []
+    if current:
+        runs.append(''.join(current))
+    return runs
+
+
+class Query:
+    """
+    A compiled find-bar query. Plain text is matched case-insensitively
+    unless it contains an upper-case letter (smart case); the same goes for
+    regular expressions.
+
+    Raises:
+        re.error: If `regex` is set and the pattern is invalid.
+    """
+
+    def __init__(self, text, regex=False):
+        self.text = text
+        self.regex = regex
+        self.ignore_case = ignore_case = text == text.lower()
+        if regex:
+            self.pattern = re.compile(text, re.IGNORECASE if ignore_case else 0)
+            literals = _regex_literals(text)
+            self.matches = lambda line: self.pattern.search(line) is not None
+        else:
+            needle = text
+            literals = [text]
+            if ignore_case:
+                self.matches = lambda line: needle in line.lower()
+            else:
+                self.matches = lambda line: needle in line
+        # Case-folded text a block must contain to hold a match.
+        self.required = [literal.lower() for literal in literals if literal]
+
+    def span(self, line):
+        """
+        Returns (start, end) of the first match in `line`, or None.
+        """
+        if self.regex:
+            found = self.pattern.search(line)
+            return found.span() if found else None
+        start = (line.lower() if self.ignore_case else line).find(self.text)
+        return (start, start + len(self.text)) if start != -1 else None
+
+
+class OutputBuffer:
+    """
+    Append-only list of output lines with a per-block case-folded index.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.blocks = []        # Case-folded text of each full block.
+
+    def __len__(self):
+        return len(self.lines)
+
+    def clear(self):
+        self.lines = []
+        self.blocks = []
+
+    def extend(self, lines):
+        self.lines.extend(lines)
+        while (len(self.blocks) + 1) * BLOCK_LINES <= len(self.lines):
+            start = len(self.blocks) * BLOCK_LINES
+            self.blocks.append('\n'.join(self.lines[start:start + BLOCK_LINES]).lower())
+
+    def replace(self, index, line):
+        """Replaces line `index` (a redrawn progress line), re-indexing its block if that is full."""
+        self.lines[index] = line
+        block = index // BLOCK_LINES
+        if block < len(self.blocks):
+            start = block * BLOCK_LINES
+            self.blocks[block] = '\n'.join(self.lines[start:start + BLOCK_LINES]).lower()
+
+    def _may_match(self, blocks, block, query):
+        if block >= len(blocks):
+            return True     # The last, still filling block is not indexed.
+        text = blocks[block]
+        return all(required in text for required in query.required)
+
+    def find(self, query, start, backwards=False):
+        """
+        Returns the index of the first line at or after `start` (at or before
+        it when `backwards`) that matches `query`, or None.
+        """
+        lines, blocks = self.lines, self.blocks     # clear() swaps in new lists; keep reading these.
+        count = len(lines)
+        if not count:
+            return None
+        start = min(max(start, 0), count - 1)
+        block = start // BLOCK_LINES
+        last_block = (count - 1) // BLOCK_LINES
+        step = -1 if backwards else 1
+        while 0 <= block <= last_block:
+            if self._may_match(blocks, block, query):
+                low = block * BLOCK_LINES
+                high = min(low + BLOCK_LINES, count)
+                if backwards:
+                    indices = range(min(start, high - 1), low - 1, -1)
+                else:
+                    indices = range(max(start, low), high)
+                for index in indices:
+                    if query.matches(lines[index]):
+                        return index
+            block += step
+        return None
+
+    def iter_matches(self, query, start=0, stop=None):
+        """
+        Yields the indices of all matching lines in [start, stop).
+        """
+        lines, blocks = self.lines, self.blocks
+        stop = len(lines) if stop is None else min(stop, len(lines))
+        block = start // BLOCK_LINES
+        while block * BLOCK_LINES < stop:
+            if self._may_match(blocks, block, query):
+                low = max(block * BLOCK_LINES, start)
+                for index in range(low, min((block + 1) * BLOCK_LINES, stop)):
+                    if query.matches(lines[index]):
+                        yield index
+            block += 1
+
+
+class WrapMap:
+    """
+    Soft-wrap layout of the lines shown in the log: maps display rows to
+    (line, part) for the current view width.
+
+    Each full block keeps its line widths sorted, widest first, so laying
+    out for a new width counts one row per line and then only visits the
+    lines wider than the view; a resize costs O(blocks + wrapped lines).
+    """
+
+    def __init__(self):
+        self.widths = []        # Display width (cells) of each line.
+        self.block_max = []     # Widest line of each block.
+        self.block_sorted = []  # Widths of each full block, widest first.
+        self.block_rows = []    # Rows each block takes at self.width.
+        self.starts = [0]       # First row of each block, plus the total.
+        self.width = 0          # 0 until laid out: one row per line.
+
+    def __len__(self):
+        return len(self.widths)
+
+    @property
+    def rows(self) -> int:
+        return self.starts[-1]
+
+    def _line_rows(self, width):
+        return -(-width // self.width) or 1
+
+    def _count_rows(self, block):
+        low = block * BLOCK_LINES
+        count = min(len(self.widths) - low, BLOCK_LINES)
+        width = self.width
+        if not width or self.block_max[block] <= width:
+            return count
+        if block < len(self.block_sorted):
+            widths = self.block_sorted[block]
+        else:
+            widths = sorted(self.widths[low:], reverse=True)
+        for line_width in widths:
+            if line_width <= width:
+                break
+            count += -(-line_width // width) - 1
+        return count
+
+    def extend(self, widths):
+        if not widths:
+            return
+        first = len(self.widths) // BLOCK_LINES
+        self.widths.extend(widths)
+        for block in range(first, (len(self.widths) - 1) // BLOCK_LINES + 1):
+            low = block * BLOCK_LINES
+            widest = max(self.widths[low:low + BLOCK_LINES])
+            if block == len(self.block_max):
+                self.block_max.append(widest)
+                self.block_rows.append(0)
+                self.starts.append(0)
+            self.block_max[block] = widest
+            if block == len(self.block_sorted) and len(self.widths) >= low + BLOCK_LINES:
+                self.block_sorted.append(sorted(self.widths[low:low + BLOCK_LINES], reverse=True))
+            self.block_rows[block] = self._count_rows(block)
+            self.starts[block + 1] = self.starts[block] + self.block_rows[block]
+
+    def set_width(self, line, width):
+        """Changes the width of one line, re-counting only its block."""
+        if self.widths[line] == width:
+            return
+        self.widths[line] = width
+        block = line // BLOCK_LINES
+        low = block * BLOCK_LINES
+        self.block_max[block] = max(self.widths[low:low + BLOCK_LINES])
+        if block < len(self.block_sorted):
+            self.block_sorted[block] = sorted(self.widths[low:low + BLOCK_LINES], reverse=True)
+        rows = self._count_rows(block)
+        delta = rows - self.block_rows[block]
+        if delta:
+            self.block_rows[block] = rows
+            for index in range(block + 1, len(self.starts)):
+                self.starts[index] += delta
+
+    def layout(self, width):
+        """Lays the lines out `width` cells wide (0 turns wrapping off)."""
+        self.width = max(width, 0)
+        self.block_rows = [self._count_rows(block) for block in range(len(self.block_max))]
+        self.starts = list(accumulate(self.block_rows, initial=0))
+
+    def locate(self, row):
+        """
+        Returns (line, part) shown at display `row`, where part counts the
+        wrapped rows of that line, or None past the end.
+        """
+        if not 0 <= row < self.rows:
+            return None
+        block = bisect_right(self.starts, row) - 1
+        low = block * BLOCK_LINES
+        row -= self.starts[block]
+        if not self.width or self.block_max[block] <= self.width:
+            return low + row, 0
+        line_rows = self._line_rows
+        for line in range(low, min(low + BLOCK_LINES, len(self.widths))):
+            rows = line_rows(self.widths[line])
+            if row < rows:
+                return line, row
+            row -= rows
+        return None
+
+    def row_of(self, line):
+        """Returns the first display row of `line`."""
+        line = min(max(line, 0), len(self.widths))
+        block = min(line // BLOCK_LINES, len(self.block_max))
+        low = block * BLOCK_LINES
+        if block == len(self.block_max) or not self.width or self.block_max[block] <= self.width:
+            return self.starts[block] + line - low
+        return self.starts[block] + sum(map(self._line_rows, self.widths[low:line]))
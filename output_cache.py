@@ -0,0 +1,91 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   output_cache.py
+#
+# Copyright 2026 AL Haines
+#
+# Latest output of each dashboard command, kept in memory and mirrored to
+# one small JSON file per command under cache_dir('output'), so results of
+# scheduled runs survive a dashboard restart.
+
+import os
+import time
+import hashlib
+import threading
+
+from local_cache import cache_dir, read_json, write_json_atomic
+
+MAX_LINES = 2000    # Only the tail of very long outputs is kept.
+
+
+def format_age(seconds):
+    """
+    Returns a short human readable age, e.g. '45s', '3m 12s', '2h 5m'.
+    """
+    seconds = max(0, int(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds}s"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours}h {minutes}m"
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h"
+
+
+class OutputCache:
+    """
+    Thread-safe store of the last run of each command, keyed by its menu key.
+
+    An entry is a dict with 'lines', 'returncode', 'started_at' and
+    'finished_at' (epoch seconds).
+    """
+
+    def __init__(self, max_lines=MAX_LINES):
+        self.max_lines = max_lines
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(cache_dir('output'), f"{digest}.json")
+
+    def get(self, key):
+        """
+        Returns the cached entry for `key` (loading it from disk on first use), or None.
+        """
+        with self.lock:
+            if key in self.entries:
+                return self.entries[key]
+        entry = read_json(self._path(key))
+        if not isinstance(entry, dict) or 'lines' not in entry:
+            entry = None
+        with self.lock:
+            return self.entries.setdefault(key, entry)
+
+    def put(self, key, lines, returncode=None, started_at=None, finished_at=None):
+        """
+        Stores the output of a finished run and writes it to disk.
+        """
+        lines = list(lines)[-self.max_lines:]
+        entry = {
+            'key': key,
+            'lines': lines,
+            'returncode': returncode,
+            'started_at': started_at,
+            'finished_at': finished_at or time.time(),
+        }
+        with self.lock:
+            self.entries[key] = entry
+        write_json_atomic(self._path(key), entry)
+        return entry
+
+    @staticmethod
+    def age(entry, now=None):
+        """
+        Returns seconds since the entry's run finished.
+        """
+        return (now or time.time()) - (entry.get('finished_at') or 0)
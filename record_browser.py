@@ -0,0 +1,118 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   record_browser.py
+#
+# Copyright 2026 AL Haines
+#
+# Textual record browser used by 'showme.py <db> dump <table>'.
+#
+# Rows are pulled in keyset pages of (id, title, note preview) as the cursor
+# approaches the end of what has been loaded, so a table of any size opens
+# immediately. The DataTable only renders the rows that are on screen, and
+# the full record is fetched only when a row is opened with Enter.
+
+import startup_profile
+from textual import work
+from textual.app import App, ComposeResult
+from textual.binding import Binding
+from textual.containers import VerticalScroll
+from textual.screen import Screen
+from textual.widgets import DataTable, Footer, Header, Static
+
+# Start fetching the next page when the cursor is this close to the last loaded row.
+PREFETCH_MARGIN = 20
+
+
+class RecordScreen(Screen):
+    """Shows one full record as a rich renderable."""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Back"),
+        Binding("q", "app.pop_screen", "Back", show=False),
+    ]
+
+    def __init__(self, renderable):
+        super().__init__()
+        self.renderable = renderable
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        with VerticalScroll():
+            yield Static(self.renderable)
+        yield Footer()
+
+
+class RecordBrowserApp(App):
+    """Keyset-paginated, virtually scrolled browser over one table."""
+
+    TITLE = "showme"
+    BINDINGS = [("q", "quit", "Quit")]
+
+    def __init__(self, showme_app, table, page_size, format_record):
+        super().__init__()
+        self.showme = showme_app
+        self.table = table
+        self.page_size = page_size
+        self.format_record = format_record
+        self.sub_title = f"{showme_app.db_name}.{table}"
+        self.columns = None
+        self.last_id = None
+        self.exhausted = False
+        self.loading = False
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        yield DataTable(id="records", cursor_type="row", zebra_stripes=True)
+        yield Footer()
+
+    def on_mount(self) -> None:
+        records = self.query_one(DataTable)
+        records.add_column("ID", key="id")
+        records.add_column("Title", key="title")
+        records.add_column("Note Preview", key="preview")
+        records.focus()
+        self.load_next_page()
+
+    @work(thread=True, exclusive=True, group="page")
+    def load_next_page(self) -> None:
+        """Fetches the next keyset page in the background."""
+        if self.columns is None:
+            self.columns = self.showme.summary_columns(self.table)
+        rows = self.showme.fetch_summary_page(self.table, self.columns, self.last_id, self.page_size)
+        self.call_from_thread(self._add_page, rows, len(rows) < self.page_size)
+
+    def _add_page(self, rows, exhausted) -> None:
+        records = self.query_one(DataTable)
+        for row in rows:
+            title = " ".join(str(row.get('title') or '').split())
+            preview = " ".join(str(row.get('preview') or '').split())
+            records.add_row(str(row['id']), title, preview, key=str(row['id']))
+        if rows:
+            self.last_id = rows[-1]['id']
+            startup_profile.mark('first_output')
+        self.exhausted = exhausted
+        self.loading = False
+        loaded = records.row_count
+        self.sub_title = f"{self.showme.db_name}.{self.table} - {loaded} record(s){'' if exhausted else '+'}"
+        if not loaded:
+            self.notify(f"No records found in table '{self.table}'.", severity="warning")
+
+    def on_data_table_row_highlighted(self, event: DataTable.RowHighlighted) -> None:
+        if self.exhausted or self.loading:
+            return
+        if event.cursor_row >= event.data_table.row_count - PREFETCH_MARGIN:
+            self.loading = True
+            self.load_next_page()
+
+    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
+        self.open_record(int(event.row_key.value))
+
+    @work(thread=True, exclusive=True, group="record")
+    def open_record(self, record_id) -> None:
+        """Fetches the full record only when it is opened."""
+        record = self.showme.fetch_record(self.table, record_id)
+        if record is None:
+            self.call_from_thread(self.notify, f"No record found with ID: {record_id}", severity="error")
+            return
+        self.call_from_thread(self.push_screen, RecordScreen(self.format_record(record)))
@@ -0,0 +1,319 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   remote.py
+#
+# Copyright 2026 AL Haines
+#
+# Remote execution backend for runner.stream_command.
+#
+# Hosts live in the `dashboard_hosts` table (see migration 7). A command
+# whose `hosts` column is set runs on every host it names, in parallel:
+#
+#   hosts = 'pi1,pi2'     named hosts
+#   hosts = '@backup'     every enabled host whose host_group is 'backup'
+#   hosts = '*'           every enabled host
+#
+# Each host gets one multiplexed SSH master connection (ControlMaster with
+# ControlPersist), started once in the background and reused by every later
+# command, so only the first run pays for the handshake. Output lines are
+# prefixed with the host name (or grouped per host with split=True) and a
+# summary line reports the aggregated exit status.
+#
+# Set DASHBOARD_SSH_TRANSPORT=stub to run commands locally instead of over
+# SSH (each "host" is a local shell with REMOTE_HOST set), for testing.
+#
+# Command line:
+#
+#   remote.py run "uptime" --hosts '*' [--split]
+#   remote.py hosts
+#   remote.py check | close
+
+import os
+import sys
+import queue
+import signal
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, '/home/al/system_files/projects')
+sys.path.insert(0, '/home/al/system_files/projects/py')
+
+try:
+    from local_cache import state_dir
+    from terminal_lines import read_lines
+except ImportError as e:
+    print(f"ERROR: Critical modules not found: {e}", file=sys.stderr)
+    sys.exit(1)
+
+MAX_PARALLEL_HOSTS = 16
+CONTROL_PERSIST = 600       # Seconds an idle master connection is kept open.
+CONNECT_TIMEOUT = 10
+HOSTS_QUERY = "SELECT `name`, `address`, `port`, `host_group` FROM `dashboard_hosts` WHERE `enabled` = 1 ORDER BY `name`"
+
+
+def resolve_hosts(spec, db=None):
+    """
+    Expands a `hosts` column value into host rows.
+
+    Returns:
+        tuple: (list of host dicts, list of unknown names).
+    """
+    names = [part.strip() for part in str(spec or '').split(',') if part.strip()]
+    if not names:
+        return [], []
+    if db is None:
+        from MySql import MySQL
+        db = MySQL()
+    rows = db.get_data(HOSTS_QUERY) or []
+    by_name = {row['name']: row for row in rows}
+    selected, unknown = [], []
+    for name in names:
+        if name == '*':
+            matches = rows
+        elif name.startswith('@'):
+            matches = [row for row in rows if row.get('host_group') == name[1:]]
+        elif name in by_name:
+            matches = [by_name[name]]
+        else:
+            unknown.append(name)
+            continue
+        selected.extend(row for row in matches if row not in selected)
+    return selected, unknown
+
+
+class SshTransport:
+    """
+    Builds ssh command lines that share one persistent master per host.
+    """
+
+    def __init__(self, control_dir=None):
+        self.control_dir = control_dir or state_dir('ssh')
+        self.lock = threading.Lock()
+        self.host_locks = {}
+
+    def _base(self, host):
+        argv = ['ssh',
+                '-o', 'BatchMode=yes',
+                '-o', f'ConnectTimeout={CONNECT_TIMEOUT}',
+                '-o', f"ControlPath={os.path.join(self.control_dir, '%C')}"]
+        if host.get('port'):
+            argv += ['-p', str(host['port'])]
+        return argv
+
+    def ensure_master(self, host):
+        """
+        Starts the host's master connection unless one is already running.
+        The master is forked with its stdio detached, so it never holds the
+        pipes of the commands that later share it.
+        """
+        with self.lock:
+            host_lock = self.host_locks.setdefault(host['name'], threading.Lock())
+        with host_lock:
+            check = subprocess.run(self._base(host) + ['-O', 'check', host['address']],
+                                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            if check.returncode == 0:
+                return True
+            start = subprocess.run(self._base(host) + ['-o', 'ControlMaster=yes', '-o', f'ControlPersist={CONTROL_PERSIST}',
+                                                       '-f', '-N', host['address']],
+                                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return start.returncode == 0
+
+    def argv(self, host, command):
+        # ControlMaster=no: use the master if it is up, otherwise connect directly.
+        return self._base(host) + ['-o', 'ControlMaster=no', '-T', host['address'], command]
+
+    def close(self, host):
+        subprocess.run(self._base(host) + ['-O', 'exit', host['address']],
+                       stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def env(self, host):
+        return None
+
+
+class StubTransport:
+    """
+    Runs "remote" commands in a local shell. REMOTE_HOST holds the host name.
+    """
+
+    def ensure_master(self, host):
+        return True
+
+    def argv(self, host, command):
+        return ['/bin/sh', '-c', command]
+
+    def close(self, host):
+        pass
+
+    def env(self, host):
+        env = os.environ.copy()
+        env['REMOTE_HOST'] = host['name']
+        return env
+
+
+def default_transport():
+    if os.environ.get('DASHBOARD_SSH_TRANSPORT') == 'stub':
+        return StubTransport()
+    return SshTransport()
+
+
+class HostRuns:
+    """
+    The children of one fan-out. runner.stop_process() calls stop() to end them all.
+    """
+
+    def __init__(self):
+        self.processes = []
+        self.lock = threading.Lock()
+        self.stopped = False
+
+    def add(self, process):
+        with self.lock:
+            self.processes.append(process)
+            stopped = self.stopped
+        if stopped:
+            self._kill(process, signal.SIGTERM)
+
+    @property
+    def returncode(self):
+        """First non-zero exit code of the children, 0 if all succeeded, None while any runs."""
+        with self.lock:
+            codes = [p.returncode for p in self.processes]
+        if any(code is None for code in codes):
+            return None
+        return next((code for code in codes if code != 0), 0)
+
+    def poll(self):
+        with self.lock:
+            running = [p for p in self.processes if p.poll() is None]
+        return None if running else 0
+
+    @staticmethod
+    def _kill(process, sig):
+        try:
+            os.killpg(process.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def stop(self, timeout=3.0):
+        with self.lock:
+            self.stopped = True
+            processes = list(self.processes)
+        for process in processes:
+            if process.poll() is None:
+                self._kill(process, signal.SIGTERM)
+        for process in processes:
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self._kill(process, signal.SIGKILL)
+                process.wait()
+
+
+def stream_fan_out(command_string, hosts, transport=None, on_start=None, split=False, results=None):
+    """
+    Runs command_string on every host in parallel and yields output lines,
+    each prefixed with '[host] ' (or grouped per host when split is True),
+    followed by a summary of the exit statuses.
+
+    on_start, if given, is called with a HostRuns object that can stop every child.
+    results, if given, is a dict that receives host name -> exit code.
+    """
+    transport = transport or default_transport()
+    runs = HostRuns()
+    if on_start:
+        on_start(runs)
+    lines = queue.Queue()
+    width = max(len(host['name']) for host in hosts)
+    done = object()
+
+    def run_host(host):
+        name = host['name']
+        returncode = None
+        try:
+            if not transport.ensure_master(host):
+                lines.put((name, f"could not open a master connection to {host['address']}, connecting directly"))
+            process = subprocess.Popen(transport.argv(host, command_string), stdin=subprocess.DEVNULL,
+                                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                       env=transport.env(host), start_new_session=True)
+            runs.add(process)
+            # Host lines are interleaved, so progress bars are collapsed to their final state.
+            for line in read_lines(process.stdout):
+                lines.put((name, line))
+            process.stdout.close()
+            returncode = process.wait()
+        except Exception as e:
+            lines.put((name, f"error: {e}"))
+        finally:
+            lines.put((name, done, returncode))
+
+    results = {} if results is None else results
+    grouped = {host['name']: [] for host in hosts}
+    executor = ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_HOSTS, len(hosts)), thread_name_prefix="remote")
+    try:
+        for host in hosts:
+            executor.submit(run_host, host)
+        while len(results) < len(hosts):
+            item = lines.get()
+            name = item[0]
+            if item[1] is done:
+                results[name] = item[2]
+                if split:
+                    yield f"===== {name} (exit {item[2]}) ====="
+                    yield from grouped.pop(name)
+            elif split:
+                grouped[name].append(item[1])
+            else:
+                yield f"[{name:<{width}}] {item[1]}"
+    finally:
+        runs.stop()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    failed = [f"{name} (exit {code})" for name, code in results.items() if code != 0]
+    if failed:
+        yield f"\n--- {len(hosts) - len(failed)}/{len(hosts)} hosts succeeded; failed: {', '.join(failed)} ---"
+    else:
+        yield f"\n--- All {len(hosts)} hosts succeeded ---"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a command on several hosts over multiplexed SSH.")
+    subparsers = parser.add_subparsers(dest='command', required=True, help="Command to execute")
+    p_run = subparsers.add_parser('run', help="Run a command on the given hosts in parallel.")
+    p_run.add_argument('remote_command', help="Command line to run on each host.")
+    p_run.add_argument('--hosts', required=True, help="Comma separated host names, '@group' or '*'.")
+    p_run.add_argument('--split', action='store_true', help="Group output per host instead of prefixing lines.")
+    subparsers.add_parser('hosts', help="List the enabled hosts.")
+    subparsers.add_parser('check', help="Open master connections to every enabled host.")
+    subparsers.add_parser('close', help="Close all master connections.")
+    args = parser.parse_args()
+
+    transport = default_transport()
+    if args.command == 'run':
+        hosts, unknown = resolve_hosts(args.hosts)
+        if unknown:
+            print(f"WARNING: Unknown hosts: {', '.join(unknown)}", file=sys.stderr)
+        if not hosts:
+            sys.exit("ERROR: No hosts selected.")
+        results = {}
+        for line in stream_fan_out(args.remote_command, hosts, transport, split=args.split, results=results):
+            print(line, flush=True)
+        sys.exit(0 if all(code == 0 for code in results.values()) else 1)
+    hosts, _ = resolve_hosts('*')
+    if args.command == 'hosts':
+        for host in hosts:
+            port = f":{host['port']}" if host.get('port') else ""
+            print(f"{host['name']:<20} {host['address']}{port}  {host.get('host_group') or ''}")
+    elif args.command == 'check':
+        for host in hosts:
+            print(f"{host['name']:<20} {'up' if transport.ensure_master(host) else 'DOWN'}")
+    elif args.command == 'close':
+        for host in hosts:
+            transport.close(host)
+
+
+if __name__ == "__main__":
+    main()
+#============= end of code      ================#
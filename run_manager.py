@@ -0,0 +1,312 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   run_manager.py
+#
+# Copyright 2026 AL Haines
+#
+# Bookkeeping for command runs shared by the dashboard TUI and the headless
+# API (api_server.py).
+#
+# Both draw from the same pool of run slots, so a process serving scripts
+# and a person at the keyboard never start more than MAX_CONCURRENT_RUNS
+# commands between them. API runs are kept, with their output, for a while
+# so clients can poll status or re-attach to the stream.
+#
+# Given a spool_dir (the run daemon, rund.py), a manager also writes every
+# run's output to a file there, so a client re-attaching late still gets
+# the whole scrollback, however much of it has dropped out of memory.
+
+import os
+import sys
+import time
+import shlex
+import itertools
+import threading
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+
+from runner import stream_command, stop_process
+from proc_metrics import usage_dict
+from terminal_lines import dump_line, load_line
+
+MAX_CONCURRENT_RUNS = 4
+RUN_HISTORY = 100            # Finished runs kept for status queries.
+MAX_RUN_LINES = 20000        # Output lines kept per run; older ones are dropped.
+SPOOL_INDEX_EVERY = 1024     # Spooled lines between two remembered file offsets.
+SPOOL_READ_LINES = 5000      # Spooled lines returned by one read_from() call, at most.
+
+
+def build_command(command_data, user_input=""):
+    """
+    Returns the final command line for a catalog entry, appending user input
+    (shell-quoted if the entry's quote_input flag is set).
+    """
+    final_command = command_data.command_string
+    if user_input:
+        if command_data.quote_input:
+            final_command += " " + shlex.quote(user_input)
+        else:
+            final_command += " " + user_input
+    return final_command
+
+
+class Run:
+    """
+    One execution of a catalog command and its output.
+    """
+
+    def __init__(self, run_id, command_data, command_string, argv=None, live=False, width=None, height=None,
+                 spool_path=None):
+        self.id = run_id
+        self.command_data = command_data
+        self.command_string = command_string
+        self.argv = argv            # Set when the command runs without a shell.
+        self.live = live            # Output includes LineUpdates (see runner.stream_command).
+        self.width = width
+        self.height = height
+        self.status = 'queued'
+        self.returncode = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.lines = deque(maxlen=MAX_RUN_LINES)
+        self.total_lines = 0
+        self.process = None
+        self.usage = None           # Resource usage once a local child has exited (proc_metrics.usage_dict).
+        self.stop_requested = False
+        self.on_done = None
+        self.changed = threading.Condition()
+        # Every line is also written to the spool file, if there is one (see read_from).
+        self.spool_path = spool_path
+        self._spool = None
+        if spool_path:
+            try:
+                self._spool = open(spool_path, 'wb')
+            except OSError as e:
+                print(f"WARNING: Could not create the output spool {spool_path}: {e}", file=sys.stderr)
+                self.spool_path = None
+        self._spool_size = 0
+        self._spool_offsets = [0]   # File offset of every SPOOL_INDEX_EVERY-th line.
+
+    @property
+    def done(self):
+        return self.status in ('finished', 'failed', 'stopped')
+
+    def append(self, line):
+        with self.changed:
+            self.lines.append(line)
+            self.total_lines += 1
+            if self._spool is not None:
+                data = (dump_line(line) + '\n').encode('utf-8', 'replace')
+                self._spool.write(data)
+                self._spool_size += len(data)
+                if self.total_lines % SPOOL_INDEX_EVERY == 0:
+                    self._spool_offsets.append(self._spool_size)
+            self.changed.notify_all()
+
+    def set_status(self, status, returncode=None):
+        with self.changed:
+            self.status = status
+            if status == 'running':
+                self.started_at = time.time()
+            elif status in ('finished', 'failed', 'stopped'):
+                self.returncode = returncode
+                self.finished_at = time.time()
+                if self._spool is not None:
+                    self._spool.close()
+                    self._spool = None
+            self.changed.notify_all()
+
+    def read_from(self, index, timeout=None):
+        """
+        Returns (lines, next_index, done) for output from line number `index`
+        on, waiting up to `timeout` seconds if there is nothing new yet.
+        Lines already dropped from the buffer are read back from the spool
+        file, up to SPOOL_READ_LINES at a time; without one they are skipped.
+        """
+        with self.changed:
+            if index >= self.total_lines and not self.done and timeout:
+                self.changed.wait(timeout)
+            first = self.total_lines - len(self.lines)
+            if index < first and self.spool_path:
+                lines = self._read_spool(index, min(first, index + SPOOL_READ_LINES))
+                if lines is not None:
+                    return lines, index + len(lines), False
+            start = max(index, first)
+            lines = list(itertools.islice(self.lines, start - first, None))
+            return lines, self.total_lines, self.done
+
+    def _read_spool(self, start, stop):
+        """Spooled lines [start, stop), or None if the file cannot be read. Called with the lock held."""
+        if self._spool is not None:
+            self._spool.flush()
+        try:
+            with open(self.spool_path, 'rb') as f:
+                block = start // SPOOL_INDEX_EVERY
+                f.seek(self._spool_offsets[block])
+                for _ in range(start - block * SPOOL_INDEX_EVERY):
+                    f.readline()
+                return [load_line(f.readline()[:-1].decode('utf-8', 'replace')) for _ in range(stop - start)]
+        except OSError:
+            return None
+
+    def remove_spool(self):
+        with self.changed:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+        if self.spool_path:
+            try:
+                os.unlink(self.spool_path)
+            except OSError:
+                pass
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'key': self.command_data.key,
+            'name': self.command_data.name,
+            'status': self.status,
+            'returncode': self.returncode,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'lines': self.total_lines,
+            'usage': self.usage,
+            'pid': getattr(self.process, 'pid', None),
+        }
+
+
+class RunManager:
+    """
+    Run slots shared by every caller in this process, plus the API's run registry.
+    Output is spooled to files in `spool_dir` if it is given.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_RUNS, spool_dir=None):
+        self.max_concurrent = max_concurrent
+        self.spool_dir = spool_dir
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.active = 0
+        self.lock = threading.Lock()
+        self.runs = OrderedDict()
+        self.ids = itertools.count(1)
+
+    @contextmanager
+    def slot(self, on_wait=None):
+        """
+        Holds one run slot for the duration of the block. If none is free,
+        on_wait() is called once and the caller blocks until one is.
+        """
+        if not self.slots.acquire(blocking=False):
+            if on_wait:
+                on_wait()
+            self.slots.acquire()
+        with self.lock:
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active -= 1
+            self.slots.release()
+
+    def start(self, command_data, user_input="", on_done=None, share=False, live=False, width=None, height=None):
+        """
+        Queues a run of a catalog command in a background thread and returns it.
+        on_done(run) is called from that thread once the run has ended.
+
+        With `share`, a run of the same command line that has not ended yet
+        is returned instead of starting another one (on_done is then not
+        set). `live`, `width` and `height` are passed on to stream_command.
+        """
+        command_string = build_command(command_data, user_input)
+        with self.lock:
+            if share:
+                for run in self.runs.values():
+                    if not run.done and run.command_data.key == command_data.key \
+                            and run.command_string == command_string:
+                        return run
+            run_id = next(self.ids)
+            spool_path = os.path.join(self.spool_dir, f"{run_id}.log") if self.spool_dir else None
+            run = Run(run_id, command_data, command_string, command_data.argv_for(user_input),
+                      live=live, width=width, height=height, spool_path=spool_path)
+            run.on_done = on_done
+            self.runs[run.id] = run
+            finished = [r.id for r in self.runs.values() if r.done]
+            for old_id in finished[:max(0, len(self.runs) - RUN_HISTORY)]:
+                self.runs.pop(old_id).remove_spool()
+        threading.Thread(target=self._execute, args=(run,), name=f"run-{run.id}", daemon=True).start()
+        return run
+
+    def _set_process(self, run, process):
+        run.process = process
+        if run.stop_requested:
+            stop_process(process)
+
+    def _set_usage(self, run, usage):
+        if usage is not None:
+            run.usage = usage_dict(usage)
+
+    def _execute(self, run):
+        try:
+            self._run(run)
+        finally:
+            if run.on_done is not None:
+                run.on_done(run)
+
+    def _run(self, run):
+        with self.slot():
+            if run.stop_requested:
+                run.set_status('stopped')
+                return
+            run.set_status('running')
+            lines = stream_command(run.command_string, run.command_data.command_type,
+                                   on_start=lambda p: self._set_process(run, p),
+                                   hosts=run.command_data.hosts, argv=run.argv, live=run.live,
+                                   width=run.width, height=run.height,
+                                   on_exit=lambda returncode, usage: self._set_usage(run, usage))
+            try:
+                for line in lines:
+                    run.append(line)
+            except Exception as e:
+                run.append(f"An error occurred while running the command: {e}")
+                run.set_status('failed')
+                return
+            finally:
+                lines.close()
+            returncode = getattr(run.process, 'returncode', None)
+            if run.stop_requested:
+                run.set_status('stopped', returncode)
+            else:
+                run.set_status('finished' if returncode in (0, None) else 'failed', returncode)
+
+    def get(self, run_id):
+        with self.lock:
+            return self.runs.get(run_id)
+
+    def list(self):
+        with self.lock:
+            return [run.summary() for run in self.runs.values()]
+
+    def stop(self, run_id):
+        run = self.get(run_id)
+        if run is None:
+            return None
+        run.stop_requested = True
+        stop_process(run.process)
+        return run
+
+    def stop_all(self):
+        with self.lock:
+            runs = list(self.runs.values())
+        for run in runs:
+            if not run.done:
+                run.stop_requested = True
+                stop_process(run.process)
+
+    def status(self):
+        with self.lock:
+            queued = sum(1 for run in self.runs.values() if run.status == 'queued')
+            return {'active': self.active, 'queued': queued, 'max_concurrent': self.max_concurrent}
@@ -0,0 +1,381 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   rund.py
+#
+# Copyright 2026 AL Haines
+#
+# Run daemon: runs catalog commands outside the dashboard.
+#
+# A log-mode run used to be a child of the TUI, so quitting with 'q' or
+# losing the SSH session took the output view with it, and usually the
+# command as well. The run daemon is the command API (api_server.py) on a
+# RunManager of its own, in a process of its own session that does not
+# care about the terminal, with every run's output spooled to a file in
+# its state directory (run_manager.SPOOL_INDEX_EVERY and friends).
+#
+# While it is running, the dashboard starts log-mode commands in it and
+# only follows their output: switching commands or quitting detaches and
+# the run keeps going. Attaching again (the palette's 'Attach' entries,
+# or 'rund.py attach') replays the whole scrollback from the spool before
+# following. Runs are shared: starting a command line that is already
+# running in the daemon, from any dashboard on this host, attaches to that
+# run instead of starting it again.
+#
+# The daemon is optional. 'dashboard.py --rund' starts it when needed;
+# without it the dashboard runs commands itself, as before. Scheduled
+# commands, workflows and the in-process API (--api) still run in the
+# dashboard.
+#
+# Command line:
+#
+#   rund.py start                     # start the daemon in the background
+#   rund.py serve                     # run it in the foreground
+#   rund.py stop                      # stop it, and every run it still has
+#   rund.py status
+#   rund.py runs                      # running and recent runs
+#   rund.py attach RUN_ID [--from N]  # print a run's output and follow it; Ctrl+C detaches
+#   rund.py kill RUN_ID               # stop a run
+
+import os
+import sys
+import json
+import time
+import fcntl
+import glob
+import signal
+import socket
+import argparse
+import subprocess
+import http.client
+
+sys.path.insert(0, '/home/al/system_files/projects')
+sys.path.insert(0, '/home/al/system_files/projects/py')
+
+try:
+    from MySql import MySQL
+    from local_cache import state_dir
+    from terminal_lines import load_line
+    from command_spec import CATALOG_QUERY, load_specs
+    from run_manager import RunManager
+    from api_server import make_server
+    from proc_metrics import format_duration
+except ImportError as e:
+    print(f"ERROR: Critical modules not found: {e}", file=sys.stderr)
+    sys.exit(1)
+
+CONNECT_TIMEOUT = 5.0       # Seconds for a request to the daemon (not for following output).
+START_TIMEOUT = 5.0         # Seconds to wait for a daemon started in the background to answer.
+
+
+def daemon_dir(*parts):
+    """The daemon's state directory (lock, log and spools)."""
+    return state_dir('rund', *parts)
+
+
+def default_socket_path():
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, 'dashboard_rund.sock')
+    return os.path.join(daemon_dir(), 'rund.sock')
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """http.client over a Unix socket."""
+
+    def __init__(self, socket_path, timeout=CONNECT_TIMEOUT):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class RunStream:
+    """
+    Output of a daemon run, from line `start` on, as an iterator of lines
+    (and terminal_lines.LineUpdate objects when `live`). Iteration ends
+    with the run, or when close() is called, which may be done from
+    another thread to detach.
+
+    Raises:
+        OSError: If the daemon cannot be reached or goes away mid-stream.
+        ValueError: If the daemon does not know the run.
+    """
+
+    def __init__(self, socket_path, run_id, start=0, live=True):
+        self.live = live
+        self.closed = False
+        self.conn = UnixHTTPConnection(socket_path, timeout=None)
+        try:
+            self.conn.connect()
+            # http.client lets go of the socket once the response is read until close; keep it for close().
+            self.sock = self.conn.sock
+            self.conn.request('GET', f"/runs/{run_id}/output?from={start}{'&live=1' if live else ''}")
+            self.response = self.conn.getresponse()
+        except http.client.HTTPException as e:
+            self.conn.close()
+            raise OSError(f"bad response from the run daemon: {e}") from e
+        except OSError:
+            self.conn.close()
+            raise
+        if self.response.status != 200:
+            self.conn.close()
+            raise ValueError(f"run {run_id}: HTTP {self.response.status}")
+
+    def __iter__(self):
+        live = self.live
+        try:
+            for raw in self.response:
+                text = raw.decode('utf-8', 'replace')
+                if text.endswith('\n'):
+                    text = text[:-1]
+                yield load_line(text) if live else text
+        except (OSError, http.client.HTTPException) as e:
+            if not self.closed:
+                raise OSError(f"lost the run daemon: {e}") from e
+        finally:
+            self.conn.close()
+
+    def close(self):
+        """Stops following (the run itself goes on)."""
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class RundClient:
+    """
+    Client for the run daemon's API. Requests raise OSError if the daemon
+    cannot be reached and ValueError if it turns a request down.
+    """
+
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or default_socket_path()
+
+    def _request(self, method, path, body=None):
+        conn = UnixHTTPConnection(self.socket_path)
+        try:
+            data = None if body is None else json.dumps(body).encode('utf-8')
+            conn.request(method, path, body=data, headers={'Content-Type': 'application/json'} if data else {})
+            response = conn.getresponse()
+            payload = json.loads(response.read() or b'null')
+        except (http.client.HTTPException, ValueError) as e:
+            raise OSError(f"bad response from the run daemon: {e}") from e
+        finally:
+            conn.close()
+        if response.status >= 400:
+            message = payload.get('error') if isinstance(payload, dict) else None
+            raise ValueError(message or f"HTTP {response.status}")
+        return payload
+
+    def status(self):
+        """The daemon's status, or None if it is not running."""
+        try:
+            return self._request('GET', '/status')
+        except (OSError, ValueError):
+            return None
+
+    def start(self, key, user_input="", width=None, height=None, live=True):
+        """
+        Starts catalog command `key`, or joins the run of the same command
+        line that is still going. Returns the run's summary.
+        """
+        return self._request('POST', '/runs', {'key': key, 'input': user_input, 'share': True, 'live': live,
+                                               'width': width, 'height': height})
+
+    def runs(self):
+        return self._request('GET', '/runs')
+
+    def get(self, run_id):
+        return self._request('GET', f"/runs/{run_id}")
+
+    def stop(self, run_id):
+        return self._request('DELETE', f"/runs/{run_id}")
+
+    def follow(self, run_id, start=0, live=True):
+        """Returns a RunStream of the run's output from line `start` on."""
+        return RunStream(self.socket_path, run_id, start, live)
+
+
+def spawn_daemon(socket_path=None):
+    """
+    Starts the daemon detached, in a session of its own, and returns
+    immediately. Its stderr goes to rund.log in the state directory.
+    """
+    command = [sys.executable, os.path.abspath(__file__), 'serve']
+    if socket_path:
+        command += ['--socket', socket_path]
+    try:
+        with open(os.path.join(daemon_dir(), 'rund.log'), 'ab') as log:
+            subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=log,
+                             start_new_session=True, close_fds=True)
+        return True
+    except OSError as e:
+        print(f"WARNING: Could not start the run daemon: {e}", file=sys.stderr)
+        return False
+
+
+def ensure_running(socket_path=None, timeout=START_TIMEOUT):
+    """
+    Returns a RundClient for the daemon, starting it first if it is not
+    running, or None if it does not answer within `timeout` seconds.
+    """
+    client = RundClient(socket_path)
+    if client.status() is not None:
+        return client
+    if not spawn_daemon(socket_path):
+        return None
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        if client.status() is not None:
+            return client
+    return None
+
+
+def load_commands():
+    """Returns the enabled catalog as {key: CommandSpec}, or None on error."""
+    db = MySQL(exit_on_connect_error=False)
+    rows = db.get_data(CATALOG_QUERY)
+    if db.last_error:
+        return None
+    return {command_data.key: command_data for command_data in load_specs(rows)}
+
+
+def serve(socket_path=None):
+    """Runs the daemon in this process until SIGTERM or Ctrl+C."""
+    lock = os.open(os.path.join(daemon_dir(), 'rund.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        sys.exit("ERROR: The run daemon is already running.")
+    commands = load_commands()
+    if commands is None:
+        sys.exit("CRITICAL: Failed to load commands from database.")
+    # Runs (and their ids) do not outlive the daemon, so neither do their spools.
+    spool_dir = daemon_dir('spool')
+    for path in glob.glob(os.path.join(spool_dir, '*.log')):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    manager = RunManager(spool_dir=spool_dir)
+    try:
+        server = make_server(commands, manager, socket_path=socket_path or default_socket_path())
+    except OSError as e:
+        sys.exit(f"CRITICAL: Could not listen on the run daemon socket: {e}")
+    server.reload_commands = load_commands
+    # The daemon is there to outlive terminals: a hangup is not a reason to stop.
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Run daemon serving {len(commands)} commands on {server.address_label} (pid {os.getpid()})",
+          file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop_all()
+        server.server_close()
+        os.close(lock)
+
+
+def print_runs(runs):
+    now = time.time()
+    for run in runs:
+        if run['finished_at']:
+            when = f"ended {format_duration(now - run['finished_at'])} ago, exit code {run['returncode']}"
+        elif run['started_at']:
+            when = f"running for {format_duration(now - run['started_at'])}"
+        else:
+            when = "waiting for a run slot"
+        print(f"#{run['id']:<5} ({run['key']}) {run['name']:<28} {run['status']:<9} {run['lines']:>8} lines  {when}")
+
+
+def attach(client, run_id, start=0):
+    """Prints a run's output from line `start` on until it ends; Ctrl+C detaches."""
+    try:
+        stream = client.follow(run_id, start, live=False)
+        for line in stream:
+            print(line, flush=True)
+        run = client.get(run_id)
+    except KeyboardInterrupt:
+        print(f"\nDetached; the run goes on ('rund.py attach {run_id}' to follow it again).", file=sys.stderr)
+        return 0
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    print(f"--- {run['status']}, exit code {run['returncode']} ---", file=sys.stderr)
+    return 0 if run['status'] == 'finished' else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run daemon: runs dashboard commands so they outlive the TUI.")
+    parser.add_argument('--socket', help="Unix socket path (default: $XDG_RUNTIME_DIR/dashboard_rund.sock).")
+    subparsers = parser.add_subparsers(dest='command', required=True, help="Command to execute")
+    subparsers.add_parser('start', help="Start the daemon in the background unless it is running.")
+    subparsers.add_parser('serve', help="Run the daemon in the foreground.")
+    subparsers.add_parser('stop', help="Stop the daemon and every run it still has.")
+    subparsers.add_parser('status', help="Show whether the daemon runs and how busy it is.")
+    subparsers.add_parser('runs', help="Show running and recent runs.")
+    p_attach = subparsers.add_parser('attach', help="Print a run's output and follow it (Ctrl+C detaches).")
+    p_attach.add_argument('run_id', type=int, help="Run id (see 'runs').")
+    p_attach.add_argument('--from', dest='start', type=int, default=0, help="First line to print.")
+    p_kill = subparsers.add_parser('kill', help="Stop a run.")
+    p_kill.add_argument('run_id', type=int, help="Run id (see 'runs').")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.socket)
+        return
+    if args.command == 'start':
+        if ensure_running(args.socket) is None:
+            sys.exit(f"ERROR: The run daemon did not start; see {os.path.join(daemon_dir(), 'rund.log')}.")
+        print("The run daemon is running.")
+        return
+
+    client = RundClient(args.socket)
+    status = client.status()
+    if status is None:
+        if args.command in ('stop', 'status'):
+            print("The run daemon is not running.")
+            return
+        sys.exit("ERROR: The run daemon is not running ('rund.py start').")
+
+    if args.command == 'status':
+        print(f"Run daemon pid {status['pid']}, up {format_duration(status['uptime'])}: {status['active']} running, "
+              f"{status['queued']} queued (at most {status['max_concurrent']} at a time), "
+              f"{status['commands']} commands.")
+    elif args.command == 'stop':
+        os.kill(status['pid'], signal.SIGTERM)
+        deadline = time.monotonic() + START_TIMEOUT
+        while client.status() is not None:
+            if time.monotonic() > deadline:
+                sys.exit(f"ERROR: The run daemon (pid {status['pid']}) is still running.")
+            time.sleep(0.1)
+        print("The run daemon has stopped.")
+    elif args.command == 'runs':
+        print_runs(client.runs())
+    elif args.command == 'attach':
+        sys.exit(attach(client, args.run_id, args.start))
+    elif args.command == 'kill':
+        try:
+            run = client.stop(args.run_id)
+        except ValueError as e:
+            sys.exit(f"ERROR: {e}")
+        print(f"Stopping run #{run['id']} ({run['name']}).")
+
+
+if __name__ == "__main__":
+    main()
+#============= end of code      ================#
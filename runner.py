@@ -7,17 +7,132 @@
 #       beautiful display inside the dashboard log.
 
 import subprocess
+import signal
 import sys
 import os
 
-def stream_command(command_string: str, command_type: str):
+import tracing
+from terminal_lines import read_lines
+
+def stop_process(process, timeout: float = 3.0) -> None:
+    """
+    Stops a child started by stream_command, together with anything it spawned.
+    The child runs in its own session, so the whole process group is signalled.
+    """
+    if process is None:
+        return
+    if hasattr(process, 'stop'):
+        # Several children at once, e.g. a remote fan-out (see remote.HostRuns).
+        process.stop(timeout)
+        return
+    if process.poll() is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def _spawn(cmd_to_run, argv, command_env):
+    """
+    Starts the child with its output piped back, exec'ing argv directly
+    when given. If that fails (e.g. no such program), the command line goes
+    through the shell so the error reads as it always has.
+    """
+    # Binary: read_lines decodes and applies \r and cursor movement itself.
+    options = dict(stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=command_env, start_new_session=True)
+    if argv:
+        try:
+            return subprocess.Popen(argv, **options)
+        except OSError:
+            pass
+    return subprocess.Popen(cmd_to_run, shell=True, **options)
+
+def wait_with_usage(process):
+    """
+    Reaps a child started by stream_command with os.wait4, which also
+    returns its resource usage, descendants it waited for included.
+
+    Returns:
+        tuple: (return code, struct_rusage or None if another thread reaped it first).
+    """
+    if process.returncode is None:
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            return process.wait(), None
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return process.returncode, usage
+    return process.returncode, None
+
+def stream_command(command_string: str, command_type: str, on_start=None, hosts=None, width=None, height=None,
+                   argv=None, on_exit=None, live=False):
     """
     Executes a command and yields its output line-by-line.
+
+    on_start, if given, is called with the Popen object once the child has
+    started, so the caller can stop it (see stop_process) from another thread.
+    Closing the generator early also stops the child.
+
+    hosts, if given, is a dashboard_commands.hosts value; the command then
+    runs on those hosts in parallel over SSH (see remote.py).
+
+    width and height, if given, are the size of the pane showing the output.
+    A local child gets them as COLUMNS and LINES, so programs that size their
+    output to the terminal (rich, ls, ...) lay it out for that pane.
+
+    Lines are yielded as a terminal would show them once the child is done
+    with them: carriage returns, backspaces and cursor movement (progress
+    bars) are applied, escape sequences and indentation are kept and only
+    trailing whitespace is removed. With `live` set, a line being redrawn
+    is also yielded while it changes, as terminal_lines.LineUpdate objects
+    that replace an earlier line (see terminal_lines.LineEditor).
+
+    argv, if given, is command_string split into words (see
+    command_spec.split_command); the child is then exec'd directly instead
+    of through /bin/sh.
+
+    on_exit, if given, is called with (return code, struct_rusage or None)
+    once a local child has been reaped; see wait_with_usage.
     """
+    if not tracing.enabled():
+        return _stream_command(command_string, command_type, on_start, hosts, width, height, argv, on_exit, live)
+    return _traced_stream_command(command_string, command_type, on_start, hosts, width, height, argv, on_exit,
+                                  live)
+
+def _traced_stream_command(command_string, command_type, on_start, hosts, width, height, argv, on_exit, live):
+    trace = tracing.begin('stream_command', 'runner', command=command_string[:200], hosts=hosts or None,
+                          shell=argv is None)
+    lines = _stream_command(command_string, command_type, on_start, hosts, width, height, argv, on_exit, live)
+    count = 0
+    try:
+        for line in lines:
+            count += 1
+            yield line
+    finally:
+        lines.close()
+        tracing.end(trace, lines=count)
+
+def _stream_command(command_string, command_type, on_start, hosts, width=None, height=None, argv=None,
+                    on_exit=None, live=False):
     if command_type not in ["shell", "python"]:
         yield f"Command type '{command_type}' is not yet implemented."
         return
 
+    if hosts:
+        from remote import resolve_hosts, stream_fan_out
+        targets, unknown = resolve_hosts(hosts)
+        for name in unknown:
+            yield f"WARNING: Unknown host '{name}' (see the dashboard_hosts table)."
+        if not targets:
+            yield f"FATAL ERROR: No enabled hosts match '{hosts}'."
+            return
+        yield from stream_fan_out(command_string, targets, on_start=on_start)
+        return
+
     cmd_to_run = command_string
     command_env = os.environ.copy()
 
@@ -26,6 +141,12 @@ def stream_command(command_string: str, command_type: str):
     # to output its full 24-bit color ANSI escape codes, even though
     # it's in a pipe. Textual can render these correctly.
     command_env["FORCE_COLOR"] = "1"
+    if width:
+        command_env["COLUMNS"] = str(width)
+    if height:
+        command_env["LINES"] = str(height)
+    # Lets a traced child (ai.py, showme.py, ...) join the dashboard's trace.
+    command_env.update(tracing.child_env())
 
     if cmd_to_run.strip().startswith('sudo'):
         if 'SUDO_ASKPASS' not in command_env:
@@ -37,28 +158,37 @@ def stream_command(command_string: str, command_type: str):
         parts[0] = 'sudo'
         parts.insert(1, '-A')
         cmd_to_run = ' '.join(parts)
+        if argv:
+            argv = ['sudo', '-A', *argv[1:]]
         yield f"INFO: Rerunning with graphical password prompt: {cmd_to_run}"
 
+    process = None
+    child = None
     try:
-        process = subprocess.Popen(
-            cmd_to_run,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding='utf-8',
-            errors='replace',
-            env=command_env
-        )
+        with tracing.span('spawn', 'process', shell=not argv):
+            process = _spawn(cmd_to_run, argv, command_env)
+        child = tracing.begin('child', 'process', pid=process.pid)
+        if on_start:
+            on_start(process)
 
         if process.stdout:
-            for line in iter(process.stdout.readline, ''):
-                yield line.strip()
+            yield from read_lines(process.stdout, live)
             process.stdout.close()
 
-        return_code = process.wait()
+        return_code, usage = wait_with_usage(process)
+        if usage is not None:
+            tracing.end(child, returncode=return_code, user_cpu=usage.ru_utime, system_cpu=usage.ru_stime)
+        else:
+            tracing.end(child, returncode=return_code)
+        child = None
+        if on_exit:
+            on_exit(return_code, usage)
         if return_code != 0:
             yield f"\n--- PROCESS EXITED WITH ERROR CODE: {return_code} ---"
 
     except Exception as e:
         yield f"An unexpected error occurred: {e}"
+    finally:
+        stop_process(process)
+        if child is not None:
+            tracing.end(child, returncode=process.returncode, stopped=True)
@@ -0,0 +1,130 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   scheduler.py
+#
+# Copyright 2026 AL Haines
+#
+# Runs dashboard commands periodically in the background.
+#
+# A command is scheduled when its `background` flag is set and it has an
+# `interval_seconds` (see migration 6). The dashboard calls tick() about once
+# a second; due commands are started on a small bounded thread pool, their
+# output is collected with runner.stream_command and stored in an
+# OutputCache. Each next run is pushed out by a random jitter so commands
+# with the same interval do not all fire together, and a command whose
+# previous run is still going is skipped until the next due time.
+
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from runner import stream_command, stop_process
+
+MAX_WORKERS = 3          # Scheduled commands running at the same time, at most.
+JITTER = 0.1             # Each interval is stretched or shrunk by up to this fraction.
+STARTUP_SPREAD = 5.0     # First runs are spread over this many seconds after startup.
+
+
+def is_scheduled(command_data):
+    """
+    True if the command should be run by the scheduler.
+    """
+    return command_data.background and command_data.interval_seconds > 0 and not command_data.requires_input
+
+
+class Scheduler:
+    """
+    Bounded, jittered periodic runner for background commands.
+    """
+
+    def __init__(self, commands, output_cache, max_workers=MAX_WORKERS, jitter=JITTER):
+        self.output_cache = output_cache
+        self.jitter = jitter
+        self.commands = {cmd.key: cmd for cmd in commands if is_scheduled(cmd)}
+        now = time.monotonic()
+        self.next_due = {key: now + random.uniform(0, STARTUP_SPREAD) for key in self.commands}
+        self.running = set()
+        self.processes = {}
+        self.finished = deque()
+        self.lock = threading.Lock()
+        self.executor = None
+        if self.commands:
+            self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scheduler")
+        self.closed = False
+
+    def __bool__(self):
+        return bool(self.commands)
+
+    def is_scheduled(self, key):
+        return key in self.commands
+
+    def _reschedule(self, key, now):
+        interval = self.commands[key].interval_seconds
+        self.next_due[key] = now + interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def tick(self):
+        """
+        Starts every due command that is not already running.
+
+        Returns:
+            list[str]: Keys of commands whose runs finished since the last tick.
+        """
+        now = time.monotonic()
+        for key, due in self.next_due.items():
+            if due > now or self.closed:
+                continue
+            self._reschedule(key, now)
+            with self.lock:
+                if key in self.running:
+                    continue  # Previous run is still going; skip this one.
+                self.running.add(key)
+            self.executor.submit(self._run, key)
+        finished = []
+        while self.finished:
+            finished.append(self.finished.popleft())
+        return finished
+
+    def _set_process(self, key, process):
+        with self.lock:
+            self.processes[key] = process
+        if self.closed:
+            stop_process(process)
+
+    def _run(self, key):
+        command_data = self.commands[key]
+        started_at = time.time()
+        lines = deque(maxlen=self.output_cache.max_lines)
+        process = None
+        try:
+            output = stream_command(command_data.command_string, command_data.command_type,
+                                    on_start=lambda p: self._set_process(key, p),
+                                    hosts=command_data.hosts, argv=command_data.argv)
+            for line in output:
+                lines.append(line)
+            with self.lock:
+                process = self.processes.get(key)
+            if not self.closed:
+                self.output_cache.put(key, lines, process.returncode if process else None, started_at)
+        except Exception as e:
+            lines.append(f"An error occurred in the scheduler: {e}")
+            self.output_cache.put(key, lines, None, started_at)
+        finally:
+            with self.lock:
+                self.running.discard(key)
+                self.processes.pop(key, None)
+            self.finished.append(key)
+
+    def shutdown(self):
+        """
+        Stops running children and the worker pool without waiting.
+        """
+        self.closed = True
+        with self.lock:
+            processes = list(self.processes.values())
+        for process in processes:
+            stop_process(process)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
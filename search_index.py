@@ -0,0 +1,291 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   search_index.py
+#
+# Copyright 2026 AL Haines
+#
+# A local, incremental inverted index over als.journal and past_results,
+# used by the dashboard's search-as-you-type pane.
+#
+# The index is built once (keyset pages over `id`), pickled into the local
+# cache, and afterwards only rows above each source's id high-water mark are
+# fetched. Queries never touch the database: every keystroke is answered
+# from memory with prefix matching on a sorted term list and a simple
+# tf-idf style ranking, with newer entries winning ties.
+#
+# Rows that are edited or deleted after they were indexed are not picked up
+# by the high-water mark; use `search_index.py rebuild` to start over.
+
+import sys
+import os
+import re
+import math
+import time
+import heapq
+import pickle
+import bisect
+import threading
+import argparse
+from collections import Counter
+
+sys.path.insert(0, '/home/al/system_files/projects')
+sys.path.insert(0, '/home/al/system_files/projects/py')
+
+try:
+    from MySql import MySQL
+    from local_cache import cache_dir
+except ImportError as e:
+    print(f"ERROR: Critical modules not found: {e}", file=sys.stderr)
+    sys.exit(1)
+
+# Source name -> where to find it and which columns to index.
+SOURCES = {
+    'journal': {'database': 'als', 'table': 'journal', 'title': 'title', 'body': ['note']},
+    'past_results': {'database': None, 'table': 'past_results', 'title': 'question', 'body': ['text', 'comment']},
+}
+
+INDEX_FORMAT = 1
+FETCH_PAGE_SIZE = 1000
+TITLE_WEIGHT = 3
+MIN_PREFIX = 2          # shorter query tokens only match whole terms
+SNIPPET_LENGTH = 120
+
+_token_re = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase word tokens.
+    """
+    if not text:
+        return []
+    return _token_re.findall(str(text).lower())
+
+
+def _index_file():
+    return os.path.join(cache_dir('search'), 'index.pickle')
+
+
+class SearchIndex:
+    """
+    In-memory inverted index with incremental refresh and on-disk persistence.
+    Safe to refresh from a worker thread while the UI thread searches.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.docs = []               # docno -> (source, row_id, snippet)
+        self.postings = {}           # term -> {docno: weight}
+        self.terms = []              # sorted list of all terms, for prefix lookup
+        self.high_water = {name: 0 for name in SOURCES}
+
+    # --- persistence ---
+
+    def load(self):
+        """
+        Loads a previously saved index. Returns True on success.
+        """
+        try:
+            with open(_index_file(), 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return False
+        if not isinstance(data, dict) or data.get('format') != INDEX_FORMAT:
+            return False
+        with self._lock:
+            self.docs = data['docs']
+            self.postings = data['postings']
+            self.terms = sorted(self.postings)
+            self.high_water.update(data['high_water'])
+        return True
+
+    def save(self):
+        """
+        Writes the index to the local cache atomically.
+        """
+        path = _index_file()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with self._lock:
+            data = {'format': INDEX_FORMAT, 'docs': self.docs,
+                    'postings': self.postings, 'high_water': dict(self.high_water)}
+            try:
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"WARNING: Could not save search index: {e}", file=sys.stderr)
+
+    # --- building ---
+
+    def _fetch_new_rows(self, name, source):
+        """
+        Yields rows of one source above its high-water mark, a page at a time.
+        """
+        db = MySQL(database=source['database']) if source['database'] else MySQL()
+        columns = ", ".join(f"`{c}`" for c in ['id', source['title']] + source['body'])
+        last_id = self.high_water.get(name, 0)
+        while True:
+            query = (f"SELECT {columns} FROM `{source['table']}` WHERE id > %s "
+                     f"ORDER BY id ASC LIMIT %s")
+            rows = db.get_data(query, (last_id, FETCH_PAGE_SIZE))
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1]['id']
+            if len(rows) < FETCH_PAGE_SIZE:
+                return
+
+    def add_rows(self, name, rows):
+        """
+        Indexes a batch of rows from the named source.
+        """
+        source = SOURCES[name]
+        prepared = []
+        for row in rows:
+            title = str(row.get(source['title']) or '')
+            body = " ".join(str(row.get(col) or '') for col in source['body'])
+            weights = Counter()
+            for token in tokenize(title):
+                weights[token] += TITLE_WEIGHT
+            for token in tokenize(body):
+                weights[token] += 1
+            label = title.strip() or body.strip()
+            snippet = " ".join(label.split())[:SNIPPET_LENGTH]
+            prepared.append((row['id'], snippet, weights))
+
+        with self._lock:
+            new_terms = []
+            for row_id, snippet, weights in prepared:
+                docno = len(self.docs)
+                self.docs.append((name, row_id, snippet))
+                for term, weight in weights.items():
+                    postings = self.postings.get(term)
+                    if postings is None:
+                        postings = self.postings[term] = {}
+                        new_terms.append(term)
+                    postings[docno] = weight
+                if row_id > self.high_water.get(name, 0):
+                    self.high_water[name] = row_id
+            # A handful of new terms (the usual refresh) is cheapest to insert in
+            # place; a bulk load is cheaper to append and re-sort once.
+            if len(new_terms) > 64:
+                self.terms.extend(new_terms)
+                self.terms.sort()
+            else:
+                for term in new_terms:
+                    bisect.insort(self.terms, term)
+
+    def refresh(self):
+        """
+        Pulls rows newer than each source's high-water mark into the index.
+
+        Returns:
+            int: Number of rows added.
+        """
+        added = 0
+        for name, source in SOURCES.items():
+            for rows in self._fetch_new_rows(name, source):
+                self.add_rows(name, rows)
+                added += len(rows)
+        return added
+
+    # --- querying ---
+
+    def _matching_terms(self, token):
+        if len(token) < MIN_PREFIX:
+            return [token] if token in self.postings else []
+        terms = self.terms
+        position = bisect.bisect_left(terms, token)
+        matches = []
+        while position < len(terms) and terms[position].startswith(token):
+            matches.append(terms[position])
+            position += 1
+        return matches
+
+    def search(self, query, limit=50):
+        """
+        Returns the best matching documents for a query, newest first on ties.
+        Every query token must match (as a prefix) somewhere in the document.
+
+        Returns:
+            list[tuple]: (source, row_id, snippet, score) tuples.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            total_docs = len(self.docs) or 1
+            scores = None
+            for token in dict.fromkeys(tokens):
+                token_scores = {}
+                for term in self._matching_terms(token):
+                    postings = self.postings[term]
+                    idf = math.log(1 + total_docs / len(postings))
+                    boost = 1.5 if term == token else 1.0
+                    for docno, weight in postings.items():
+                        if scores is not None and docno not in scores:
+                            continue
+                        value = weight * idf * boost
+                        if value > token_scores.get(docno, 0):
+                            token_scores[docno] = value
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {docno: scores[docno] + value for docno, value in token_scores.items()}
+                if not scores:
+                    return []
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+            return [self.docs[docno] + (score,) for docno, score in best]
+
+    def __len__(self):
+        return len(self.docs)
+
+
+def fetch_entry(source_name, row_id):
+    """
+    Fetches the full row behind a search hit.
+    """
+    source = SOURCES[source_name]
+    db = MySQL(database=source['database']) if source['database'] else MySQL()
+    rows = db.get_data(f"SELECT * FROM `{source['table']}` WHERE id = %s", (row_id,))
+    return rows[0] if rows else None
+
+
+def load_or_build():
+    """
+    Returns a ready index: loaded from the cache and topped up, or built fresh.
+    """
+    index = SearchIndex()
+    index.load()
+    if index.refresh():
+        index.save()
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the local journal/past_results search index.")
+    subparsers = parser.add_subparsers(dest='command', required=True, help="Command to execute")
+    subparsers.add_parser('rebuild', help="Discard the cached index and build it from scratch.")
+    p_query = subparsers.add_parser('query', help="Search the index.")
+    p_query.add_argument('phrase', nargs='+', help="Words or word prefixes to search for.")
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        index = SearchIndex()
+        index.refresh()
+        index.save()
+        print(f"Indexed {len(index)} entries.")
+    elif args.command == 'query':
+        index = load_or_build()
+        started = time.perf_counter()
+        results = index.search(" ".join(args.phrase))
+        elapsed = (time.perf_counter() - started) * 1000
+        for source_name, row_id, snippet, score in results:
+            print(f"{source_name:>12} {row_id:>7}  {snippet}")
+        print(f"{len(results)} result(s) in {elapsed:.1f} ms from {len(index)} entries.")
+
+
+if __name__ == "__main__":
+    main()
+#============= end of code      ================#
@@ -10,40 +10,64 @@
 # console output, removing the 'textwrap' dependency entirely.
 
 import sys
+import os
+import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 # NOTE: import textwrap has been REMOVED.
 
+import startup_profile
+startup_profile.install('showme')
+startup_profile.phase('imports.project')
+import tracing
+tracing.install('showme')
+
 # --- Import Required Libraries ---
 try:
-    from MySql import MySQL
+    from MySql import MySQL, MySQLPool
+    from local_cache import cache_dir, read_json, write_json_atomic
 except ImportError:
     # Rich might not be available for this very first error, so use standard print.
     print("FATAL: Could not import MySql.py. Ensure it is in the Python path.", file=sys.stderr)
     sys.exit(1)
+tracing.instrument(MySQL)
 
+startup_profile.phase('imports.rich')
 try:
     from rich.console import Console
     from rich.panel import Panel
     from rich.table import Table
+    from rich.live import Live
 except ImportError:
     print("FATAL: The 'rich' library is not installed.", file=sys.stderr)
     print("Please run: pip install rich", file=sys.stderr)
     sys.exit(1)
 
+startup_profile.phase('setup')
 # --- Rich Console Initialization ---
 # A single console object to handle all printing.
 console = Console()
 
-# --- Helper Function (The "Nice" Rich Version) ---
-def print_formatted_record(record: dict):
+# --- Search Tuning ---
+SEARCH_LIMIT_PER_TABLE = 50      # Max matches fetched from any one table.
+SEARCH_MAX_PARALLEL = 8          # Max tables queried at the same time.
+TITLE_TABLES_TTL = 3600          # Seconds the cached list of 'title' tables stays valid.
+
+# --- Dump Browser Tuning ---
+DUMP_PAGE_SIZE = 100             # Rows fetched per keyset page by 'dump'.
+PREVIEW_LENGTH = 120             # Characters of 'note' fetched for the one-line preview.
+
+# --- Follow Mode Tuning ---
+FOLLOW_MIN_INTERVAL = 0.5        # Seconds between polls right after new rows arrived.
+FOLLOW_MAX_INTERVAL = 10.0       # Polling backs off (doubling) to at most this when idle.
+FOLLOW_BATCH = 100               # Max rows fetched per poll.
+
+# --- Helper Functions (The "Nice" Rich Version) ---
+def format_record(record: dict):
     """
-    Prints a single database record using rich.Panel and rich.Table
-    for a beautiful, bordered, and consistent display.
+    Builds the rich.Panel used to display a single record, so the same
+    layout can be printed to the console or shown inside the dump browser.
     """
-    if not record:
-        console.print("[bold red]Record not found.[/bold red]")
-        return
-
     # A Rich Table provides clean, aligned key-value layout automatically.
     table = Table.grid(expand=True, padding=(0, 1))
     table.add_column(style="cyan", justify="right", width=15) # Column for keys
@@ -59,8 +83,19 @@ def print_formatted_record(record: dict):
         value_str = str(value).strip() if value is not None else "[italic dim]NULL[/italic dim]"
         table.add_row(f"[bold cyan]{key.upper()}:[/bold cyan]", value_str)
 
-    # Print the table inside a Panel for the bordered effect.
-    console.print(Panel(table, title=panel_title, border_style="blue", expand=True))
+    # Wrap the table inside a Panel for the bordered effect.
+    return Panel(table, title=panel_title, border_style="blue", expand=True)
+
+def print_formatted_record(record: dict):
+    """
+    Prints a single database record using rich.Panel and rich.Table
+    for a beautiful, bordered, and consistent display.
+    """
+    if not record:
+        console.print("[bold red]Record not found.[/bold red]")
+        return
+    console.print(format_record(record))
+    startup_profile.mark('first_output')
 
 # --- Main Application Class ---
 class ShowMeApp:
@@ -77,42 +112,141 @@ class ShowMeApp:
         else:
             console.print(f"[red]No records found in table '{table}'.[/red]")
 
-    def dump_table(self, table):
-        console.print(f"Fetching all records from '[bold]{self.db_name}.{table}[/bold]'...")
-        query = f"SELECT id, title, note FROM `{table}` ORDER BY id DESC"
-        records = self.db.get_data(query)
+    def summary_columns(self, table):
+        """
+        Returns (title_column, preview_column) for a table; either may be None
+        if the table does not have a 'title' or 'note' column.
+        """
+        fields = self.db.get_field_names(table)
+        if not fields:
+            return 'title', 'note'
+        return ('title' if 'title' in fields else None), ('note' if 'note' in fields else None)
 
-        if not records:
-            console.print(f"[red]No records found in table '{table}'.[/red]")
-            return
-
-        summary_table = Table(title="Select a Record", border_style="green", show_lines=True)
-        summary_table.add_column("ID", style="magenta", justify="right")
-        summary_table.add_column("Title / Note Preview", overflow="fold") # Let Rich handle wrapping
+    def fetch_summary_page(self, table, columns, before_id=None, limit=DUMP_PAGE_SIZE):
+        """
+        Fetches one keyset page of (id, title, preview) rows, newest first.
+        Only the first PREVIEW_LENGTH characters of the note are transferred.
+        """
+        title_column, preview_column = columns
+        select = ["id"]
+        select.append(f"`{title_column}` AS title" if title_column else "NULL AS title")
+        select.append(f"LEFT(`{preview_column}`, {PREVIEW_LENGTH}) AS preview" if preview_column else "NULL AS preview")
+        query = f"SELECT {', '.join(select)} FROM `{table}`"
+        params = []
+        if before_id is not None:
+            query += " WHERE id < %s"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT %s"
+        params.append(limit)
+        return self.db.get_data(query, tuple(params))
 
-        for record in records:
-            preview_text = record.get('title') or record.get('note', '')
-            summary_table.add_row(str(record.get('id')), preview_text.replace('\n', ' '))
+    def fetch_record(self, table, record_id):
+        """
+        Fetches one full record by id, or None.
+        """
+        results = self.db.get_data(f"SELECT * FROM `{table}` WHERE id = %s", (record_id,))
+        return results[0] if results else None
 
-        console.print(summary_table)
+    def dump_table(self, table):
+        """
+        Browses a table page by page. On a terminal with Textual available this
+        opens a scrolling record browser; otherwise it falls back to a paged
+        rich table with an ID prompt.
+        """
+        if sys.stdin.isatty() and sys.stdout.isatty():
+            try:
+                from record_browser import RecordBrowserApp
+            except ImportError:
+                RecordBrowserApp = None
+            if RecordBrowserApp is not None:
+                RecordBrowserApp(self, table, DUMP_PAGE_SIZE, format_record).run()
+                return
+        self.dump_table_paged(table)
 
+    def dump_table_paged(self, table):
+        console.print(f"Fetching records from '[bold]{self.db_name}.{table}[/bold]'...")
+        columns = self.summary_columns(table)
+        before_id = None
         while True:
-            try:
-                choice = console.input("\nEnter ID to display (or '[bold]q[/bold]' to quit): ")
-                if choice.lower() == 'q':
-                    break
-                record_id = int(choice)
-                query = f"SELECT * FROM `{table}` WHERE id = %s"
-                results = self.db.get_data(query, (record_id,))
-                if results:
-                    print_formatted_record(results[0])
+            records = self.fetch_summary_page(table, columns, before_id)
+            if not records:
+                if before_id is None:
+                    console.print(f"[red]No records found in table '{table}'.[/red]")
+                    return
+                console.print("[yellow]No more records.[/yellow]")
+            else:
+                summary_table = Table(title="Select a Record", border_style="green", show_lines=True)
+                summary_table.add_column("ID", style="magenta", justify="right")
+                summary_table.add_column("Title / Note Preview", overflow="fold") # Let Rich handle wrapping
+                for record in records:
+                    preview_text = record.get('title') or record.get('preview') or ''
+                    summary_table.add_row(str(record.get('id')), str(preview_text).replace('\n', ' '))
+                console.print(summary_table)
+                startup_profile.mark('first_output')
+                before_id = records[-1]['id']
+            has_more = len(records) == DUMP_PAGE_SIZE
+
+            while True:
+                try:
+                    prompt = "\nEnter ID to display"
+                    if has_more:
+                        prompt += ", '[bold]n[/bold]' for the next page"
+                    choice = console.input(prompt + " (or '[bold]q[/bold]' to quit): ").strip().lower()
+                    if choice == 'q':
+                        return
+                    if choice == 'n':
+                        if has_more:
+                            break
+                        console.print("[yellow]No more records.[/yellow]")
+                        continue
+                    print_formatted_record(self.fetch_record(table, int(choice)))
+                except (ValueError, TypeError):
+                    console.print("[red]Invalid input. Please enter a number, 'n' or 'q'.[/red]")
+                except (KeyboardInterrupt, EOFError):
+                    console.print("\n[bold]Exiting.[/bold]")
+                    return
+
+    def follow(self, table, show_last=1):
+        """
+        Tails a table like 'tail -f': prints the last `show_last` records, then
+        polls on one persistent connection for rows with an id above the
+        high-water mark. The poll interval starts at FOLLOW_MIN_INTERVAL and
+        doubles up to FOLLOW_MAX_INTERVAL while nothing new arrives.
+        """
+        # A server restart must not end the follower: a lost connection is retried below.
+        db = MySQL(database=self.db_name, persistent=True, exit_on_connect_error=False)
+        console.print(f"Following '[bold]{self.db_name}.{table}[/bold]' (Ctrl+C to stop)...")
+        try:
+            recent = db.get_data(f"SELECT * FROM `{table}` ORDER BY id DESC LIMIT %s", (max(show_last, 1),))
+            if db.last_error is not None:
+                console.print(f"[red]Could not read table '{table}'.[/red]")
+                return
+            last_seen = recent[0]['id'] if recent else 0
+            for record in reversed(recent[:show_last]):
+                print_formatted_record(record)
+            console.file.flush()
+
+            interval = FOLLOW_MIN_INTERVAL
+            while True:
+                rows = db.get_data(f"SELECT * FROM `{table}` WHERE id > %s ORDER BY id ASC LIMIT %s",
+                                   (last_seen, FOLLOW_BATCH))
+                if rows:
+                    for record in rows:
+                        print_formatted_record(record)
+                    console.file.flush()
+                    last_seen = rows[-1]['id']
+                    interval = FOLLOW_MIN_INTERVAL
+                    if len(rows) == FOLLOW_BATCH:
+                        continue  # More are waiting; fetch them straight away.
+                elif db.last_error is not None:
+                    interval = FOLLOW_MAX_INTERVAL
                 else:
-                    console.print(f"[yellow]No record found with ID: {record_id}[/yellow]")
-            except (ValueError, TypeError):
-                console.print("[red]Invalid input. Please enter a number or 'q'.[/red]")
-            except (KeyboardInterrupt, EOFError):
-                console.print("\n[bold]Exiting.[/bold]")
-                break
+                    interval = min(interval * 2, FOLLOW_MAX_INTERVAL)
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            console.print("\n[bold]Stopped following.[/bold]")
+        finally:
+            db.close()
 
     def list_tables(self):
         console.print(f"Fetching all tables from database '[bold]{self.db_name}[/bold]'...")
@@ -121,39 +255,99 @@ class ShowMeApp:
             table_list = [list(t.values())[0] for t in tables]
             console.print(Panel("    " + "\n    ".join(f"- {name}" for name in table_list),
                                 title="[bold yellow]Tables Found[/bold yellow]", border_style="blue"))
+            startup_profile.mark('first_output')
         else:
             console.print("[red]No tables found in this database.[/red]")
 
-    def search_all_titles(self, phrase):
-        console.print(f"Searching for '[bold]{phrase}[/bold]' in all 'title' columns...")
+    def _title_tables_cache_file(self):
+        safe_name = f"{self.db.host}-{self.db_name}".replace(os.sep, '_')
+        return os.path.join(cache_dir('showme'), f"{safe_name}-title-tables.json")
+
+    def invalidate_title_tables(self):
+        try:
+            os.unlink(self._title_tables_cache_file())
+        except OSError:
+            pass
+
+    def get_title_tables(self, refresh=False):
+        """
+        Returns the tables that have a 'title' column. The INFORMATION_SCHEMA
+        lookup is cached locally for TITLE_TABLES_TTL seconds; pass refresh=True
+        (or 'search --refresh') after adding or dropping tables.
+        """
+        cache_file = self._title_tables_cache_file()
+        if not refresh:
+            cached = read_json(cache_file, default={})
+            if isinstance(cached, dict) and time.time() - cached.get('saved_at', 0) < TITLE_TABLES_TTL:
+                return cached.get('tables', [])
         info_schema_query = "SELECT TABLE_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = %s AND COLUMN_NAME = 'title'"
-        tables_with_title = self.db.get_data(info_schema_query, (self.db_name,))
+        tables = sorted(row['TABLE_NAME'] for row in self.db.get_data(info_schema_query, (self.db_name,)))
+        if self.db.last_error is None:
+            write_json_atomic(cache_file, {'saved_at': time.time(), 'tables': tables})
+        return tables
+
+    def search_all_titles(self, phrase, refresh=False, limit=SEARCH_LIMIT_PER_TABLE):
+        """
+        Searches every table with a 'title' column. Each table is queried on its
+        own pooled connection, in parallel and with a per-table LIMIT, and rows
+        are added to the on-screen table as soon as that table answers, so the
+        wait is bounded by the slowest table rather than the sum of all of them.
+        """
+        console.print(f"Searching for '[bold]{phrase}[/bold]' in all 'title' columns...")
+        tables_with_title = self.get_title_tables(refresh=refresh)
         if not tables_with_title:
             console.print("[red]No tables with a 'title' column found.[/red]")
             return
 
-        union_parts, search_params, search_pattern = [], [], f"%{phrase}%"
-        for table_dict in tables_with_title:
-            table_name = table_dict['TABLE_NAME']
-            union_parts.append(f"(SELECT id, title, '{table_name}' as source_table FROM `{table_name}` WHERE title LIKE %s)")
-            search_params.append(search_pattern)
+        search_pattern = f"%{phrase}%"
+        pool = MySQLPool(size=min(SEARCH_MAX_PARALLEL, len(tables_with_title)), database=self.db_name)
 
-        full_query = " UNION ALL ".join(union_parts) + " ORDER BY source_table, id"
-        results = self.db.get_data(full_query, tuple(search_params))
-        if not results:
-            console.print(f"[yellow]No results found for '{phrase}'.[/yellow]")
-            return
+        def search_table(table_name):
+            query = f"SELECT id, title FROM `{table_name}` WHERE title LIKE %s ORDER BY id DESC LIMIT %s"
+            with pool.connection() as db:
+                rows = db.get_data(query, (search_pattern, limit))
+                return table_name, rows, db.last_error
 
-        search_results_table = Table(title=f"Found {len(results)} match(es) for '[bold]{phrase}[/bold]'", border_style="green")
+        search_results_table = Table(title=f"Searching {len(tables_with_title)} table(s) for '[bold]{phrase}[/bold]'...", border_style="green")
         search_results_table.add_column("ID", style="magenta", justify="right")
         search_results_table.add_column("Source Table", style="yellow")
         search_results_table.add_column("Matching Title", overflow="fold")
-        for record in results:
-            search_results_table.add_row(str(record.get('id')), record.get('source_table'), record.get('title', ''))
-        console.print(search_results_table)
+
+        total, truncated, failed = 0, [], []
+        try:
+            with Live(search_results_table, console=console, refresh_per_second=10):
+                with ThreadPoolExecutor(max_workers=pool.size) as executor:
+                    futures = [executor.submit(search_table, name) for name in tables_with_title]
+                    for future in as_completed(futures):
+                        table_name, rows, error = future.result()
+                        if error is not None:
+                            failed.append(table_name)
+                            continue
+                        for record in rows:
+                            search_results_table.add_row(str(record.get('id')), table_name, record.get('title') or '')
+                        total += len(rows)
+                        startup_profile.mark('first_output')
+                        if len(rows) >= limit:
+                            truncated.append(table_name)
+                        search_results_table.title = f"Found {total} match(es) for '[bold]{phrase}[/bold]'"
+        finally:
+            pool.close()
+        if not console.is_terminal:
+            console.line()
+
+        if failed:
+            # A table in the cached list could not be queried (dropped or altered).
+            self.invalidate_title_tables()
+            console.print(f"[yellow]Could not search: {', '.join(failed)}. The table list will be refreshed next time.[/yellow]")
+        if not total:
+            console.print(f"[yellow]No results found for '{phrase}'.[/yellow]")
+            return
+        if truncated:
+            console.print(f"[dim]Showing the newest {limit} matches from: {', '.join(truncated)} (use --limit to see more).[/dim]")
         console.print(f"\nUse '[bold]showme {self.db_name} dump <Source Table>[/bold]' and enter an ID to see the full record.")
 
 def main():
+    startup_profile.phase('args')
     parser = argparse.ArgumentParser(description="A CLI for viewing MySQL databases, with rich formatting.")
     parser.add_argument("database", help="The name of the database to connect to (e.g., 'als', 'media').")
     subparsers = parser.add_subparsers(dest='action', required=True, help="The action to perform.")
@@ -161,19 +355,28 @@ def main():
     parser_last.add_argument("table", help="The name of the table.")
     parser_dump = subparsers.add_parser('dump', help="List records in a table and view one by ID.")
     parser_dump.add_argument("table", help="The name of the table.")
+    parser_follow = subparsers.add_parser('follow', help="Show new records in a table as they are added.")
+    parser_follow.add_argument("table", help="The name of the table.")
+    parser_follow.add_argument("--last", type=int, default=1, help="Records to show before following (default: %(default)s).")
     parser_list = subparsers.add_parser('list', help="List all tables in the database.")
     parser_search = subparsers.add_parser('search', help="Search for a phrase in 'title' columns of all tables.")
     parser_search.add_argument("phrase", help="The text to search for.")
+    parser_search.add_argument("--limit", type=int, default=SEARCH_LIMIT_PER_TABLE, help="Max matches per table (default: %(default)s).")
+    parser_search.add_argument("--refresh", action="store_true", help="Re-read the list of tables instead of using the cache.")
     args = parser.parse_args()
+    startup_profile.phase('connect')
     app = ShowMeApp(args.database)
+    startup_profile.phase('command')
     if args.action == 'last':
         app.get_last_record(args.table)
     elif args.action == 'dump':
         app.dump_table(args.table)
+    elif args.action == 'follow':
+        app.follow(args.table, show_last=args.last)
     elif args.action == 'list':
         app.list_tables()
     elif args.action == 'search':
-        app.search_all_titles(args.phrase)
+        app.search_all_titles(args.phrase, refresh=args.refresh, limit=args.limit)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,295 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   startup_profile.py
+#
+# Copyright 2026 AL Haines
+#
+# Built-in startup profiler for dashboard.py, ai.py and showme.py.
+#
+# Run any of them with --profile-startup (or --profile-startup=FILE) and a
+# JSON timeline is written when the tool reaches its first frame / exits:
+#
+#   - phases:  consecutive named phases (imports, dependency checks, schema,
+#              catalog query, compose, ...) with start and duration in ms,
+#   - marks:   points in time such as 'first_frame' or 'first_output',
+#   - imports: every module imported while profiling, with inclusive and
+#              self time, slowest first.
+#
+# Times are measured from process start (read from /proc on Linux), so the
+# interpreter's own startup shows up as the 'interpreter' phase.
+#
+# When the flag is absent every function here returns immediately, so the
+# calls can stay in the tools permanently.
+#
+# Checking a profile against the budget file (exit status 1 on regression):
+#
+#   startup_profile.py check PROFILE.json [--budget startup_budget.json]
+#   startup_profile.py report PROFILE.json
+
+import sys
+import os
+import json
+import time
+import atexit
+import argparse
+import importlib.abc
+
+FLAG = '--profile-startup'
+DEFAULT_BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budget.json')
+
+_profiler = None
+
+
+def _process_age_seconds():
+    """
+    Returns how long ago this process was started, or 0.0 if unknown.
+    """
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        start_ticks = int(fields[19])   # field 22 (starttime), counted after the comm field
+        with open('/proc/uptime', 'r') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Meta path hook that times each module's execution. It asks the real
+    finders for the spec and wraps the loader instance's exec_module, so
+    nested imports are attributed correctly (self vs inclusive time).
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.stack = []
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # Built-in and frozen importers are classes shared by many modules; leave them alone.
+        if loader is None or isinstance(loader, type) or not hasattr(loader, 'exec_module'):
+            return spec
+        original = loader.exec_module
+
+        def timed_exec_module(module, _original=original, _name=fullname):
+            frame = [0.0]
+            self.stack.append(frame)
+            started = time.perf_counter()
+            try:
+                _original(module)
+            finally:
+                inclusive = time.perf_counter() - started
+                self.stack.pop()
+                if self.stack:
+                    self.stack[-1][0] += inclusive
+                self.profiler.imports.append({
+                    'module': _name,
+                    'inclusive_ms': round(inclusive * 1000, 3),
+                    'self_ms': round((inclusive - frame[0]) * 1000, 3),
+                })
+        try:
+            loader.exec_module = timed_exec_module
+        except (AttributeError, TypeError):
+            pass
+        return spec
+
+
+class StartupProfiler:
+    """
+    Records a phase timeline, marks and import times for one process.
+    """
+
+    def __init__(self, tool, output_path=None):
+        self.tool = tool
+        self.output_path = output_path
+        self.origin = time.perf_counter() - _process_age_seconds()
+        self.phases = []
+        self.marks = {}
+        self.imports = []
+        self.written = False
+        self.import_timer = _ImportTimer(self)
+        self.phase('interpreter', at=0.0)
+
+    def now_ms(self):
+        return (time.perf_counter() - self.origin) * 1000
+
+    def phase(self, name, at=None):
+        now = self.now_ms() if at is None else at
+        if self.phases:
+            self.phases[-1]['duration_ms'] = round(now - self.phases[-1]['start_ms'], 3)
+        self.phases.append({'name': name, 'start_ms': round(now, 3), 'duration_ms': None})
+
+    def mark(self, name):
+        self.marks.setdefault(name, round(self.now_ms(), 3))
+
+    def to_dict(self):
+        now = self.now_ms()
+        phases = [dict(p) for p in self.phases]
+        if phases and phases[-1]['duration_ms'] is None:
+            phases[-1]['duration_ms'] = round(now - phases[-1]['start_ms'], 3)
+        return {
+            'tool': self.tool,
+            'argv': sys.argv,
+            'python': sys.version.split()[0],
+            'recorded_at': time.time(),
+            'total_ms': round(now, 3),
+            'phases': phases,
+            'marks': self.marks,
+            'imports': sorted(self.imports, key=lambda i: i['inclusive_ms'], reverse=True),
+        }
+
+    def write(self):
+        self.written = True
+        if sys.meta_path and self.import_timer in sys.meta_path:
+            sys.meta_path.remove(self.import_timer)
+        path = self.output_path
+        if not path:
+            from local_cache import cache_dir
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            path = os.path.join(cache_dir('profiles'), f"startup-{self.tool}-{stamp}-{os.getpid()}.json")
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, indent=2)
+            print(f"Startup profile written to {path}", file=sys.stderr)
+        except OSError as e:
+            print(f"WARNING: Could not write startup profile: {e}", file=sys.stderr)
+        return path
+
+
+def install(tool, argv=None):
+    """
+    Enables profiling if --profile-startup[=FILE] is in argv (sys.argv by
+    default). The flag is removed so argparse never sees it. Call this
+    before any heavy imports.
+
+    Returns:
+        StartupProfiler or None.
+    """
+    global _profiler
+    argv = sys.argv if argv is None else argv
+    output_path = None
+    for i, arg in enumerate(argv):
+        if arg == FLAG or arg.startswith(FLAG + '='):
+            output_path = arg.partition('=')[2] or None
+            del argv[i]
+            break
+    else:
+        return None
+    _profiler = StartupProfiler(tool, output_path)
+    sys.meta_path.insert(0, _profiler.import_timer)
+    atexit.register(finish)
+    return _profiler
+
+
+def phase(name):
+    """
+    Ends the current phase and starts a new one. No-op unless profiling.
+    """
+    if _profiler is not None:
+        _profiler.phase(name)
+
+
+def mark(name):
+    """
+    Records the first time `name` happens (e.g. 'first_output'). No-op unless profiling.
+    """
+    if _profiler is not None:
+        _profiler.mark(name)
+
+
+def finish():
+    """
+    Ends the timeline and writes the profile (once). No-op unless profiling.
+
+    Returns:
+        str or None: The profile path the first time it is written.
+    """
+    if _profiler is None or _profiler.written:
+        return None
+    _profiler.phase('done')
+    _profiler.phases.pop()
+    return _profiler.write()
+
+
+def load_budget(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check_profile(profile, budget):
+    """
+    Compares a profile with the budget for its tool. Budget entries name a
+    phase (limit on its duration) or a mark (limit on when it happened), or
+    'total'; values are milliseconds.
+
+    Returns:
+        list[tuple]: (name, measured_ms, limit_ms, ok) rows.
+    """
+    limits = budget.get(profile.get('tool'), {})
+    phases = {}
+    for p in profile.get('phases', []):
+        phases[p['name']] = phases.get(p['name'], 0) + (p.get('duration_ms') or 0)
+    rows = []
+    for name, limit in limits.items():
+        if name == 'total':
+            measured = profile.get('total_ms')
+        elif name in profile.get('marks', {}):
+            measured = profile['marks'][name]
+        else:
+            measured = phases.get(name)
+        if measured is None:
+            continue
+        rows.append((name, measured, limit, measured <= limit))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect startup profiles and check them against a budget.")
+    subparsers = parser.add_subparsers(dest='command', required=True, help="Command to execute")
+    p_check = subparsers.add_parser('check', help="Fail if any phase exceeds its budget.")
+    p_check.add_argument('profile', help="Profile JSON written by --profile-startup.")
+    p_check.add_argument('--budget', default=DEFAULT_BUDGET, help="Budget JSON (default: %(default)s).")
+    p_report = subparsers.add_parser('report', help="Print the phase timeline and slowest imports.")
+    p_report.add_argument('profile', help="Profile JSON written by --profile-startup.")
+    p_report.add_argument('--top', type=int, default=15, help="Number of imports to show.")
+    args = parser.parse_args()
+
+    with open(args.profile, 'r', encoding='utf-8') as f:
+        profile = json.load(f)
+
+    if args.command == 'report':
+        print(f"{profile['tool']}: {profile['total_ms']:.1f} ms total")
+        for p in profile['phases']:
+            print(f"  {p['name']:<24} {p['start_ms']:>9.1f} +{p['duration_ms']:>9.1f} ms")
+        for name, at in profile.get('marks', {}).items():
+            print(f"  mark {name:<19} {at:>9.1f} ms")
+        print("Slowest imports (inclusive / self ms):")
+        for item in profile.get('imports', [])[:args.top]:
+            print(f"  {item['module']:<40} {item['inclusive_ms']:>9.1f} {item['self_ms']:>9.1f}")
+    elif args.command == 'check':
+        rows = check_profile(profile, load_budget(args.budget))
+        if not rows:
+            print(f"No budget entries apply to tool '{profile.get('tool')}'.")
+            return
+        failed = False
+        for name, measured, limit, ok in rows:
+            failed = failed or not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {name:<24} {measured:>9.1f} ms (budget {limit} ms)")
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
+#============= end of code      ================#
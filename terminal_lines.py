@@ -0,0 +1,297 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   terminal_lines.py
+#
+# Copyright 2026 AL Haines
+#
+# Turns a child's raw output into lines the way a terminal would show them.
+#
+# Progress bars (pip, rsync --info=progress2, wget, apt, ...) redraw one
+# line over and over with \r, backspaces or cursor movement and erase
+# sequences. Read line by line, every redraw became a log line of its own.
+# LineEditor keeps the line under the cursor (and, in live mode, the last
+# LIVE_LINES lines, for tools that move the cursor up to redraw several)
+# and applies those edits, so only the state a terminal would end up
+# showing is yielded:
+#
+#   - plain mode: each line once, when it ends with a newline;
+#   - live mode: additionally a line being redrawn is yielded once it has
+#     been pending for PROGRESS_INTERVAL, and its later states as
+#     LineUpdate objects that replace it, at most every PROGRESS_INTERVAL.
+#
+# Colours and other escape sequences stay in the text and take no column.
+# Output without any of these controls takes a fast path that splits whole
+# chunks on newlines, as readline would.
+
+import os
+import re
+import time
+import codecs
+import select
+from collections import deque
+
+PROGRESS_INTERVAL = 0.1      # Seconds between in-place updates of a line being redrawn.
+LIVE_LINES = 64              # Lines above the last one that may still be redrawn in live mode.
+READ_SIZE = 65536
+
+# Newline, carriage return, backspace and the CSI cursor movement and
+# erase-in-line sequences applied here; any other escape stays in the text.
+CONTROL = re.compile(r'[\n\r\x08]|\x1b\[([0-9;]*)([A-GK])')
+CURSOR = re.compile(r'[\r\x08]|\x1b\[[0-9;]*[A-GK]')
+ESCAPE = re.compile(r'\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])')
+INCOMPLETE = re.compile(r'\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*)?$')
+
+
+class LineUpdate(str):
+    """
+    A line that replaces one already yielded: the one `back` lines before
+    the latest (0 replaces the latest line itself).
+    """
+
+    def __new__(cls, text, back=0):
+        line = super().__new__(cls, text)
+        line.back = back
+        return line
+
+
+def dump_line(line):
+    """
+    Serialises a line or LineUpdate as one line of text (for run spools and
+    live output streams): updates become '\\r<back>\\t<text>', which no
+    line from LineEditor can start with.
+    """
+    text = line.replace('\n', ' ').replace('\r', '')
+    if type(line) is LineUpdate:
+        return f"\r{line.back}\t{text}"
+    return text
+
+
+def load_line(text):
+    """Reverses dump_line()."""
+    if text[:1] == '\r':
+        back, _, text = text[1:].partition('\t')
+        return LineUpdate(text, int(back or 0))
+    return text
+
+
+def _cells(text):
+    """Splits `text` into one string per column; escape sequences stick to the next character."""
+    if '\x1b' not in text:
+        return list(text)
+    cells, pending, pos = [], '', 0
+    for found in ESCAPE.finditer(text):
+        if found.start() > pos:
+            cells.append(pending + text[pos])
+            cells.extend(text[pos + 1:found.start()])
+            pending = ''
+        pending += found.group()
+        pos = found.end()
+    if pos < len(text):
+        cells.append(pending + text[pos])
+        cells.extend(text[pos + 1:])
+        pending = ''
+    if pending:
+        if cells:
+            cells[-1] += pending
+        else:
+            cells.append(pending)
+    return cells
+
+
+class LineEditor:
+    """
+    Applies \r, backspaces and cursor movement to decoded output. feed()
+    and flush() return what to yield: plain str lines, and in live mode
+    LineUpdate objects for lines already yielded.
+    """
+
+    def __init__(self, live=False, interval=PROGRESS_INTERVAL):
+        self.live = live
+        self.interval = interval
+        self.cells = []             # The bottom line, one string per column.
+        self.col = 0
+        self.up = 0                 # Lines the cursor is above the bottom line.
+        self.carry = ''             # Escape sequence cut off at the end of the last chunk.
+        # Lines already yielded, latest last, as [text or cells, text last yielded].
+        self.history = deque(maxlen=LIVE_LINES if live else 0)
+        self.shown = None           # Text of the bottom line if it was yielded before it ended.
+        self.dirty = set()          # Rows changed since last yielded: 0 is the bottom line, n is history[-n].
+        self.dirty_since = None
+
+    def _row(self, row):
+        if not row:
+            return self.cells
+        entry = self.history[-row]
+        if isinstance(entry[0], str):
+            entry[0] = _cells(entry[0])
+        return entry[0]
+
+    def _touch(self, row):
+        self.dirty.add(row)
+        if self.dirty_since is None and self.live:
+            self.dirty_since = time.monotonic()
+
+    def _write(self, text):
+        cells = self._row(self.up)
+        units = _cells(text)
+        col = self.col
+        if col > len(cells):
+            cells.extend(' ' * (col - len(cells)))
+        cells[col:col + len(units)] = units
+        self.col = col + len(units)
+        self._touch(self.up)
+
+    def _csi(self, params, final):
+        count = int(params.split(';')[0] or 0) if params[:1].isdigit() else 0
+        if final == 'K':
+            cells = self._row(self.up)
+            if count == 0:
+                del cells[self.col:]
+            elif count == 1:
+                cells[:self.col] = ' ' * min(self.col, len(cells))
+            else:
+                cells.clear()
+            self._touch(self.up)
+            return
+        count = max(count, 1)
+        if final in 'AF':
+            self.up = min(self.up + count, len(self.history))
+        elif final in 'BE':
+            self.up = max(self.up - count, 0)
+        elif final == 'C':
+            self.col += count
+        elif final == 'D':
+            self.col = max(self.col - count, 0)
+        if final in 'EFG':
+            self.col = count - 1 if final == 'G' else 0
+
+    def _history_updates(self):
+        """LineUpdates for the changed lines above the bottom one."""
+        out = []
+        for row in sorted(self.dirty, reverse=True):
+            if row and row <= len(self.history):
+                entry = self.history[-row]
+                text = ''.join(self._row(row)).rstrip()
+                if text != entry[1]:
+                    entry[1] = text
+                    out.append(LineUpdate(text, row - 1 + (self.shown is not None)))
+        self.dirty.intersection_update((0,))
+        return out
+
+    def _end_line(self):
+        out = self._history_updates()
+        text = ''.join(self.cells).rstrip()
+        if self.shown is None:
+            out.append(text)
+        elif text != self.shown:
+            out.append(LineUpdate(text, 0))
+        if self.live:
+            self.history.append([text, text])
+        self.cells = []
+        self.col = 0
+        self.shown = None
+        self.dirty.discard(0)
+        if not self.dirty:
+            self.dirty_since = None
+        return out
+
+    def feed(self, text):
+        """Processes a chunk of decoded output and returns the lines and updates it completes."""
+        text = self.carry + text
+        self.carry = ''
+        escape = text.rfind('\x1b', max(0, len(text) - 256))
+        if escape != -1 and INCOMPLETE.match(text, escape):
+            text, self.carry = text[:escape], text[escape:]
+        out = []
+        if not self.up and CURSOR.search(text) is None:
+            # Plain output: finish the pending line, then whole lines as readline would give them.
+            first = text.find('\n')
+            if first != -1 and (self.cells or self.col or self.dirty):
+                if first:
+                    self._write(text[:first])
+                out.extend(self._end_line())
+                text = text[first + 1:]
+            pieces = text.split('\n')
+            tail = pieces.pop()
+            lines = [line.rstrip() for line in pieces]
+            out.extend(lines)
+            if self.live:
+                self.history.extend([line, line] for line in lines[-LIVE_LINES:])
+            if tail:
+                self._write(tail)
+        else:
+            pos = 0
+            for found in CONTROL.finditer(text):
+                if found.start() > pos:
+                    self._write(text[pos:found.start()])
+                pos = found.end()
+                char = found.group()
+                if char == '\n':
+                    if self.up:
+                        self.up -= 1
+                        self.col = 0
+                    else:
+                        out.extend(self._end_line())
+                elif char == '\r':
+                    self.col = 0
+                elif char == '\x08':
+                    self.col = max(self.col - 1, 0)
+                else:
+                    self._csi(found.group(1), found.group(2))
+            if pos < len(text):
+                self._write(text[pos:])
+        if self.due() == 0:
+            out.extend(self.flush())
+        return out
+
+    def due(self):
+        """Seconds until flush() has something to yield in live mode, or None."""
+        if self.dirty_since is None:
+            return None
+        return max(0.0, self.dirty_since + self.interval - time.monotonic())
+
+    def flush(self):
+        """Yields the current state of the lines being redrawn (live mode)."""
+        out = []
+        if 0 in self.dirty:
+            text = ''.join(self.cells).rstrip()
+            if self.shown is None:
+                if text:
+                    out.append(text)
+                    self.shown = text
+            elif text != self.shown:
+                out.append(LineUpdate(text, 0))
+                self.shown = text
+            self.dirty.discard(0)
+        out.extend(self._history_updates())
+        self.dirty_since = None
+        return out
+
+    def close(self):
+        """Returns what is left once the output has ended."""
+        out = self._history_updates()
+        if self.cells or self.shown is not None:
+            out.extend(self._end_line())
+        return out
+
+
+def read_lines(stream, live=False):
+    """
+    Reads a binary pipe to the end, yielding its output as a terminal
+    would show it (see LineEditor). UTF-8 errors are replaced.
+    """
+    editor = LineEditor(live=live)
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    fd = stream.fileno()
+    while True:
+        due = editor.due()
+        if due is not None and not select.select([fd], [], [], due)[0]:
+            yield from editor.flush()
+            continue
+        chunk = os.read(fd, READ_SIZE)
+        if not chunk:
+            break
+        yield from editor.feed(decoder.decode(chunk))
+    yield from editor.feed(decoder.decode(b'', final=True))
+    yield from editor.close()
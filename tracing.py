@@ -0,0 +1,400 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   tracing.py
+#
+# Copyright 2026 AL Haines
+#
+# Lightweight end-to-end tracing for the dashboard and the tools it runs.
+#
+# Run dashboard.py with --trace (or --trace=DIR) and every key press is
+# followed through DashboardApp.on_key, dispatch_command, the command worker,
+# runner.stream_command, the child process' lifetime, MySQL queries and log
+# writes. Spans are written as Chrome trace-event JSON (open them in
+# chrome://tracing or https://ui.perfetto.dev) to ~/.cache/dashboard_tui/traces/
+# when the process exits.
+#
+# Children inherit the trace through their environment:
+#
+#   DASHBOARD_TRACE_ID      trace id shared by every process of the trace
+#   DASHBOARD_TRACE_PARENT  span id of the parent's 'child' span
+#   DASHBOARD_TRACE_DIR     where the parent writes its trace file
+#   TRACEPARENT             the same ids in W3C Trace Context format
+#
+# so ai.py, showme.py (or anything else that calls install()) add their own
+# file to the same trace. 'tracing.py merge TRACE_ID' combines all files of
+# one trace into a single timeline.
+#
+# When tracing is off, traced() returns the function unchanged, span()
+# returns a shared do-nothing context manager and begin()/end() return at
+# once, so the calls stay in the code permanently.
+#
+#   tracing.py list
+#   tracing.py merge TRACE_ID [-o FILE]
+
+import sys
+import os
+import json
+import time
+import atexit
+import argparse
+import functools
+import threading
+
+FLAG = '--trace'
+MAX_EVENTS = 500000         # Later events are counted but dropped.
+QUERY_PREVIEW = 200         # Characters of SQL kept per query span.
+
+_tracer = None
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _new_id(nbytes=8):
+    return os.urandom(nbytes).hex()
+
+
+class Tracer:
+    """
+    Collects trace events for one process and writes them as Chrome trace JSON.
+    """
+
+    def __init__(self, tool, trace_dir=None, trace_id=None, parent_span=None):
+        self.tool = tool
+        self.trace_dir = trace_dir
+        self.trace_id = trace_id or _new_id(16)
+        self.parent_span = parent_span
+        self.pid = os.getpid()
+        # Wall-clock anchored timestamps, so files from several processes line up.
+        self.wall_origin = time.time()
+        self.perf_origin = time.perf_counter()
+        self.events = []
+        self.dropped = 0
+        self.threads = set()
+        self.local = threading.local()
+        self.written = False
+        self.events.append({'name': 'process_name', 'ph': 'M', 'pid': self.pid,
+                            'args': {'name': f"{tool} ({self.pid})"}})
+
+    def now_us(self):
+        return (self.wall_origin + time.perf_counter() - self.perf_origin) * 1e6
+
+    def _stack(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def current_span(self):
+        stack = self._stack()
+        return stack[-1]['span_id'] if stack else self.parent_span
+
+    def _record(self, event):
+        if len(self.events) >= MAX_EVENTS:
+            self.dropped += 1
+            return
+        tid = threading.get_native_id()
+        if tid not in self.threads:
+            self.threads.add(tid)
+            self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                                'args': {'name': threading.current_thread().name}})
+        event['pid'] = self.pid
+        event['tid'] = tid
+        self.events.append(event)
+
+    def begin(self, name, cat, args):
+        token = {'name': name, 'cat': cat, 'start': self.now_us(), 'span_id': _new_id(),
+                 'parent': self.current_span(), 'args': args, 'stack': self._stack()}
+        token['stack'].append(token)
+        return token
+
+    def end(self, token, args):
+        stack = token['stack']
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i] is token:
+                del stack[i]
+                break
+        token['args'].update(args)
+        token['args']['span_id'] = token['span_id']
+        if token['parent']:
+            token['args']['parent'] = token['parent']
+        start = token['start']
+        self._record({'name': token['name'], 'cat': token['cat'], 'ph': 'X', 'ts': round(start, 1),
+                      'dur': round(self.now_us() - start, 1), 'args': token['args']})
+
+    def instant(self, name, cat, args):
+        self._record({'name': name, 'cat': cat, 'ph': 'i', 's': 't', 'ts': round(self.now_us(), 1), 'args': args})
+
+    def flow(self, name, flow_id, phase):
+        # Arrow between spans on different threads: 's' where it starts, 'f' where it lands.
+        event = {'name': name, 'cat': 'flow', 'ph': phase, 'id': flow_id, 'ts': round(self.now_us(), 1)}
+        if phase == 'f':
+            event['bp'] = 'e'
+        self._record(event)
+
+    def child_env(self):
+        span_id = self.current_span() or _new_id()
+        return {
+            'DASHBOARD_TRACE_ID': self.trace_id,
+            'DASHBOARD_TRACE_PARENT': span_id,
+            'DASHBOARD_TRACE_DIR': self.output_dir(),
+            'TRACEPARENT': f"00-{self.trace_id}-{span_id}-01",
+        }
+
+    def output_dir(self):
+        if self.trace_dir:
+            os.makedirs(self.trace_dir, exist_ok=True)
+            return self.trace_dir
+        from local_cache import cache_dir
+        return cache_dir('traces')
+
+    def write(self):
+        self.written = True
+        path = os.path.join(self.output_dir(), f"trace-{self.trace_id}-{self.tool}-{self.pid}.json")
+        data = {
+            'traceEvents': list(self.events),
+            'displayTimeUnit': 'ms',
+            'otherData': {'trace_id': self.trace_id, 'tool': self.tool, 'pid': self.pid,
+                          'parent_span': self.parent_span, 'argv': sys.argv, 'dropped_events': self.dropped},
+        }
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            if self.parent_span is None:
+                print(f"Trace written to {path}", file=sys.stderr)
+        except OSError as e:
+            print(f"WARNING: Could not write trace: {e}", file=sys.stderr)
+        return path
+
+
+def install(tool, argv=None):
+    """
+    Enables tracing if --trace[=DIR] is in argv (sys.argv by default; the
+    flag is removed so argparse never sees it) or if this process was started
+    by a traced parent. Call it before importing modules that use traced().
+
+    Returns:
+        Tracer or None.
+    """
+    global _tracer
+    argv = sys.argv if argv is None else argv
+    trace_dir = None
+    enabled = False
+    for i, arg in enumerate(argv):
+        if arg == FLAG or arg.startswith(FLAG + '='):
+            trace_dir = arg.partition('=')[2] or None
+            enabled = True
+            del argv[i]
+            break
+    trace_id = os.environ.get('DASHBOARD_TRACE_ID')
+    if not enabled and not trace_id:
+        return None
+    parent_span = None
+    if trace_id and not enabled:
+        # Started by a traced process: join its trace.
+        parent_span = os.environ.get('DASHBOARD_TRACE_PARENT')
+        trace_dir = os.environ.get('DASHBOARD_TRACE_DIR')
+    else:
+        trace_id = None
+    _tracer = Tracer(tool, trace_dir, trace_id, parent_span)
+    atexit.register(finish)
+    return _tracer
+
+
+def enabled():
+    return _tracer is not None
+
+
+def traced(name=None, cat='app'):
+    """
+    Decorator recording a span per call. Returns the function itself when
+    tracing is off, so undecorated speed is kept.
+    """
+    def decorate(func):
+        if _tracer is None:
+            return func
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _tracer.begin(span_name, cat, {})
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _tracer.end(token, {})
+        return wrapper
+    return decorate
+
+
+class _Span:
+    def __init__(self, name, cat, args):
+        self.token = _tracer.begin(name, cat, args)
+        self.extra = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is not None:
+            self.extra['error'] = repr(exc[1])
+        _tracer.end(self.token, self.extra)
+        return False
+
+    def set(self, **args):
+        self.extra.update(args)
+
+
+def span(name, cat='app', **args):
+    """
+    Context manager recording a span; `.set(**args)` adds arguments before it ends.
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(name, cat, args)
+
+
+def begin(name, cat='app', **args):
+    """
+    Starts a span that is ended explicitly with end(token) (e.g. inside a
+    generator). Returns None when tracing is off.
+    """
+    if _tracer is None:
+        return None
+    return _tracer.begin(name, cat, args)
+
+
+def end(token, **args):
+    if token is not None and _tracer is not None:
+        _tracer.end(token, args)
+
+
+def instant(name, cat='app', **args):
+    if _tracer is not None:
+        _tracer.instant(name, cat, args)
+
+
+def flow(name, flow_id, start):
+    """
+    Links two spans on different threads: call with start=True inside the
+    first and start=False inside the second, using the same flow_id.
+    """
+    if _tracer is not None:
+        _tracer.flow(name, flow_id, 's' if start else 'f')
+
+
+def child_env():
+    """
+    Environment variables that make a child process join the trace ({} when off).
+    """
+    if _tracer is None:
+        return {}
+    return _tracer.child_env()
+
+
+def instrument(mysql_class):
+    """
+    Records a span per query on a MySql.MySQL-like class. No-op when tracing is off.
+    """
+    if _tracer is None or getattr(mysql_class, '_traced', False):
+        return
+
+    def wrap(method_name, rows_result):
+        original = getattr(mysql_class, method_name, None)
+        if original is None:
+            return
+
+        @functools.wraps(original)
+        def wrapper(self, query_string, *args, **kwargs):
+            with span(f"mysql.{method_name}", 'mysql', query=str(query_string)[:QUERY_PREVIEW],
+                      database=getattr(self, 'database', None)) as s:
+                result = original(self, query_string, *args, **kwargs)
+                if rows_result and isinstance(result, (list, tuple)):
+                    s.set(rows=len(result))
+                elif not rows_result:
+                    s.set(ok=bool(result))
+                return result
+        setattr(mysql_class, method_name, wrapper)
+
+    wrap('get_data', True)
+    wrap('put_data', False)
+    wrap('put_many', False)
+    mysql_class._traced = True
+
+
+def finish():
+    """
+    Writes the trace file (once). No-op when tracing is off.
+    """
+    if _tracer is None or _tracer.written:
+        return None
+    return _tracer.write()
+
+
+def trace_files(trace_dir=None):
+    if trace_dir is None:
+        from local_cache import cache_dir
+        trace_dir = cache_dir('traces')
+    return sorted(os.path.join(trace_dir, name) for name in os.listdir(trace_dir)
+                  if name.startswith('trace-') and name.endswith('.json'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List and merge dashboard traces.")
+    parser.add_argument('--dir', help="Trace directory (default: ~/.cache/dashboard_tui/traces).")
+    subparsers = parser.add_subparsers(dest='command', required=True, help="Command to execute")
+    subparsers.add_parser('list', help="List recorded traces.")
+    p_merge = subparsers.add_parser('merge', help="Combine every process' file of one trace.")
+    p_merge.add_argument('trace_id', help="Trace id (a unique prefix is enough).")
+    p_merge.add_argument('-o', '--output', help="Output file (default: trace-ID-merged.json in the trace directory).")
+    args = parser.parse_args()
+
+    try:
+        files = trace_files(args.dir)
+    except OSError as e:
+        sys.exit(f"ERROR: Could not read the trace directory: {e}")
+    traces = {}
+    for path in files:
+        if path.endswith('-merged.json'):
+            continue
+        trace_id = os.path.basename(path).split('-')[1]
+        traces.setdefault(trace_id, []).append(path)
+
+    if args.command == 'list':
+        for trace_id, paths in traces.items():
+            newest = max(os.path.getmtime(p) for p in paths)
+            tools = sorted({os.path.basename(p).split('-')[2] for p in paths})
+            print(f"{trace_id}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(newest))}  "
+                  f"{len(paths)} file(s): {', '.join(tools)}")
+    elif args.command == 'merge':
+        matches = [t for t in traces if t.startswith(args.trace_id)]
+        if len(matches) != 1:
+            sys.exit(f"ERROR: '{args.trace_id}' matches {len(matches)} traces.")
+        trace_id = matches[0]
+        events = []
+        for path in traces[trace_id]:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    events.extend(json.load(f).get('traceEvents', []))
+            except (OSError, ValueError) as e:
+                print(f"WARNING: Skipping {path}: {e}", file=sys.stderr)
+        output = args.output or os.path.join(os.path.dirname(traces[trace_id][0]), f"trace-{trace_id}-merged.json")
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'trace_id': trace_id}}, f)
+        print(f"Merged {len(traces[trace_id])} file(s) into {output}")
+
+
+if __name__ == "__main__":
+    main()
+#============= end of code      ================#
@@ -0,0 +1,620 @@
+#!/home/al/miniconda3/envs/py/bin/python3
+# -*- coding: utf-8 -*-
+#
+# filename:   workflow.py
+#
+# Copyright 2026 AL Haines
+#
+# Workflows: catalog commands run as a dependency graph.
+#
+# A workflow (see migration 8) is a set of named stages, each running a
+# dashboard_commands entry by key. A stage starts once every stage in its
+# depends_on list has ended and its run_if condition holds: 'success' (all
+# of them succeeded), 'failure' (at least one did not) or 'always'. A stage
+# succeeds if its exit code is in success_codes ('0', '0,1', '0,3-5').
+# Stages with no path between them run side by side, at most max_parallel
+# at a time, on the RunManager's run slots, so a workflow never pushes the
+# process past MAX_CONCURRENT_RUNS commands either.
+#
+# Every run and the outcome of each stage are written to MySQL as they
+# happen. A run that failed or was stopped can be resumed: stages that
+# succeeded keep their result and only the others run again.
+#
+# Command line:
+#
+#   workflow.py list                  # workflows, their stages and any problems
+#   workflow.py run NAME              # run a workflow, printing stage progress
+#   workflow.py runs [NAME]           # recent runs
+#   workflow.py resume RUN_ID         # re-run the stages of a run that did not succeed
+
+import re
+import sys
+import time
+import uuid
+import queue
+import argparse
+import itertools
+import threading
+from datetime import datetime
+
+sys.path.insert(0, '/home/al/system_files/projects')
+sys.path.insert(0, '/home/al/system_files/projects/py')
+
+try:
+    from MySql import MySQL
+    from command_spec import CATALOG_QUERY, load_specs
+    from run_manager import RunManager
+    from proc_metrics import format_duration
+except ImportError as e:
+    print(f"ERROR: Critical modules not found: {e}", file=sys.stderr)
+    sys.exit(1)
+
+RUN_IF = ('success', 'failure', 'always')
+STAGE_ENDED = ('succeeded', 'failed', 'skipped', 'stopped')
+OUTPUT_TAIL_LINES = 20       # Last output lines stored with each stage result.
+RECENT_RUNS = 20
+CODE_RANGE = re.compile(r'(-?\d+)(?:-(-?\d+))?$')
+
+
+def parse_codes(text):
+    """
+    Parses a success_codes column ('0', '0,1', '0,3-5') into a frozenset.
+
+    Raises:
+        ValueError: If the list is malformed or empty.
+    """
+    codes = set()
+    for part in str(text).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        found = CODE_RANGE.match(part)
+        if found is None:
+            raise ValueError(f"bad exit code '{part}'")
+        low = int(found.group(1))
+        high = int(found.group(2)) if found.group(2) is not None else low
+        codes.update(range(low, high + 1))
+    if not codes:
+        raise ValueError("no exit codes")
+    return frozenset(codes)
+
+
+def _datetime(timestamp):
+    return datetime.fromtimestamp(timestamp) if timestamp else None
+
+
+class Stage:
+    """
+    One step of a workflow: a catalog command and when to run it.
+    """
+
+    __slots__ = ('name', 'command_key', 'depends_on', 'run_if', 'codes_text', 'success_codes')
+
+    def __init__(self, row):
+        self.name = str(row['stage_name'])
+        self.command_key = str(row['command_key'])
+        self.depends_on = tuple(name.strip() for name in (row.get('depends_on') or '').split(',') if name.strip())
+        self.run_if = row.get('run_if') or 'success'
+        codes = row.get('success_codes')
+        self.codes_text = '0' if codes is None else str(codes)
+        try:
+            self.success_codes = parse_codes(self.codes_text)
+        except ValueError:
+            self.success_codes = None       # Reported by Workflow.validate().
+
+    def condition(self):
+        """Returns e.g. 'after backup' or 'after backup, sync if one fails'."""
+        if not self.depends_on:
+            return ""
+        when = {'failure': " if one fails", 'always': " always"}.get(self.run_if, "")
+        return f"after {', '.join(self.depends_on)}{when}"
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, {self.command_key!r})"
+
+
+class Workflow:
+    """
+    A named DAG of stages, in the table's sort order.
+    """
+
+    def __init__(self, row, stages):
+        self.id = int(row['id'])
+        self.name = str(row['name'])
+        self.description = row.get('description') or ''
+        try:
+            self.max_parallel = max(1, int(row.get('max_parallel') or 1))
+        except (ValueError, TypeError):
+            self.max_parallel = 1
+        self.stages = {stage.name: stage for stage in stages}
+
+    def order(self):
+        """
+        Returns the stage names so that each comes after its dependencies
+        (sort order breaks ties), or None if the dependencies form a cycle.
+        """
+        done, ordered = set(), []
+        pending = list(self.stages.values())
+        while pending:
+            ready = [stage for stage in pending if done.issuperset(stage.depends_on)]
+            if not ready:
+                return None
+            ordered.extend(stage.name for stage in ready)
+            done.update(stage.name for stage in ready)
+            pending = [stage for stage in pending if stage.name not in done]
+        return ordered
+
+    def validate(self, commands):
+        """
+        Checks the stages against the catalog (a {key: CommandSpec} dict).
+
+        Returns:
+            list[str]: The problems found; empty if the workflow can run.
+        """
+        problems = []
+        if not self.stages:
+            problems.append("it has no stages")
+        for stage in self.stages.values():
+            command_data = commands.get(stage.command_key)
+            if command_data is None:
+                problems.append(f"stage '{stage.name}' runs unknown command key '{stage.command_key}'")
+            elif command_data.requires_input:
+                problems.append(f"stage '{stage.name}' runs '{command_data.name}', which needs input")
+            if stage.run_if not in RUN_IF:
+                problems.append(f"stage '{stage.name}' has an unknown run_if '{stage.run_if}'")
+            elif stage.run_if == 'failure' and not stage.depends_on:
+                problems.append(f"stage '{stage.name}' runs on failure but depends on nothing")
+            if stage.success_codes is None:
+                problems.append(f"stage '{stage.name}' has bad success_codes '{stage.codes_text}'")
+            for name in stage.depends_on:
+                if name not in self.stages:
+                    problems.append(f"stage '{stage.name}' depends on unknown stage '{name}'")
+        if not problems and self.order() is None:
+            problems.append("its stage dependencies form a cycle")
+        return problems
+
+    def __repr__(self):
+        return f"Workflow({self.name!r}, {len(self.stages)} stages)"
+
+
+class WorkflowStore:
+    """
+    Workflow definitions and run records in MySQL.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or MySQL()
+
+    def load_commands(self):
+        """Returns the enabled catalog as {key: CommandSpec}, or None on error."""
+        rows = self.db.get_data(CATALOG_QUERY)
+        if self.db.last_error:
+            return None
+        return {command_data.key: command_data for command_data in load_specs(rows)}
+
+    def load_workflows(self):
+        """Returns the enabled workflows as {name: Workflow}, or None on error."""
+        workflows = self.db.get_data(
+            "SELECT `id`, `name`, `description`, `max_parallel` FROM `dashboard_workflows` "
+            "WHERE `enabled` = 1 ORDER BY `name`")
+        if self.db.last_error:
+            return None
+        rows = self.db.get_data(
+            "SELECT `workflow_id`, `stage_name`, `command_key`, `depends_on`, `run_if`, `success_codes` "
+            "FROM `dashboard_workflow_stages` ORDER BY `workflow_id`, `sort_order`, `id`")
+        if self.db.last_error:
+            return None
+        stages = {}
+        for row in rows:
+            stages.setdefault(row['workflow_id'], []).append(Stage(row))
+        return {row['name']: Workflow(row, stages.get(row['id'], [])) for row in workflows}
+
+    def create_run(self, workflow):
+        """Records a new run of `workflow` and returns its id, or None on error."""
+        run_uuid = uuid.uuid4().hex
+        if not self.db.put_data(
+                "INSERT INTO `dashboard_workflow_runs` (`run_uuid`, `workflow_id`, `status`, `started_at`) "
+                "VALUES (%s, %s, 'running', %s)", (run_uuid, workflow.id, datetime.now())):
+            return None
+        rows = self.db.get_data("SELECT `id` FROM `dashboard_workflow_runs` WHERE `run_uuid` = %s", (run_uuid,))
+        return rows[0]['id'] if rows else None
+
+    def restart_run(self, run_id):
+        return self.db.put_data(
+            "UPDATE `dashboard_workflow_runs` SET `status` = 'running', `attempts` = `attempts` + 1, "
+            "`finished_at` = NULL WHERE `id` = %s", (run_id,))
+
+    def finish_run(self, run_id, status):
+        return self.db.put_data(
+            "UPDATE `dashboard_workflow_runs` SET `status` = %s, `finished_at` = %s WHERE `id` = %s",
+            (status, datetime.now(), run_id))
+
+    def save_stage(self, run_id, state, output_tail=None):
+        """Writes the current state of one stage of run `run_id`."""
+        return self.db.put_data(
+            "INSERT INTO `dashboard_workflow_stage_runs` (`run_id`, `stage_name`, `status`, `exit_code`, "
+            "`started_at`, `finished_at`, `duration_seconds`, `output_tail`) VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE `status` = VALUES(`status`), `exit_code` = VALUES(`exit_code`), "
+            "`started_at` = VALUES(`started_at`), `finished_at` = VALUES(`finished_at`), "
+            "`duration_seconds` = VALUES(`duration_seconds`), `output_tail` = VALUES(`output_tail`)",
+            (run_id, state.stage.name, state.status, state.exit_code, _datetime(state.started_at),
+             _datetime(state.finished_at), state.duration, output_tail))
+
+    def get_run(self, run_id):
+        rows = self.db.get_data(
+            "SELECT r.`id`, r.`workflow_id`, w.`name`, r.`status`, r.`attempts`, r.`started_at`, r.`finished_at` "
+            "FROM `dashboard_workflow_runs` r JOIN `dashboard_workflows` w ON w.`id` = r.`workflow_id` "
+            "WHERE r.`id` = %s", (run_id,))
+        return rows[0] if rows else None
+
+    def stage_results(self, run_id):
+        """Returns {stage_name: row} for run `run_id`."""
+        rows = self.db.get_data(
+            "SELECT `stage_name`, `status`, `exit_code`, `duration_seconds`, `output_tail` "
+            "FROM `dashboard_workflow_stage_runs` WHERE `run_id` = %s", (run_id,))
+        return {row['stage_name']: row for row in rows}
+
+    def recent_runs(self, workflow_id=None, statuses=None, limit=RECENT_RUNS):
+        """Returns the latest runs, newest first, optionally of one workflow and/or with given statuses."""
+        where, params = [], []
+        if workflow_id is not None:
+            where.append("r.`workflow_id` = %s")
+            params.append(workflow_id)
+        if statuses:
+            where.append(f"r.`status` IN ({', '.join(['%s'] * len(statuses))})")
+            params.extend(statuses)
+        params.append(limit)
+        return self.db.get_data(
+            "SELECT r.`id`, r.`workflow_id`, w.`name`, r.`status`, r.`attempts`, r.`started_at`, r.`finished_at` "
+            "FROM `dashboard_workflow_runs` r JOIN `dashboard_workflows` w ON w.`id` = r.`workflow_id` "
+            f"{'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY r.`id` DESC LIMIT %s", tuple(params))
+
+
+class StageState:
+    """
+    Progress of one stage within a workflow run.
+    """
+
+    __slots__ = ('stage', 'status', 'exit_code', 'started_at', 'finished_at', 'duration', 'run', 'reused')
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.status = 'pending'
+        self.exit_code = None
+        self.started_at = None      # time.time() values.
+        self.finished_at = None
+        self.duration = None
+        self.run = None             # run_manager.Run once started in this process.
+        self.reused = False         # Succeeded in an earlier attempt of the run.
+
+    @property
+    def ended(self):
+        return self.status in STAGE_ENDED
+
+    @property
+    def ok(self):
+        """True if stages that depend on this one count it as a success."""
+        return self.status == 'succeeded' or (self.status == 'skipped' and self.stage.run_if == 'failure')
+
+    @property
+    def waiting(self):
+        """True while the stage is started but waits for a free run slot."""
+        return self.status == 'running' and self.run is not None and self.run.status == 'queued'
+
+    def elapsed(self):
+        """Seconds the stage has run (so far), or None."""
+        if self.status == 'running':
+            started = self.run.started_at if self.run is not None else None
+            return time.time() - started if started else None
+        return self.duration
+
+
+class WorkflowRun:
+    """
+    One execution of a workflow. start() runs it on a coordinator thread;
+    on_change(run) is called from that thread whenever a stage changes.
+    """
+
+    def __init__(self, workflow, commands, run_manager, store, on_change=None):
+        self.workflow = workflow
+        self.commands = commands
+        self.run_manager = run_manager
+        self.store = store
+        self.on_change = on_change
+        self.id = None
+        self.attempt = 1
+        self.status = 'pending'
+        self.started_at = None
+        self.finished_at = None
+        self.stages = {name: StageState(workflow.stages[name]) for name in workflow.order() or workflow.stages}
+        self.stop_requested = False
+        self.events = queue.Queue()     # Names of stages whose runs ended; None wakes the coordinator.
+        self.thread = None
+
+    @classmethod
+    def resume(cls, run_id, workflows, commands, run_manager, store, on_change=None, force=False):
+        """
+        Rebuilds run `run_id` for another attempt: stages that succeeded keep
+        their result and the others run again once start() is called.
+
+        Raises:
+            ValueError: If the run is unknown, already succeeded, or (unless
+                        `force` is set) still marked as running.
+        """
+        row = store.get_run(run_id)
+        if row is None:
+            raise ValueError(f"Workflow run #{run_id} not found.")
+        if row['status'] == 'succeeded':
+            raise ValueError(f"Workflow run #{run_id} already succeeded.")
+        if row['status'] == 'running' and not force:
+            raise ValueError(f"Workflow run #{run_id} is still marked as running.")
+        workflow = next((w for w in workflows.values() if w.id == row['workflow_id']), None)
+        if workflow is None:
+            raise ValueError(f"Workflow '{row['name']}' of run #{run_id} no longer exists or is disabled.")
+        run = cls(workflow, commands, run_manager, store, on_change)
+        run.id = run_id
+        run.attempt = (row['attempts'] or 1) + 1
+        for name, result in store.stage_results(run_id).items():
+            state = run.stages.get(name)
+            if state is not None and result['status'] == 'succeeded':
+                state.status = 'succeeded'
+                state.exit_code = result['exit_code']
+                state.duration = result['duration_seconds']
+                state.reused = True
+        return run
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed', 'stopped')
+
+    def elapsed(self):
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def counts(self):
+        """Returns {status: number of stages}."""
+        counts = {}
+        for state in self.stages.values():
+            counts[state.status] = counts.get(state.status, 0) + 1
+        return counts
+
+    def start(self):
+        """
+        Validates the workflow, records the run and starts it.
+
+        Raises:
+            ValueError: If the workflow cannot run or the run could not be recorded.
+        """
+        problems = self.workflow.validate(self.commands)
+        if problems:
+            raise ValueError(f"Workflow '{self.workflow.name}' cannot run: {'; '.join(problems)}.")
+        if self.id is None:
+            self.id = self.store.create_run(self.workflow)
+            if self.id is None:
+                raise ValueError(f"Could not record a run of workflow '{self.workflow.name}'.")
+        elif not self.store.restart_run(self.id):
+            raise ValueError(f"Could not record the new attempt of workflow run #{self.id}.")
+        self.status = 'running'
+        self.started_at = time.time()
+        for state in self.stages.values():
+            if not state.reused:
+                self._save(state)
+        self.thread = threading.Thread(target=self._coordinate, name=f"workflow-{self.id}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops the running stages; pending ones are not started."""
+        self.stop_requested = True
+        for state in list(self.stages.values()):
+            if state.status == 'running' and state.run is not None:
+                self.run_manager.stop(state.run.id)
+        self.events.put(None)
+
+    def wait(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return self.done
+
+    def _coordinate(self):
+        while True:
+            self._advance()
+            if not any(state.status == 'running' for state in self.stages.values()):
+                break
+            name = self.events.get()
+            if name is not None:
+                self._stage_ended(self.stages[name])
+        self._finish()
+
+    def _advance(self):
+        """Skips or starts each pending stage whose dependencies have all ended."""
+        if self.stop_requested:
+            return
+        running = sum(1 for state in self.stages.values() if state.status == 'running')
+        changed = True
+        while changed:
+            changed = False
+            for state in self.stages.values():
+                if state.status != 'pending':
+                    continue
+                dependencies = [self.stages[name] for name in state.stage.depends_on]
+                if not all(dependency.ended for dependency in dependencies):
+                    continue
+                if not self._should_run(state.stage.run_if, dependencies):
+                    self._end(state, 'skipped')
+                    changed = True
+                elif running < self.workflow.max_parallel:
+                    self._launch(state)
+                    running += 1
+                    changed = True
+
+    @staticmethod
+    def _should_run(run_if, dependencies):
+        if run_if == 'always':
+            return True
+        all_ok = all(dependency.ok for dependency in dependencies)
+        return all_ok if run_if == 'success' else not all_ok
+
+    def _launch(self, state):
+        name = state.stage.name
+        state.status = 'running'
+        state.started_at = time.time()
+        state.exit_code = state.finished_at = state.duration = None
+        state.run = self.run_manager.start(self.commands[state.stage.command_key],
+                                           on_done=lambda run: self.events.put(name))
+        if self.stop_requested:     # stop() ran before this run existed.
+            self.run_manager.stop(state.run.id)
+        self._changed(state)
+
+    def _stage_ended(self, state):
+        run = state.run
+        state.exit_code = run.returncode
+        if run.started_at:
+            state.started_at = run.started_at
+        state.finished_at = run.finished_at or time.time()
+        state.duration = state.finished_at - state.started_at
+        if run.status == 'stopped':
+            status = 'stopped'
+        elif run.status == 'failed' and run.returncode is None:
+            status = 'failed'       # The command could not be run at all.
+        else:
+            # Remote runs have no local exit code; a completed stream counts as 0.
+            status = 'succeeded' if (run.returncode or 0) in state.stage.success_codes else 'failed'
+        state.status = status
+        lines = run.lines
+        self._changed(state, '\n'.join(itertools.islice(lines, max(0, len(lines) - OUTPUT_TAIL_LINES), None)))
+
+    def _end(self, state, status):
+        state.status = status
+        state.finished_at = time.time()
+        self._changed(state)
+
+    def _finish(self):
+        for state in self.stages.values():
+            if state.status == 'pending':
+                self._end(state, 'stopped' if self.stop_requested else 'skipped')
+        if self.stop_requested:
+            status = 'stopped'
+        elif any(state.status in ('failed', 'stopped') for state in self.stages.values()):
+            status = 'failed'
+        else:
+            status = 'succeeded'
+        self.finished_at = time.time()
+        if not self.store.finish_run(self.id, status):
+            print(f"ERROR: Could not record the end of workflow run #{self.id}.", file=sys.stderr)
+        self.status = status
+        self._notify()
+
+    def _save(self, state, output_tail=None):
+        if not self.store.save_stage(self.id, state, output_tail):
+            print(f"ERROR: Could not record stage '{state.stage.name}' of workflow run #{self.id}.",
+                  file=sys.stderr)
+
+    def _changed(self, state, output_tail=None):
+        self._save(state, output_tail)
+        self._notify()
+
+    def _notify(self):
+        if self.on_change is not None:
+            try:
+                self.on_change(self)
+            except Exception as e:
+                print(f"Error in workflow progress callback: {e}", file=sys.stderr)
+
+
+def _stage_line(state):
+    elapsed = state.elapsed()
+    status = 'waiting' if state.waiting else state.status
+    code = "" if state.exit_code is None else f"exit {state.exit_code}"
+    timing = "" if elapsed is None else format_duration(elapsed)
+    return f"  {state.stage.name:<20} {status:<10} {code:<8} {timing:>8}"
+
+
+def _run_until_done(run):
+    """Starts `run`, printing each stage change, and waits for it. Ctrl+C stops it."""
+    seen = {}
+    def progress(changed):
+        for name, state in changed.stages.items():
+            if seen.get(name) != state.status:
+                seen[name] = state.status
+                print(_stage_line(state), flush=True)
+    run.on_change = progress
+    print(f"Workflow '{run.workflow.name}' run #{run.id if run.id else 'new'}, attempt {run.attempt}:")
+    for name, state in run.stages.items():
+        if state.reused:
+            seen[name] = state.status
+            print(f"{_stage_line(state)}  (earlier attempt)")
+    try:
+        run.start()
+    except ValueError as e:
+        sys.exit(f"ERROR: {e}")
+    try:
+        while not run.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        print("Stopping...", file=sys.stderr)
+        run.stop()
+        run.wait()
+    print(f"Workflow run #{run.id} {run.status} in {format_duration(run.elapsed() or 0)}.")
+    return 0 if run.status == 'succeeded' else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run dashboard workflows (DAGs of catalog commands).")
+    subparsers = parser.add_subparsers(dest='command', required=True, help="Command to execute")
+    subparsers.add_parser('list', help="Show the workflows and their stages.")
+    p_run = subparsers.add_parser('run', help="Run a workflow.")
+    p_run.add_argument('name', help="Workflow name.")
+    p_runs = subparsers.add_parser('runs', help="Show recent workflow runs.")
+    p_runs.add_argument('name', nargs='?', help="Only runs of this workflow.")
+    p_resume = subparsers.add_parser('resume', help="Re-run the stages of a run that did not succeed.")
+    p_resume.add_argument('run_id', type=int, help="Workflow run id (see 'runs').")
+    p_resume.add_argument('--force', action='store_true', help="Resume even if the run is still marked as running.")
+    args = parser.parse_args()
+
+    store = WorkflowStore()
+    workflows = store.load_workflows()
+    if workflows is None:
+        sys.exit("ERROR: Could not load workflows from the database.")
+
+    if args.command == 'runs':
+        workflow_id = None
+        if args.name:
+            if args.name not in workflows:
+                sys.exit(f"ERROR: No enabled workflow named '{args.name}'.")
+            workflow_id = workflows[args.name].id
+        for row in store.recent_runs(workflow_id):
+            finished = row['finished_at'].strftime('%Y-%m-%d %H:%M') if row['finished_at'] else '-'
+            print(f"#{row['id']:<6} {row['name']:<24} {row['status']:<10} attempts {row['attempts']:<3} "
+                  f"started {row['started_at']:%Y-%m-%d %H:%M}  finished {finished}")
+        return
+
+    commands = store.load_commands()
+    if commands is None:
+        sys.exit("ERROR: Could not load commands from the database.")
+
+    if args.command == 'list':
+        for workflow in workflows.values():
+            print(f"{workflow.name} (up to {workflow.max_parallel} at a time)"
+                  f"{' - ' + workflow.description if workflow.description else ''}")
+            for stage in workflow.stages.values():
+                command_data = commands.get(stage.command_key)
+                label = f"({stage.command_key}) {command_data.name if command_data else '?'}"
+                print(f"  {stage.name:<20} {label:<30} {stage.condition()}")
+            for problem in workflow.validate(commands):
+                print(f"  ! {problem}")
+    elif args.command == 'run':
+        if args.name not in workflows:
+            sys.exit(f"ERROR: No enabled workflow named '{args.name}'.")
+        sys.exit(_run_until_done(WorkflowRun(workflows[args.name], commands, RunManager(), store)))
+    elif args.command == 'resume':
+        try:
+            run = WorkflowRun.resume(args.run_id, workflows, commands, RunManager(), store, force=args.force)
+        except ValueError as e:
+            sys.exit(f"ERROR: {e}")
+        sys.exit(_run_until_done(run))
+
+
+if __name__ == "__main__":
+    main()
+#============= end of code      ================#